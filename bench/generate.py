@@ -0,0 +1,118 @@
+from __future__ import annotations
+import argparse
+import csv
+import datetime as dt
+import os
+import random
+
+# Skewed vocabularies: the first entries dominate, like real queues do.
+EVENT_KINDS = ["Phishing", "Malware", "Brute Force", "Data Exfiltration", "Policy Violation",
+               "Suspicious Login", "DDoS", "Insider Threat", "Ransomware", "Vulnerability"]
+IMPACTS = ["Low", "Medium", "High", "Critical"]
+IMPACT_WEIGHTS = [40, 35, 18, 7]
+STATES = ["Open", "In Progress", "Resolved", "Closed"]
+STATE_WEIGHTS = [15, 10, 25, 50]
+TOPICS = ["Account Access", "WiFi Coverage", "Printer", "Software Install", "Laptop Repair",
+          "VPN", "Email", "Password Reset", "Hardware Request", "Classroom AV"]
+ORIGINS = ["SIS", "ILS", "LMS", "ERP", "SIEM", "CRM", "HRIS", "DW"]
+NOTES = ["Mailbox reports increased suspicious attachments", "Endpoint quarantined",
+         "Repeated failed logins from external IP", "User reported pop-ups",
+         "Escalated to vendor", "Awaiting user confirmation", ""]
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    return [1.0 / (i + 1) ** s for i in range(n)]
+
+
+def _day(rng: random.Random, end: dt.date, span_days: int) -> dt.date:
+    # Recent days are busier: triangular distribution peaking at `end`.
+    return end - dt.timedelta(days=int(rng.triangular(0, span_days, 0)))
+
+
+def write_sec_events(path: str, rows: int, rng: random.Random, end: dt.date, span_days: int = 730,
+                     owners: int = 200) -> None:
+    owner_names = [f"Analyst{i:03d}" for i in range(owners)]
+    owner_w = _zipf_weights(owners)
+    kind_w = _zipf_weights(len(EVENT_KINDS))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["event_key", "event_kind", "impact", "state", "raised_at", "cleared_at", "owner", "notes"])
+        for i in range(rows):
+            raised = _day(rng, end, span_days)
+            state = rng.choices(STATES, STATE_WEIGHTS)[0]
+            cleared = ""
+            if state in ("Resolved", "Closed"):
+                cleared = min(end, raised + dt.timedelta(days=int(rng.expovariate(1 / 4)))).isoformat()
+            w.writerow([
+                f"SEC-{i + 1:08d}", rng.choices(EVENT_KINDS, kind_w)[0],
+                rng.choices(IMPACTS, IMPACT_WEIGHTS)[0], state, raised.isoformat(), cleared,
+                rng.choices(owner_names, owner_w)[0], rng.choice(NOTES),
+            ])
+
+
+def write_it_requests(path: str, rows: int, rng: random.Random, end: dt.date, span_days: int = 730,
+                      assignees: int = 60) -> None:
+    names = [f"Desk{i:02d}" for i in range(assignees)]
+    name_w = _zipf_weights(assignees)
+    topic_w = _zipf_weights(len(TOPICS))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["req_key", "topic", "urgency", "phase", "opened_at", "closed_at", "assignee"])
+        for i in range(rows):
+            opened = _day(rng, end, span_days)
+            phase = rng.choices(STATES, STATE_WEIGHTS)[0]
+            closed = ""
+            if phase in ("Resolved", "Closed"):
+                closed = min(end, opened + dt.timedelta(days=int(rng.expovariate(1 / 2)))).isoformat()
+            w.writerow([
+                f"REQ-{i + 1:08d}", rng.choices(TOPICS, topic_w)[0],
+                rng.choices(IMPACTS, IMPACT_WEIGHTS)[0], phase, opened.isoformat(), closed,
+                rng.choices(names, name_w)[0],
+            ])
+
+
+def write_data_assets(path: str, rows: int, rng: random.Random, end: dt.date, span_days: int = 1825,
+                      stewards: int = 40) -> None:
+    names = [f"Steward{i:02d}" for i in range(stewards)]
+    steward_w = _zipf_weights(stewards)
+    origin_w = _zipf_weights(len(ORIGINS))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["asset_name", "steward", "origin", "size_mb", "rows_est", "created_on"])
+        for i in range(rows):
+            size = round(rng.lognormvariate(5, 1.5), 1)
+            w.writerow([
+                f"Asset{i + 1:08d}", rng.choices(names, steward_w)[0], rng.choices(ORIGINS, origin_w)[0],
+                size, int(size * rng.uniform(200, 2000)), _day(rng, end, span_days).isoformat(),
+            ])
+
+
+def generate(out_dir: str, rows: int, seed: int = 7, end: dt.date | None = None) -> dict[str, str]:
+    """
+    Writes sec_events.csv, it_requests.csv and data_assets.csv to `out_dir`.
+    Security events get `rows` rows, IT requests half that and assets a
+    tenth (at least 100). Output is identical for the same seed and end date.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    end = end or dt.date(2025, 12, 31)
+    paths = {t: os.path.join(out_dir, f"{t}.csv") for t in ("sec_events", "it_requests", "data_assets")}
+    write_sec_events(paths["sec_events"], rows, rng, end)
+    write_it_requests(paths["it_requests"], rows // 2, rng, end)
+    write_data_assets(paths["data_assets"], max(100, rows // 10), rng, end)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.generate",
+                                     description="Generate a synthetic large dataset as seed CSVs.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--rows", type=int, default=100_000, help="security events (10k .. 10M)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    for table, path in generate(args.out_dir, args.rows, args.seed).items():
+        print(f"{table}: {path}")
+
+
+if __name__ == "__main__":
+    main()
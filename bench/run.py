@@ -0,0 +1,138 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from bench.generate import generate
+from core.bootstrap import ensure_schema
+from core.cache import CACHE
+from core.importer import import_csv
+from core.security import make_hash
+from core.store import Store, close_pools
+from logic.accounts import Accounts
+from logic.aggregates import QueueStats
+from logic.cyber_ops import CyberOps
+from logic.data_catalog import DataCatalog
+from logic.service_desk import ServiceDesk
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+TOLERANCE = 0.20
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    """Median wall time in ms; the frame cache is cleared before each call."""
+    samples = []
+    for _ in range(repeat):
+        CACHE.clear()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def run_suite(rows: int, repeat: int = 3, workdir: str | None = None) -> dict[str, float]:
+    tmp = workdir or tempfile.mkdtemp(prefix="ops_bench_")
+    db = os.path.join(tmp, "bench.sqlite3")
+    try:
+        paths = generate(os.path.join(tmp, "csv"), rows)
+        ensure_schema(db)
+
+        results: dict[str, float] = {}
+        t0 = time.perf_counter()
+        for table, path in paths.items():
+            import_csv(db, table, path, resume=False)
+        results["seed.import_all"] = (time.perf_counter() - t0) * 1000
+
+        with Store(db) as s:
+            s.exec(
+                "INSERT OR IGNORE INTO accounts(handle, pass_hash, access_level) VALUES(?,?,?)",
+                ("bench", make_hash("bench-pass"), "Analyst"),
+            )
+
+        ops, cat, desk, stats = CyberOps(db), DataCatalog(db), ServiceDesk(db), QueueStats(db)
+        first = ops.query(limit=50)
+
+        cases: dict[str, Callable[[], object]] = {
+            "frame.sec_events": ops.frame,
+            "frame.it_requests": desk.frame,
+            "frame.data_assets": cat.frame,
+            "page.sec_events.first": lambda: ops.query(limit=50),
+            "page.sec_events.next": lambda: ops.query(limit=50, after=first.cursor),
+            "page.sec_events.filtered": lambda: ops.query(state=["Open"], impact=["Critical"], limit=50),
+            "agg.security": lambda: (stats.security_kpis(), stats.security_by_impact_state(),
+                                     stats.security_by_kind()),
+            "agg.data": lambda: (stats.data_totals(), stats.data_by_origin(), stats.data_largest(8)),
+            "agg.it": lambda: (stats.it_kpis(), stats.it_by_urgency_phase(), stats.it_by_topic()),
+            "update.single": lambda: ops.update_state("SEC-00000001", "In Progress"),
+            "update.bulk_1000": lambda: ops.update_state_many(
+                [f"SEC-{i:08d}" for i in range(1, min(rows, 1000) + 1)], "In Progress"),
+            "login.authenticate": lambda: Accounts(db).authenticate("bench", "bench-pass"),
+        }
+        for name, fn in cases.items():
+            results[name] = _time(fn, repeat)
+        return results
+    finally:
+        close_pools()
+        if workdir is None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def compare(current: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    regressions = []
+    for name, ms in current.items():
+        base = baseline.get(name)
+        if base and ms > base * (1 + tolerance):
+            regressions.append(f"{name}: {ms:.1f} ms vs baseline {base:.1f} ms (+{(ms / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.run",
+                                     description="Time seed, frames, aggregates, updates and login.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown before a case is flagged (0.20 = 20%%)")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_suite(args.rows, args.repeat)
+    width = max(len(k) for k in results)
+    for name, ms in results.items():
+        print(f"{name:<{width}}  {ms:10.1f} ms")
+
+    key = str(args.rows)
+    saved = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+
+    if args.save:
+        saved[key] = {"results": results, "python": platform.python_version(), "saved_at": time.time()}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+        print(f"Baseline for {args.rows} rows saved to {args.baseline}")
+        return
+
+    if key not in saved:
+        print(f"No baseline for {args.rows} rows; run with --save to record one.")
+        return
+    regressions = compare(results, saved[key]["results"], args.tolerance)
+    if regressions:
+        print("Regressions:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not load before sign-in; importing any of them at
+# startup is reported as a regression. (Streamlit itself imports base
+# plotly, so only plotly.express is checked.)
+DEFERRED = ("pandas", "plotly.express", "requests", "bcrypt", "dotenv", "numpy")
+
+
+def import_profile(module: str = "command_center") -> list[tuple[str, int, int]]:
+    """
+    Imports `module` in a fresh interpreter with -X importtime and returns
+    (module, self_us, cumulative_us) for every module it pulled in.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    out = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line.split(":", 1)[1].split("|")
+        out.append((name.strip(), int(self_us), int(cum_us)))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.startup",
+                                     description="Report per-module import cost of the app entry point.")
+    parser.add_argument("--module", default="command_center")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=0,
+                        help="fail if the total import time exceeds this")
+    args = parser.parse_args()
+
+    prof = import_profile(args.module)
+    total = next((cum for name, _s, cum in prof if name == args.module), 0) / 1000
+    print(f"import {args.module}: {total:.0f} ms across {len(prof)} modules")
+    print(f"{'module':<48} {'self ms':>9} {'cum ms':>9}")
+    for name, self_us, cum_us in sorted(prof, key=lambda p: p[1], reverse=True)[:args.top]:
+        print(f"{name:<48} {self_us / 1000:9.1f} {cum_us / 1000:9.1f}")
+
+    failures = []
+    loaded = {name for name, _s, _c in prof}
+    early = [m for m in DEFERRED if m in loaded]
+    if early:
+        failures.append(f"loaded before sign-in: {', '.join(early)}")
+    if args.budget_ms and total > args.budget_ms:
+        failures.append(f"{total:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    for f in failures:
+        print(f"REGRESSION: {f}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
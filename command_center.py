@@ -1,13 +1,15 @@
 import streamlit as st
-from config import CFG
+from config import get_config
 from core.bootstrap import ensure_schema
-from logic.accounts import Accounts
 from ui.layout import app_shell
-from ui.screens import command_center
+
+# Heavy modules (pandas, plotly, requests, bcrypt) are imported on first use
+# below, so the sign-in page renders before any of them load.
 
 def main():
     app_shell("Ops Command Center", "Unified security, data, and IT operations view")
 
+    CFG = get_config()
     ensure_schema(CFG.db_path)
 
     with st.sidebar:
@@ -18,12 +20,19 @@ def main():
             handle = st.text_input("Handle")
             pwd = st.text_input("Password", type="password")
             if st.button("Sign in", type="primary"):
+                from logic.accounts import Accounts, LoginBusy
                 acct = Accounts(CFG.db_path)
-                user = acct.authenticate(handle.strip(), pwd)
+                busy = None
+                try:
+                    user = acct.authenticate(handle.strip(), pwd)
+                except LoginBusy as e:
+                    user, busy = None, str(e)
                 if user:
                     st.session_state["actor"] = user
                     st.success("Signed in.")
                     st.rerun()
+                elif busy:
+                    st.warning(busy)
                 else:
                     st.error("Invalid credentials.")
         else:
@@ -39,6 +48,7 @@ def main():
         st.caption("Default demo login (after seeding): admin / admin123")
         return
 
+    from ui.screens import command_center
     command_center(CFG.db_path)
 
 if __name__ == "__main__":
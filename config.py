@@ -1,18 +1,38 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+
+def _env(name: str, default: str = "") -> str:
+    return os.getenv(name, default).strip()
+
 
 @dataclass(frozen=True)
 class AppConfig:
     seed_dir: str = "seed"
     db_path: str = os.path.join("seed", "ops_command_center.sqlite3")
 
-    openrouter_key: str = os.getenv("OPENROUTER_API_KEY", "").strip()
-    openrouter_model: str = os.getenv("OPENROUTER_MODEL", "deepseek/deepseek-chat").strip()
-    openrouter_base_url: str = os.getenv(
-        "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"
-    ).strip().rstrip("/")
+    openrouter_key: str = field(default_factory=lambda: _env("OPENROUTER_API_KEY"))
+    openrouter_model: str = field(default_factory=lambda: _env("OPENROUTER_MODEL", "deepseek/deepseek-chat"))
+    openrouter_base_url: str = field(
+        default_factory=lambda: _env("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+    )
+
+
+_CFG = None
+
+
+def get_config() -> AppConfig:
+    # .env is read on first use rather than at import, keeping cold start cheap.
+    global _CFG
+    if _CFG is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _CFG = AppConfig()
+    return _CFG
+
 
-CFG = AppConfig()
+def __getattr__(name: str):
+    # `from config import CFG` keeps working; the config is built lazily.
+    if name == "CFG":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
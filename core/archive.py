@@ -0,0 +1,198 @@
+from __future__ import annotations
+import argparse
+import datetime as dt
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.migrations import ROLLUPS, TERMINAL_STATES
+from core.store import Store
+
+ALIAS = "archive"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_RETAIN_DAYS = int(os.getenv("ARCHIVE_RETAIN_DAYS", "0"))  # 0 = keep archived rows forever
+MOVE_BATCH = 5000
+
+# table -> (state column, date a row became terminal, fallback date, archive DDL)
+ARCHIVED = {
+    "sec_events": ("state", "cleared_at", "raised_at", """
+CREATE TABLE IF NOT EXISTS {alias}.sec_events (
+  id INTEGER PRIMARY KEY,
+  event_key TEXT UNIQUE NOT NULL,
+  event_kind TEXT NOT NULL,
+  impact TEXT NOT NULL,
+  state TEXT NOT NULL,
+  raised_at TEXT NOT NULL,
+  cleared_at TEXT,
+  owner TEXT NOT NULL,
+  notes TEXT
+);
+CREATE INDEX IF NOT EXISTS {alias}.ix_sec_events_raised ON sec_events(raised_at);
+CREATE INDEX IF NOT EXISTS {alias}.ix_sec_events_owner ON sec_events(owner, raised_at);
+"""),
+    "it_requests": ("phase", "closed_at", "opened_at", """
+CREATE TABLE IF NOT EXISTS {alias}.it_requests (
+  id INTEGER PRIMARY KEY,
+  req_key TEXT UNIQUE NOT NULL,
+  topic TEXT NOT NULL,
+  urgency TEXT NOT NULL,
+  phase TEXT NOT NULL,
+  opened_at TEXT NOT NULL,
+  closed_at TEXT,
+  assignee TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {alias}.ix_it_requests_opened ON it_requests(opened_at);
+CREATE INDEX IF NOT EXISTS {alias}.ix_it_requests_assignee ON it_requests(assignee, opened_at);
+"""),
+}
+
+
+def archive_path_for(db_path: str) -> str:
+    """seed/ops_command_center.sqlite3 -> seed/ops_command_center_archive.sqlite3"""
+    stem, ext = os.path.splitext(db_path)
+    return f"{stem}_archive{ext or '.sqlite3'}"
+
+
+def attach_archive(s: Store, db_path: str) -> None:
+    """Attaches the archive database to this connection (idempotent) and creates its tables."""
+    attached = {r[1] for r in s.all("PRAGMA database_list")}
+    if ALIAS in attached:
+        return
+    if s.conn.in_transaction:
+        s.commit()
+    s.exec(f"ATTACH DATABASE ? AS {ALIAS}", (archive_path_for(db_path),))
+    for _state, _done, _fallback, ddl in ARCHIVED.values():
+        s.conn.executescript(ddl.format(alias=ALIAS))
+
+
+@dataclass
+class ArchiveReport:
+    moved: dict[str, int] = field(default_factory=dict)
+    purged: dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        parts = [f"{t}: moved {self.moved.get(t, 0)}, purged {self.purged.get(t, 0)}" for t in ARCHIVED]
+        return "; ".join(parts) + f" in {self.seconds:.1f}s"
+
+
+def archive(db_path: str, after_days: int = ARCHIVE_AFTER_DAYS, retain_days: int = ARCHIVE_RETAIN_DAYS,
+            today: Optional[dt.date] = None, vacuum: bool = False) -> ArchiveReport:
+    """
+    Moves Resolved/Closed rows whose completion date (or, if missing, their
+    start date) is older than `after_days` from the hot tables into the
+    archive database, MOVE_BATCH rows per transaction. Rows are copied with
+    INSERT OR IGNORE and committed before being deleted in a second
+    transaction, so a run interrupted between the two steps is repaired by
+    the next one. With `retain_days` > 0, archived
+    rows older than that are purged.
+    """
+    today = today or dt.date.today()
+    cutoff = (today - dt.timedelta(days=after_days)).isoformat()
+    report = ArchiveReport()
+    started = time.perf_counter()
+
+    with Store(db_path) as s:
+        attach_archive(s, db_path)
+        for table, (state_col, done_col, fallback_col, _ddl) in ARCHIVED.items():
+            # Columns added to the hot table by later migrations stay behind.
+            kept = _columns(s, ALIAS, table)
+            cols = ", ".join(c for c in _columns(s, "main", table) if c in kept)
+            pick = (
+                f"SELECT id FROM main.{table} WHERE {state_col} IN ({','.join('?' * len(TERMINAL_STATES))}) "
+                f"AND COALESCE({done_col}, {fallback_col}) < ? LIMIT {MOVE_BATCH}"
+            )
+            moved = 0
+            while True:
+                ids = [r[0] for r in s.all(pick, (*TERMINAL_STATES, cutoff))]
+                if not ids:
+                    break
+                marks = ",".join("?" * len(ids))
+                # Two single-database transactions: a commit spanning attached
+                # databases is not atomic in WAL mode, so the copy is durable
+                # before the originals go. The delete bumps the table's version.
+                s.exec(
+                    f"INSERT OR IGNORE INTO {ALIAS}.{table}({cols}) "
+                    f"SELECT {cols} FROM main.{table} WHERE id IN ({marks})",
+                    tuple(ids),
+                )
+                s.commit()
+                _queue_unrolled(s, table, marks, ids)
+                moved += s.exec(f"DELETE FROM main.{table} WHERE id IN ({marks})", tuple(ids))
+                s.commit()
+            report.moved[table] = moved
+
+            purged = 0
+            if retain_days > 0:
+                purge_cutoff = (today - dt.timedelta(days=retain_days)).isoformat()
+                purged = s.exec(
+                    f"DELETE FROM {ALIAS}.{table} WHERE COALESCE({done_col}, {fallback_col}) < ?",
+                    (purge_cutoff,),
+                )
+                s.commit()
+                if purged:
+                    # No trigger sees the archive: expire cached archived=True reads by hand.
+                    _bump_version(s, table)
+                    s.commit()
+            report.purged[table] = purged
+
+        s.exec("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        if vacuum:
+            s.commit()
+            s.conn.execute("VACUUM main")
+            s.conn.execute(f"VACUUM {ALIAS}")
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _queue_unrolled(s: Store, table: str, marks: str, ids: list[int]) -> None:
+    # Rows inserted since the last rollup fold are read from the hot table
+    # by logic.rollups; queue the ones about to leave it, with the delete.
+    opened, done, state, (d1, d2) = ROLLUPS[table]
+    terminal = ", ".join(f"'{t}'" for t in TERMINAL_STATES)
+    s.exec(
+        f"""INSERT INTO main.rollup_pending(tbl, sign, opened, done, terminal, dim1, dim2)
+            SELECT ?, 1, {opened}, {done}, {state} IN ({terminal}), {d1}, {d2} FROM main.{table}
+            WHERE id IN ({marks}) AND id > (SELECT rolled_id FROM main.table_versions WHERE tbl = ?)""",
+        (table, *ids, table),
+    )
+
+
+def _bump_version(s: Store, table: str) -> None:
+    s.exec("UPDATE main.table_versions SET version = version + 1 WHERE tbl = ?", (table,))
+
+
+def _columns(s: Store, schema: str, table: str) -> list[str]:
+    return [r["name"] for r in s.all(f"PRAGMA {schema}.table_info({table})")]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.archive",
+        description="Move old Resolved/Closed security events and IT requests to the archive database.",
+    )
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--after-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--retain-days", type=int, default=ARCHIVE_RETAIN_DAYS,
+                        help="purge archived rows older than this (0 keeps them forever)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM both databases afterwards")
+    parser.add_argument("--every", type=float, default=0,
+                        help="keep running, compacting every N seconds")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    while True:
+        print(archive(db_path, args.after_days, args.retain_days, vacuum=args.vacuum), flush=True)
+        if args.every <= 0:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
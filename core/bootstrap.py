@@ -1,56 +1,27 @@
 from __future__ import annotations
-import csv
 import os
+import threading
+from core.importer import import_csv
+from core.migrations import BASE_SCHEMA, migrate
 from core.store import Store
 from core.security import ensure_seed_folder, append_user_to_file, USERS_TXT
 
-SCHEMA_SQL = """
-CREATE TABLE IF NOT EXISTS accounts (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  handle TEXT UNIQUE NOT NULL,
-  pass_hash TEXT NOT NULL,
-  access_level TEXT NOT NULL
-);
+SCHEMA_SQL = BASE_SCHEMA
 
-CREATE TABLE IF NOT EXISTS sec_events (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  event_key TEXT UNIQUE NOT NULL,
-  event_kind TEXT NOT NULL,
-  impact TEXT NOT NULL,
-  state TEXT NOT NULL,
-  raised_at TEXT NOT NULL,
-  cleared_at TEXT,
-  owner TEXT NOT NULL,
-  notes TEXT
-);
-
-CREATE TABLE IF NOT EXISTS data_assets (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  asset_name TEXT UNIQUE NOT NULL,
-  steward TEXT NOT NULL,
-  origin TEXT NOT NULL,
-  size_mb REAL NOT NULL,
-  rows_est INTEGER NOT NULL,
-  created_on TEXT NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS it_requests (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  req_key TEXT UNIQUE NOT NULL,
-  topic TEXT NOT NULL,
-  urgency TEXT NOT NULL,
-  phase TEXT NOT NULL,
-  opened_at TEXT NOT NULL,
-  closed_at TEXT,
-  assignee TEXT NOT NULL
-);
-"""
+# Databases already migrated by this process; reruns skip straight past them.
+_READY: set[str] = set()
+_READY_LOCK = threading.Lock()
 
 def ensure_schema(db_path: str) -> None:
-    ensure_seed_folder()
-    with Store(db_path) as s:
-        for stmt in [x.strip() for x in SCHEMA_SQL.split(";") if x.strip()]:
-            s.exec(stmt + ";")
+    key = os.path.abspath(db_path)
+    if key in _READY:
+        return
+    with _READY_LOCK:
+        if key in _READY:
+            return
+        ensure_seed_folder()
+        migrate(db_path)
+        _READY.add(key)
 
 def seed_all(db_path: str, folder: str = "seed") -> None:
     """
@@ -64,9 +35,9 @@ def seed_all(db_path: str, folder: str = "seed") -> None:
 
     with Store(db_path) as s:
         _seed_accounts_from_users_txt(s, os.path.join(folder, "users.txt"))
-        _seed_sec_events(s, os.path.join(folder, "sec_events.csv"))
-        _seed_data_assets(s, os.path.join(folder, "data_assets.csv"))
-        _seed_it_requests(s, os.path.join(folder, "it_requests.csv"))
+
+    for table in ("sec_events", "data_assets", "it_requests"):
+        import_csv(db_path, table, os.path.join(folder, f"{table}.csv"))
 
 def _seed_accounts_from_users_txt(s: Store, path: str) -> None:
     if not os.path.exists(path):
@@ -85,46 +56,6 @@ def _seed_accounts_from_users_txt(s: Store, path: str) -> None:
                 (handle, pass_hash, access),
             )
 
-def _read_csv(path: str) -> list[dict]:
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-
-def _seed_sec_events(s: Store, path: str) -> None:
-    for e in _read_csv(path):
-        s.exec(
-            """INSERT OR IGNORE INTO sec_events(event_key,event_kind,impact,state,raised_at,cleared_at,owner,notes)
-               VALUES(?,?,?,?,?,?,?,?)""",
-            (
-                e["event_key"], e["event_kind"], e["impact"], e["state"],
-                e["raised_at"], e.get("cleared_at") or None,
-                e["owner"], e.get("notes") or "",
-            ),
-        )
-
-def _seed_data_assets(s: Store, path: str) -> None:
-    for a in _read_csv(path):
-        s.exec(
-            """INSERT OR IGNORE INTO data_assets(asset_name,steward,origin,size_mb,rows_est,created_on)
-               VALUES(?,?,?,?,?,?)""",
-            (
-                a["asset_name"], a["steward"], a["origin"],
-                float(a["size_mb"]), int(a["rows_est"]), a["created_on"],
-            ),
-        )
-
-def _seed_it_requests(s: Store, path: str) -> None:
-    for r in _read_csv(path):
-        s.exec(
-            """INSERT OR IGNORE INTO it_requests(req_key,topic,urgency,phase,opened_at,closed_at,assignee)
-               VALUES(?,?,?,?,?,?,?)""",
-            (
-                r["req_key"], r["topic"], r["urgency"], r["phase"],
-                r["opened_at"], r.get("closed_at") or None, r["assignee"],
-            ),
-        )
-
 if __name__ == "__main__":
     # One command to prepare a working demo:
     # 1) write default users into seed/users.txt if missing
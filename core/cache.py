@@ -0,0 +1,115 @@
+from __future__ import annotations
+import functools
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from core.store import Store
+
+CACHE_BUDGET_MB = int(os.getenv("FRAME_CACHE_MB", "256"))
+
+
+def table_versions(db_path: str, tables: tuple[str, ...]) -> tuple:
+    """
+    Current data version of each table. Triggers bump these on every
+    INSERT/UPDATE/DELETE, so writes from any connection or process count.
+    """
+    with Store(db_path) as s:
+        rows = s.all(
+            f"SELECT tbl, version FROM table_versions WHERE tbl IN ({','.join('?' * len(tables))})",
+            tables,
+        )
+    found = {r["tbl"]: r["version"] for r in rows}
+    return tuple(found.get(t, -1) for t in tables)
+
+
+def _sizeof(value: Any) -> int:
+    frame = getattr(value, "frame", value)
+    if hasattr(frame, "memory_usage"):
+        return int(frame.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class FrameCache:
+    """
+    Process-wide LRU of query results, shared by every Streamlit session.
+    An entry is only served while the data versions it was computed at are
+    still current. Cached values are shared, so callers must not mutate them.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget = budget_bytes
+        self._items: OrderedDict[tuple, tuple[tuple, Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, db_path: str, tables: tuple[str, ...], key: tuple,
+                    loader: Callable[[], Any]) -> Any:
+        versions = table_versions(db_path, tables)
+        full_key = (os.path.abspath(db_path),) + key
+        with self._lock:
+            item = self._items.get(full_key)
+            if item is not None and item[0] == versions:
+                self._items.move_to_end(full_key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        value = loader()
+        size = _sizeof(value)
+        with self._lock:
+            old = self._items.pop(full_key, None)
+            if old is not None:
+                self._used -= old[2]
+            if size <= self.budget:
+                self._items[full_key] = (versions, value, size)
+                self._used += size
+                while self._used > self.budget:
+                    _k, (_v, _val, sz) = self._items.popitem(last=False)
+                    self._used -= sz
+                    self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._used = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._used,
+                "budget_bytes": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+CACHE = FrameCache(CACHE_BUDGET_MB * 1024 * 1024)
+
+
+def cached(*tables: str):
+    """
+    Caches a logic-class method (one with a db_path attribute) until one of
+    the given tables is written to.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            key = (fn.__qualname__, repr(args), repr(sorted(kwargs.items())))
+            return CACHE.get_or_load(self.db_path, tables, key, lambda: fn(self, *args, **kwargs))
+        return wrapper
+    return deco
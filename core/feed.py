@@ -0,0 +1,14 @@
+from __future__ import annotations
+from core.store import Store
+
+
+def next_seq(s: Store, table: str) -> int:
+    """
+    Claims the next change sequence number for `table` inside the caller's
+    write transaction. Statements that write rows pass it as updated_seq
+    themselves, so no trigger has to go back and stamp each row; rows
+    written without one are stamped by the triggers (see
+    core.migrations._change_feed).
+    """
+    s.exec("UPDATE table_versions SET seq = seq + 1 WHERE tbl = ?", (table,))
+    return int(s.one("SELECT seq FROM table_versions WHERE tbl = ?", (table,))[0])
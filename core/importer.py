@@ -0,0 +1,207 @@
+from __future__ import annotations
+import argparse
+import csv
+import itertools
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from core.feed import next_seq
+from core.store import Store
+
+CHUNK_ROWS = 5000
+
+
+def _sec_event(e: dict) -> tuple:
+    return (
+        _req(e, "event_key"), _req(e, "event_kind"), _req(e, "impact"), _req(e, "state"),
+        _req(e, "raised_at"), e.get("cleared_at") or None,
+        _req(e, "owner"), e.get("notes") or "",
+    )
+
+
+def _data_asset(a: dict) -> tuple:
+    return (
+        _req(a, "asset_name"), _req(a, "steward"), _req(a, "origin"),
+        float(a["size_mb"]), int(a["rows_est"]), _req(a, "created_on"),
+    )
+
+
+def _it_request(r: dict) -> tuple:
+    return (
+        _req(r, "req_key"), _req(r, "topic"), _req(r, "urgency"), _req(r, "phase"),
+        _req(r, "opened_at"), r.get("closed_at") or None, _req(r, "assignee"),
+    )
+
+
+def _req(row: dict, col: str) -> str:
+    value = (row.get(col) or "").strip()
+    if not value:
+        raise ValueError(f"missing {col}")
+    return value
+
+
+# table -> (INSERT statement, row converter); the statement takes the converted
+# row plus its change sequence (core.feed.next_seq), one per transaction
+TABLES: dict[str, tuple[str, Callable[[dict], tuple]]] = {
+    "sec_events": (
+        """INSERT OR IGNORE INTO sec_events(event_key,event_kind,impact,state,raised_at,cleared_at,owner,notes,
+                                           updated_seq)
+           VALUES(?,?,?,?,?,?,?,?,?)""",
+        _sec_event,
+    ),
+    "data_assets": (
+        """INSERT OR IGNORE INTO data_assets(asset_name,steward,origin,size_mb,rows_est,created_on,updated_seq)
+           VALUES(?,?,?,?,?,?,?)""",
+        _data_asset,
+    ),
+    "it_requests": (
+        """INSERT OR IGNORE INTO it_requests(req_key,topic,urgency,phase,opened_at,closed_at,assignee,updated_seq)
+           VALUES(?,?,?,?,?,?,?,?)""",
+        _it_request,
+    ),
+}
+
+
+@dataclass
+class ImportReport:
+    table: str
+    path: str
+    read: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    resumed_from: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.table}: read {self.read}, inserted {self.inserted}, rejected {self.rejected}"
+            f" (resumed at row {self.resumed_from}) in {self.seconds:.1f}s"
+            f" = {self.rows_per_sec:,.0f} rows/s"
+        )
+
+
+def _chunks(reader: Iterator[dict], size: int) -> Iterator[list[dict]]:
+    while True:
+        chunk = list(itertools.islice(reader, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_csv(db_path: str, table: str, path: str, chunk_rows: int = CHUNK_ROWS,
+               resume: bool = True, rejects_path: Optional[str] = None,
+               progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+    """
+    Streams a CSV into `table` in chunks of `chunk_rows`. Each chunk is one
+    executemany in its own transaction, together with a checkpoint row, so an
+    interrupted import resumes after the last committed chunk as long as the
+    file has not changed. Rows that fail conversion go to `rejects_path`
+    (default: <path>.rejects.csv) with the reason appended.
+    """
+    if table not in TABLES:
+        raise ValueError(f"unknown table {table!r}; expected one of {sorted(TABLES)}")
+    sql, convert = TABLES[table]
+    report = ImportReport(table, path)
+    if not os.path.exists(path):
+        return report
+
+    source = os.path.abspath(path)
+    st = os.stat(path)
+    rejects_path = rejects_path or path + ".rejects.csv"
+    rejects_file = None
+    rejects = None
+    started = time.perf_counter()
+
+    with Store(db_path) as s, open(path, "r", encoding="utf-8", newline="") as f:
+        skip = 0
+        if resume:
+            row = s.one(
+                "SELECT rows_done, file_size, file_mtime FROM import_checkpoints WHERE source=? AND tbl=?",
+                (source, table),
+            )
+            if row and row["file_size"] == st.st_size and row["file_mtime"] == st.st_mtime:
+                skip = int(row["rows_done"])
+        report.resumed_from = skip
+
+        reader = csv.DictReader(f)
+        for _ in itertools.islice(reader, skip):
+            pass
+        done = skip
+
+        try:
+            for chunk in _chunks(reader, chunk_rows):
+                good = []
+                for raw in chunk:
+                    try:
+                        good.append(convert(raw))
+                    except (KeyError, ValueError, TypeError) as e:
+                        if rejects is None:
+                            rejects_file = open(rejects_path, "a", encoding="utf-8", newline="")
+                            rejects = csv.writer(rejects_file)
+                        rejects.writerow([*raw.values(), str(e)])
+                        report.rejected += 1
+
+                if good:
+                    seq = next_seq(s, table)
+                    report.inserted += s.many(sql, [(*r, seq) for r in good])
+                done += len(chunk)
+                report.read += len(chunk)
+                s.exec(
+                    """INSERT INTO import_checkpoints(source, tbl, rows_done, file_size, file_mtime)
+                       VALUES(?,?,?,?,?)
+                       ON CONFLICT(source, tbl) DO UPDATE SET
+                         rows_done=excluded.rows_done,
+                         file_size=excluded.file_size,
+                         file_mtime=excluded.file_mtime""",
+                    (source, table, done, st.st_size, st.st_mtime),
+                )
+                s.commit()
+                report.seconds = time.perf_counter() - started
+                if progress:
+                    progress(report)
+
+            s.exec("DELETE FROM import_checkpoints WHERE source=? AND tbl=?", (source, table))
+        finally:
+            if rejects_file:
+                rejects_file.close()
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.importer",
+        description="Stream a CSV export into the command center database.",
+    )
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("csv_path")
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="rows per transaction")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    parser.add_argument("--rejects", help="where to write rejected rows")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    report = import_csv(
+        db_path, args.table, args.csv_path, chunk_rows=args.chunk,
+        resume=not args.restart, rejects_path=args.rejects,
+        progress=lambda r: print(f"  ... {r.read:,} rows, {r.rows_per_sec:,.0f} rows/s", flush=True),
+    )
+    print(report)
+    if report.rejected:
+        print(f"Rejected rows written to {args.rejects or args.csv_path + '.rejects.csv'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+from __future__ import annotations
+import sqlite3
+from core.store import open_connection
+
+# Numbered, append-only schema migrations. The applied version is kept in
+# PRAGMA user_version; never edit a shipped entry, add a new one instead.
+
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  handle TEXT UNIQUE NOT NULL,
+  pass_hash TEXT NOT NULL,
+  access_level TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sec_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  event_key TEXT UNIQUE NOT NULL,
+  event_kind TEXT NOT NULL,
+  impact TEXT NOT NULL,
+  state TEXT NOT NULL,
+  raised_at TEXT NOT NULL,
+  cleared_at TEXT,
+  owner TEXT NOT NULL,
+  notes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS data_assets (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  asset_name TEXT UNIQUE NOT NULL,
+  steward TEXT NOT NULL,
+  origin TEXT NOT NULL,
+  size_mb REAL NOT NULL,
+  rows_est INTEGER NOT NULL,
+  created_on TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS it_requests (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  req_key TEXT UNIQUE NOT NULL,
+  topic TEXT NOT NULL,
+  urgency TEXT NOT NULL,
+  phase TEXT NOT NULL,
+  opened_at TEXT NOT NULL,
+  closed_at TEXT,
+  assignee TEXT NOT NULL
+);
+"""
+
+QUEUE_INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_sec_events_raised ON sec_events(raised_at);
+CREATE INDEX IF NOT EXISTS ix_sec_events_state ON sec_events(state, raised_at);
+CREATE INDEX IF NOT EXISTS ix_sec_events_impact ON sec_events(impact, raised_at);
+CREATE INDEX IF NOT EXISTS ix_sec_events_owner ON sec_events(owner, raised_at);
+
+CREATE INDEX IF NOT EXISTS ix_data_assets_created ON data_assets(created_on);
+CREATE INDEX IF NOT EXISTS ix_data_assets_steward ON data_assets(steward, created_on);
+CREATE INDEX IF NOT EXISTS ix_data_assets_origin ON data_assets(origin, created_on);
+
+CREATE INDEX IF NOT EXISTS ix_it_requests_opened ON it_requests(opened_at);
+CREATE INDEX IF NOT EXISTS ix_it_requests_phase ON it_requests(phase, opened_at);
+CREATE INDEX IF NOT EXISTS ix_it_requests_urgency ON it_requests(urgency, opened_at);
+CREATE INDEX IF NOT EXISTS ix_it_requests_assignee ON it_requests(assignee, opened_at);
+"""
+
+TRACKED_TABLES = ("accounts", "sec_events", "data_assets", "it_requests")
+
+
+def _version_triggers(tables: tuple[str, ...]) -> str:
+    out = ["CREATE TABLE IF NOT EXISTS table_versions (\n  tbl TEXT PRIMARY KEY,\n  version INTEGER NOT NULL\n);"]
+    for t in tables:
+        out.append(f"INSERT OR IGNORE INTO table_versions(tbl, version) VALUES('{t}', 0);")
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            out.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{t}_v_{op.lower()} AFTER {op} ON {t}\n"
+                f"BEGIN\n  UPDATE table_versions SET version = version + 1 WHERE tbl = '{t}';\nEND;"
+            )
+    return "\n".join(out)
+
+
+IMPORT_CHECKPOINTS = """
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+  source TEXT NOT NULL,
+  tbl TEXT NOT NULL,
+  rows_done INTEGER NOT NULL,
+  file_size INTEGER NOT NULL,
+  file_mtime REAL NOT NULL,
+  PRIMARY KEY (source, tbl)
+);
+"""
+
+ASSET_PROFILES = """
+ALTER TABLE data_assets ADD COLUMN source_path TEXT;
+ALTER TABLE data_assets ADD COLUMN profiled_at TEXT;
+ALTER TABLE data_assets ADD COLUMN profile_bytes INTEGER;
+ALTER TABLE data_assets ADD COLUMN profile_mtime REAL;
+ALTER TABLE data_assets ADD COLUMN column_stats TEXT;
+"""
+
+INGEST_OFFSETS = """
+CREATE TABLE IF NOT EXISTS ingest_offsets (
+  source TEXT PRIMARY KEY,
+  inode INTEGER NOT NULL,
+  pos INTEGER NOT NULL,
+  updated_at TEXT NOT NULL
+);
+"""
+
+INCIDENTS = """
+CREATE TABLE IF NOT EXISTS incidents (
+  id INTEGER PRIMARY KEY,
+  event_kind TEXT NOT NULL,
+  owner TEXT NOT NULL,
+  notes_key TEXT NOT NULL DEFAULT '',
+  first_at TEXT NOT NULL,
+  last_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_incidents_group ON incidents(event_kind, owner, notes_key, first_at);
+CREATE INDEX IF NOT EXISTS ix_incidents_last ON incidents(last_at);
+ALTER TABLE sec_events ADD COLUMN incident_id INTEGER;
+CREATE INDEX IF NOT EXISTS ix_sec_events_incident ON sec_events(incident_id);
+""" + _version_triggers(("incidents",))
+
+# table -> columns indexed for full-text search
+FTS_COLUMNS = {
+    "sec_events": ("event_key", "event_kind", "owner", "notes"),
+    "it_requests": ("req_key", "topic", "assignee"),
+    "data_assets": ("asset_name", "steward", "origin"),
+}
+
+
+def _fts_tables(columns: dict[str, tuple[str, ...]]) -> str:
+    """
+    External-content FTS5 indexes, built from the existing rows. There is
+    no insert trigger: rows with id above table_versions.indexed_id are
+    not indexed yet, and logic.search.index_pending adds them in bulk, off
+    the write path. Updates and deletes go through triggers (only they see
+    the old values an external-content index must be given), but only for
+    rows already in the index. No prefix indexes: they made every write
+    more expensive to save a few ms on 2-3 character prefix queries.
+    """
+    out = ["ALTER TABLE table_versions ADD COLUMN indexed_id INTEGER NOT NULL DEFAULT 0;"]
+    for t, cols in columns.items():
+        names = ", ".join(cols)
+        new = ", ".join(f"new.{c}" for c in cols)
+        old = ", ".join(f"old.{c}" for c in cols)
+        indexed = f"old.id <= (SELECT indexed_id FROM table_versions WHERE tbl = '{t}')"
+        out.append(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {t}_fts USING fts5({names}, content='{t}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2');\n"
+            f"CREATE TRIGGER IF NOT EXISTS trg_{t}_fts_delete AFTER DELETE ON {t}\nWHEN {indexed}\n"
+            f"BEGIN\n  INSERT INTO {t}_fts({t}_fts, rowid, {names}) VALUES ('delete', old.id, {old});\nEND;\n"
+            f"CREATE TRIGGER IF NOT EXISTS trg_{t}_fts_update AFTER UPDATE OF {names} ON {t}\nWHEN {indexed}\n"
+            f"BEGIN\n  INSERT INTO {t}_fts({t}_fts, rowid, {names}) VALUES ('delete', old.id, {old});\n"
+            f"  INSERT INTO {t}_fts(rowid, {names}) VALUES (new.id, {new});\nEND;\n"
+            f"INSERT INTO {t}_fts({t}_fts) VALUES ('rebuild');\n"
+            f"UPDATE table_versions SET indexed_id = (SELECT COALESCE(MAX(id), 0) FROM {t}) WHERE tbl = '{t}';"
+        )
+    return "\n".join(out)
+
+
+ASSISTANT_CACHE = """
+CREATE TABLE IF NOT EXISTS assistant_cache (
+  key TEXT PRIMARY KEY,
+  model TEXT NOT NULL,
+  question TEXT NOT NULL,
+  context_hash TEXT NOT NULL,
+  response TEXT NOT NULL,
+  created_at REAL NOT NULL,
+  last_used_at REAL NOT NULL,
+  hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_assistant_cache_used ON assistant_cache(last_used_at);
+"""
+
+# table -> columns whose changes enter the change feed (all but id and updated_seq;
+# columns added by later migrations must be added to a new trigger there)
+CHANGE_FEED = {
+    "sec_events": ("event_key", "event_kind", "impact", "state", "raised_at", "cleared_at", "owner", "notes",
+                   "incident_id"),
+    "data_assets": ("asset_name", "steward", "origin", "size_mb", "rows_est", "created_on", "source_path",
+                    "profiled_at", "profile_bytes", "profile_mtime", "column_stats"),
+    "it_requests": ("req_key", "topic", "urgency", "phase", "opened_at", "closed_at", "assignee"),
+}
+
+
+def _change_feed(columns: dict[str, tuple[str, ...]]) -> str:
+    """
+    Per-table change sequence: table_versions.seq counts changes and rows
+    carry the one they were last written under in updated_seq. Writers
+    claim a number once per statement (core.feed.next_seq) and set
+    updated_seq in the INSERT/UPDATE itself, so no trigger has to go back
+    and stamp each row; the stamp triggers only catch rows written without
+    one (an INSERT leaving it NULL, an UPDATE leaving it unchanged).
+    Deletes leave no row to stamp, so they record deleted_seq instead.
+    Rows older than the feed keep updated_seq NULL.
+    """
+    out = [
+        "ALTER TABLE table_versions ADD COLUMN seq INTEGER NOT NULL DEFAULT 0;",
+        "ALTER TABLE table_versions ADD COLUMN deleted_seq INTEGER NOT NULL DEFAULT 0;",
+    ]
+    for t, cols in columns.items():
+        stamp = (f"  UPDATE table_versions SET seq = seq + 1 WHERE tbl = '{t}';\n"
+                 f"  UPDATE {t} SET updated_seq = (SELECT seq FROM table_versions WHERE tbl = '{t}') "
+                 f"WHERE id = new.id;")
+        out.append(
+            f"ALTER TABLE {t} ADD COLUMN updated_seq INTEGER;\n"
+            f"CREATE INDEX IF NOT EXISTS ix_{t}_seq ON {t}(updated_seq);\n"
+            f"DROP TRIGGER IF EXISTS trg_{t}_v_update;\n"
+            f"DROP TRIGGER IF EXISTS trg_{t}_v_delete;\n"
+            # Listing the columns keeps a stamp from counting as a change.
+            f"CREATE TRIGGER trg_{t}_v_update AFTER UPDATE OF {', '.join(cols)} ON {t}\n"
+            f"BEGIN\n  UPDATE table_versions SET version = version + 1 WHERE tbl = '{t}';\nEND;\n"
+            f"CREATE TRIGGER trg_{t}_v_delete AFTER DELETE ON {t}\n"
+            f"BEGIN\n  UPDATE table_versions SET version = version + 1, seq = seq + 1, deleted_seq = seq + 1 "
+            f"WHERE tbl = '{t}';\nEND;\n"
+            f"CREATE TRIGGER trg_{t}_seq_insert AFTER INSERT ON {t}\n"
+            f"WHEN new.updated_seq IS NULL\n"
+            f"BEGIN\n{stamp}\nEND;\n"
+            f"CREATE TRIGGER trg_{t}_seq_update AFTER UPDATE OF {', '.join(cols)} ON {t}\n"
+            f"WHEN new.updated_seq IS old.updated_seq\n"
+            f"BEGIN\n{stamp}\nEND;"
+        )
+    return "\n".join(out)
+
+
+TERMINAL_STATES = ("Resolved", "Closed")
+
+# table -> (arrival date, completion date, state column, rollup dimensions)
+ROLLUPS = {
+    "sec_events": ("raised_at", "cleared_at", "state", ("impact", "owner")),
+    "it_requests": ("opened_at", "closed_at", "phase", ("urgency", "assignee")),
+}
+
+
+def _rollups(tables: dict[str, tuple[str, str, str, tuple[str, str]]]) -> str:
+    """
+    Daily rollup tables plus rollup_pending. Rows with id above
+    table_versions.rolled_id are not in the rollups yet; logic.rollups.fold
+    reads them straight from the table in bulk, so inserts cost nothing
+    here and the first fold is also the backfill. Updates to rows already
+    folded queue a (-1 retracted, +1 new) pair, since only a trigger sees
+    the old values. Deletes are not queued: archiving moves rows out of the
+    hot tables without taking them out of history. Rows entering a
+    terminal state without a completion date get today's.
+    """
+    terminal = ", ".join(f"'{s}'" for s in TERMINAL_STATES)
+    out = ["""
+CREATE TABLE IF NOT EXISTS rollup_pending (
+  id INTEGER PRIMARY KEY,
+  tbl TEXT NOT NULL,
+  sign INTEGER NOT NULL,
+  opened TEXT,
+  done TEXT,
+  terminal INTEGER NOT NULL,
+  dim1 TEXT,
+  dim2 TEXT
+);
+CREATE TABLE IF NOT EXISTS rollup_daily (
+  tbl TEXT NOT NULL,
+  dim TEXT NOT NULL,
+  value TEXT NOT NULL,
+  day TEXT NOT NULL,
+  arrived INTEGER NOT NULL DEFAULT 0,
+  closed INTEGER NOT NULL DEFAULT 0,
+  ttr_n INTEGER NOT NULL DEFAULT 0,
+  ttr_sum REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (tbl, dim, value, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_ttr_hist (
+  tbl TEXT NOT NULL,
+  dim TEXT NOT NULL,
+  value TEXT NOT NULL,
+  day TEXT NOT NULL,
+  bucket INTEGER NOT NULL,
+  n INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (tbl, dim, value, day, bucket)
+) WITHOUT ROWID;
+ALTER TABLE table_versions ADD COLUMN rolled_id INTEGER NOT NULL DEFAULT 0;
+""" + _version_triggers(("rollup_daily",))]
+    for t, (opened, done, state, (d1, d2)) in tables.items():
+        def row(side: str, sign: int) -> str:
+            return (f"INSERT INTO rollup_pending(tbl, sign, opened, done, terminal, dim1, dim2) VALUES "
+                    f"('{t}', {sign}, {side}.{opened}, {side}.{done}, {side}.{state} IN ({terminal}), "
+                    f"{side}.{d1}, {side}.{d2});")
+        changed = " OR ".join(
+            [f"old.{c} IS NOT new.{c}" for c in (opened, done, d1, d2)]
+            + [f"(old.{state} IN ({terminal})) IS NOT (new.{state} IN ({terminal}))"]
+        )
+        out.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{t}_rollup_update AFTER UPDATE OF {opened}, {done}, {state}, {d1}, {d2} ON {t}\n"
+            f"WHEN old.id <= (SELECT rolled_id FROM table_versions WHERE tbl = '{t}') AND ({changed})\n"
+            f"BEGIN\n  {row('old', -1)}\n  {row('new', 1)}\nEND;\n"
+            f"CREATE TRIGGER IF NOT EXISTS trg_{t}_resolved AFTER UPDATE OF {state} ON {t}\n"
+            f"WHEN new.{state} IN ({terminal}) AND old.{state} NOT IN ({terminal}) AND new.{done} IS NULL\n"
+            f"BEGIN\n  UPDATE {t} SET {done} = date('now', 'localtime') WHERE id = new.id;\nEND;"
+        )
+    return "\n".join(out)
+
+
+# table -> (state column, start date, severity column, owner column)
+TRIAGE = {
+    "sec_events": ("state", "raised_at", "impact", "owner"),
+    "it_requests": ("phase", "opened_at", "urgency", "assignee"),
+}
+# How many days of waiting each severity level is worth.
+TRIAGE_WEIGHT_DAYS = {"Critical": 14, "High": 7, "Medium": 2, "Low": 0}
+
+
+def _triage(tables: dict[str, tuple[str, str, str, str]]) -> str:
+    """
+    triage_key = julianday(start) - severity weight in days, NULL once the
+    row is terminal. Priority now is age + weight = julianday('now') -
+    triage_key, so ascending triage_key is highest priority first at any
+    moment and never needs recomputing. A virtual generated column is
+    right on every write path; partial indexes keep only live rows.
+    """
+    terminal = ", ".join(f"'{s}'" for s in TERMINAL_STATES)
+    out = []
+    for t, (state, start, severity, owner) in tables.items():
+        weight = " ".join(f"WHEN '{k}' THEN {v}" for k, v in TRIAGE_WEIGHT_DAYS.items())
+        out.append(
+            f"ALTER TABLE {t} ADD COLUMN triage_key REAL GENERATED ALWAYS AS (\n"
+            f"  CASE WHEN {state} IN ({terminal}) THEN NULL\n"
+            f"  ELSE julianday({start}) - CASE {severity} {weight} ELSE 0 END END) VIRTUAL;\n"
+            f"CREATE INDEX IF NOT EXISTS ix_{t}_triage ON {t}(triage_key) WHERE triage_key IS NOT NULL;\n"
+            f"CREATE INDEX IF NOT EXISTS ix_{t}_triage_{owner} ON {t}({owner}, triage_key) WHERE triage_key IS NOT NULL;"
+        )
+    return "\n".join(out)
+
+
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (1, "base schema", BASE_SCHEMA),
+    (2, "queue indexes", QUEUE_INDEXES),
+    (3, "table data versions", _version_triggers(TRACKED_TABLES)),
+    (4, "import checkpoints", IMPORT_CHECKPOINTS),
+    (5, "asset profiles", ASSET_PROFILES),
+    (6, "ingest offsets", INGEST_OFFSETS),
+    (7, "incident clusters", INCIDENTS),
+    (8, "full-text search", _fts_tables(FTS_COLUMNS)),
+    (9, "assistant response cache", ASSISTANT_CACHE),
+    (10, "change feed", _change_feed(CHANGE_FEED)),
+    (11, "daily rollups", _rollups(ROLLUPS)),
+    (12, "triage priority", _triage(TRIAGE)),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(db_path: str) -> int:
+    conn = open_connection(db_path)
+    try:
+        return int(conn.execute("PRAGMA user_version").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def migrate(db_path: str) -> list[int]:
+    """
+    Applies every migration newer than the database's user_version, each in
+    its own IMMEDIATE transaction so concurrent processes apply it once.
+    Returns the versions applied by this call.
+    """
+    applied: list[int] = []
+    conn = open_connection(db_path)
+    conn.isolation_level = None
+    try:
+        for version, _name, sql in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                have = int(conn.execute("PRAGMA user_version").fetchone()[0])
+                if have >= version:
+                    conn.execute("COMMIT")
+                    continue
+                for stmt in _split(sql):
+                    conn.execute(stmt)
+                conn.execute(f"PRAGMA user_version={int(version)}")
+                conn.execute("COMMIT")
+                applied.append(version)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+    return applied
+
+
+def _split(sql: str) -> list[str]:
+    # sqlite3.complete_statement keeps trigger bodies (which contain ';') whole.
+    out, buf = [], ""
+    for line in sql.splitlines(keepends=True):
+        buf += line
+        if buf.strip() and sqlite3.complete_statement(buf):
+            out.append(buf.strip())
+            buf = ""
+    if buf.strip():
+        out.append(buf.strip())
+    return out
+
+
+if __name__ == "__main__":
+    from config import CFG
+    done = migrate(CFG.db_path)
+    print(f"Schema at version {LATEST}" + (f" (applied {done})." if done else "."))
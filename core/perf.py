@@ -0,0 +1,171 @@
+from __future__ import annotations
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+PERF_JSONL = os.getenv("PERF_JSONL", "").strip()  # optional append-only export
+KEEP_SPANS = 20000
+
+log = logging.getLogger("ops.perf")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Plumbing frames skipped when attributing a statement to its caller.
+_SKIP_FILES = {os.path.join(_HERE, f) for f in ("store.py", "perf.py", "cache.py", "writer.py")} | {
+    os.path.join(os.path.dirname(_HERE), "logic", "frames.py"),
+}
+
+
+@dataclass
+class Span:
+    run: Optional[int]
+    kind: str          # sql | frame | chart | http | view | profile | ingest | correlate | search | rollup
+    name: str
+    ms: float
+    rows: Optional[int] = None
+    site: str = ""
+    at: float = 0.0
+
+
+@dataclass
+class Run:
+    id: int
+    label: str
+    started: float
+    ms: float = 0.0
+
+
+def call_site() -> str:
+    """First stack frame outside the storage/perf plumbing, as file:line (func)."""
+    f = sys._getframe(1)
+    while f is not None and os.path.abspath(f.f_code.co_filename) in _SKIP_FILES:
+        f = f.f_back
+    if f is None:
+        return ""
+    return f"{os.path.relpath(f.f_code.co_filename)}:{f.f_lineno} ({f.f_code.co_name})"
+
+
+class PerfRecorder:
+    """
+    In-process ring buffer of timing spans. Spans recorded while a run is
+    active (one Streamlit rerun or fragment rerun) are tagged with its id so
+    the admin panel can break a rerun down by SQL, frames, charts and HTTP.
+    """
+
+    def __init__(self, keep: int = KEEP_SPANS):
+        self.spans: deque[Span] = deque(maxlen=keep)
+        self.runs: deque[Run] = deque(maxlen=200)
+        self._ids = itertools.count(1)
+        self._current: contextvars.ContextVar[Optional[Run]] = contextvars.ContextVar("perf_run", default=None)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def run(self, label: str) -> Iterator[Optional[Run]]:
+        if self._current.get() is not None:  # nested: fold into the outer run
+            yield self._current.get()
+            return
+        r = Run(next(self._ids), label, time.time())
+        token = self._current.set(r)
+        t0 = time.perf_counter()
+        try:
+            yield r
+        finally:
+            r.ms = (time.perf_counter() - t0) * 1000
+            self._current.reset(token)
+            with self._lock:
+                self.runs.append(r)
+
+    def record(self, kind: str, name: str, ms: float, rows: Optional[int] = None,
+               site: Optional[str] = None) -> None:
+        current = self._current.get()
+        span = Span(current.id if current else None, kind, name, ms, rows,
+                    site if site is not None else call_site(), time.time())
+        with self._lock:
+            self.spans.append(span)
+        if kind == "sql" and ms >= SLOW_QUERY_MS:
+            log.warning("slow query %.1f ms (%s rows) at %s: %s", ms, rows, span.site, name)
+        if PERF_JSONL:
+            self._append_jsonl(span)
+
+    @contextmanager
+    def span(self, kind: str, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, (time.perf_counter() - t0) * 1000)
+
+    def timed(self, kind: str, name: Optional[str] = None):
+        def deco(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(kind, label):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def as_run(self, label: str):
+        """Decorator: each call is a run (unless already inside one) and a view span."""
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.run(label), self.span("view", label):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    # Reporting
+    def recent_runs(self, n: int = 20) -> list[Run]:
+        with self._lock:
+            return list(self.runs)[-n:][::-1]
+
+    def run_spans(self, run_id: int) -> list[Span]:
+        with self._lock:
+            return [s for s in self.spans if s.run == run_id]
+
+    def top_queries(self, n: int = 10) -> list[dict]:
+        agg: dict[str, dict] = {}
+        with self._lock:
+            spans = [s for s in self.spans if s.kind == "sql"]
+        for s in spans:
+            a = agg.setdefault(" ".join(s.name.split()), {"calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                                          "rows": 0, "site": s.site})
+            a["calls"] += 1
+            a["total_ms"] += s.ms
+            a["rows"] += s.rows or 0
+            if s.ms > a["max_ms"]:
+                a["max_ms"], a["site"] = s.ms, s.site
+        out = [{"sql": k, **v, "mean_ms": v["total_ms"] / v["calls"]} for k, v in agg.items()]
+        out.sort(key=lambda d: d["max_ms"], reverse=True)
+        return out[:n]
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            spans = list(self.spans)
+        return "".join(json.dumps(asdict(s)) + "\n" for s in spans)
+
+    def _append_jsonl(self, span: Span) -> None:
+        try:
+            with open(PERF_JSONL, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(span)) + "\n")
+        except OSError as e:
+            log.debug("perf export failed: %s", e)
+
+
+RECORDER = PerfRecorder()
+run = RECORDER.run
+span = RECORDER.span
+timed = RECORDER.timed
+as_run = RECORDER.as_run
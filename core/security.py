@@ -1,21 +1,61 @@
 from __future__ import annotations
 import os
-import bcrypt
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
 
 SEED_DIR = "seed"
 USERS_TXT = os.path.join(SEED_DIR, "users.txt")
 
-def make_hash(plain: str) -> str:
-    salt = bcrypt.gensalt()
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = os.cpu_count() or 2
+PARALLEL_MIN_HASHES = 4   # below this a process pool costs more than it saves
+
+def make_hash(plain: str, rounds: Optional[int] = None) -> str:
+    import bcrypt  # deferred so importing core.bootstrap stays cheap
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(plain.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
 def check_hash(plain: str, stored_hash: str) -> bool:
+    import bcrypt
     return bcrypt.checkpw(plain.encode("utf-8"), stored_hash.encode("utf-8"))
 
+def hash_cost(stored_hash: str) -> int:
+    """Work factor of a `$2b$12$...` hash (0 if it is not one)."""
+    parts = stored_hash.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else 0
+
+def needs_rehash(stored_hash: str, rounds: Optional[int] = None) -> bool:
+    return hash_cost(stored_hash) != (rounds or BCRYPT_ROUNDS)
+
+def _hash_one(args: tuple[str, int]) -> str:
+    return make_hash(*args)
+
+def hash_many(passwords: list[str], rounds: Optional[int] = None, workers: int = HASH_WORKERS) -> list[str]:
+    """make_hash for each password, in order, spread across a process pool."""
+    jobs = [(p, rounds or BCRYPT_ROUNDS) for p in passwords]
+    if len(jobs) < PARALLEL_MIN_HASHES or workers <= 1:
+        return [_hash_one(j) for j in jobs]
+    workers = min(workers, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_hash_one, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
 def ensure_seed_folder() -> None:
     os.makedirs(SEED_DIR, exist_ok=True)
 
+def read_handles(path: str = USERS_TXT) -> set[str]:
+    """Handles already in the users file, read once."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.split(",", 1)[0].strip() for line in f if line.strip()}
+
+def append_users_to_file(rows: Iterable[tuple[str, str, str]], path: str = USERS_TXT) -> None:
+    """Appends already-hashed (handle, pass_hash, access_level) lines in one write."""
+    ensure_seed_folder()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(f"{h},{p},{a}\n" for h, p, a in rows))
+
 def append_user_to_file(handle: str, password: str, access_level: str) -> None:
     """
     File persistence format:
@@ -27,15 +67,8 @@ def append_user_to_file(handle: str, password: str, access_level: str) -> None:
     if not handle or not password or not access_level:
         raise ValueError("handle/password/access_level required")
 
-    pass_hash = make_hash(password)
-
-    # prevent duplicate handle lines (simple scan)
-    if os.path.exists(USERS_TXT):
-        with open(USERS_TXT, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = [p.strip() for p in line.strip().split(",")]
-                if len(parts) >= 1 and parts[0] == handle:
-                    return
+    # prevent duplicate handle lines, before paying for the hash
+    if handle in read_handles():
+        return
 
-    with open(USERS_TXT, "a", encoding="utf-8") as f:
-        f.write(f"{handle},{pass_hash},{access_level}\n")
+    append_users_to_file([(handle, make_hash(password), access_level)])
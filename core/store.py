@@ -1,36 +1,243 @@
+import os
+import queue
 import sqlite3
-from typing import Any, Iterable, Optional
+import threading
+import time
+from typing import Any, Iterable, Iterator, Optional
+
+from core.perf import RECORDER
+
+# Pool tuning. Every pooled connection is opened once with these pragmas and
+# then reused across Streamlit script threads until it is recycled.
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+PAGE_CACHE_KIB = 16 * 1024
+MMAP_BYTES = 256 * 1024 * 1024
+IDLE_PING_S = 30.0    # ping connections that sat idle longer than this
+MAX_AGE_S = 15 * 60.0  # close and reopen connections older than this
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{PAGE_CACHE_KIB}",
+    f"PRAGMA mmap_size={MMAP_BYTES}",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+def open_connection(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class _Lease:
+    __slots__ = ("conn", "born", "last_used")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.born = time.monotonic()
+        self.last_used = self.born
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of tuned connections to one SQLite file.
+    Connections are handed to one thread at a time, so sharing them across
+    Streamlit's script threads is safe even though sqlite3 objects are not.
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[_Lease]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+
+    def acquire(self) -> _Lease:
+        while True:
+            try:
+                lease = self._idle.get_nowait()
+            except queue.Empty:
+                lease = self._grow() or self._wait()
+            if self._healthy(lease):
+                return lease
+            self._discard(lease)
+
+    def release(self, lease: _Lease, broken: bool = False) -> None:
+        if not broken and lease.conn.in_transaction:
+            try:
+                lease.conn.rollback()
+            except sqlite3.Error:
+                broken = True
+        if broken:
+            self._discard(lease)
+            return
+        lease.last_used = time.monotonic()
+        self._idle.put(lease)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _grow(self) -> Optional[_Lease]:
+        with self._lock:
+            if self._open >= self.size:
+                return None
+            self._open += 1
+        try:
+            return _Lease(open_connection(self.path))
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            raise
+
+    def _wait(self) -> _Lease:
+        try:
+            return self._idle.get(timeout=BUSY_TIMEOUT_MS / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"connection pool exhausted ({self.size} in use) for {self.path}"
+            ) from None
+
+    def _healthy(self, lease: _Lease) -> bool:
+        now = time.monotonic()
+        if now - lease.born > MAX_AGE_S:
+            return False
+        if now - lease.last_used > IDLE_PING_S:
+            try:
+                lease.conn.execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                return False
+        return True
+
+    def _discard(self, lease: _Lease) -> None:
+        try:
+            lease.conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+
+
+_POOLS: dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def pool_for(path: str) -> ConnectionPool:
+    key = os.path.abspath(path)
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.setdefault(key, ConnectionPool(path))
+    return pool
+
+
+def close_pools() -> None:
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
+
 
 class Store:
     def __init__(self, path: str):
         self.path = path
         self.conn: Optional[sqlite3.Connection] = None
+        self._lease: Optional[_Lease] = None
+
+    @classmethod
+    def bound(cls, path: str, conn: sqlite3.Connection) -> "Store":
+        """A Store over a connection someone else owns (no pooling, no commit on exit)."""
+        s = cls(path)
+        s.conn = conn
+        return s
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.path)
-        self.conn.row_factory = sqlite3.Row
+        self._lease = pool_for(self.path).acquire()
+        self.conn = self._lease.conn
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        if self.conn:
+        lease, self._lease = self._lease, None
+        self.conn = None
+        if lease is None:
+            return
+        broken = False
+        try:
             if exc is None:
-                self.conn.commit()
-            self.conn.close()
+                lease.conn.commit()
+            else:
+                lease.conn.rollback()
+        except sqlite3.Error:
+            broken = True
+            raise
+        finally:
+            pool_for(self.path).release(lease, broken=broken)
+
+    def commit(self) -> None:
+        assert self.conn is not None
+        self.conn.commit()
 
-    def exec(self, sql: str, params: tuple = ()) -> None:
+    def exec(self, sql: str, params: tuple = ()) -> int:
         assert self.conn is not None
-        self.conn.execute(sql, params)
+        t0 = time.perf_counter()
+        n = self.conn.execute(sql, params).rowcount
+        _timed(sql, t0, n)
+        return n
 
-    def many(self, sql: str, params_list: Iterable[tuple]) -> None:
+    def many(self, sql: str, params_list: Iterable[tuple]) -> int:
         assert self.conn is not None
-        self.conn.executemany(sql, params_list)
+        t0 = time.perf_counter()
+        n = self.conn.executemany(sql, params_list).rowcount
+        _timed(sql, t0, n)
+        return n
 
     def one(self, sql: str, params: tuple = ()) -> Any:
         assert self.conn is not None
-        cur = self.conn.execute(sql, params)
-        return cur.fetchone()
+        t0 = time.perf_counter()
+        row = self.conn.execute(sql, params).fetchone()
+        _timed(sql, t0, 0 if row is None else 1)
+        return row
 
     def all(self, sql: str, params: tuple = ()) -> list[Any]:
         assert self.conn is not None
-        cur = self.conn.execute(sql, params)
-        return cur.fetchall()
+        t0 = time.perf_counter()
+        rows = self.conn.execute(sql, params).fetchall()
+        _timed(sql, t0, len(rows))
+        return rows
+
+    def chunks(self, sql: str, params: tuple = (),
+               size: int = 10000) -> Iterator[tuple[list[str], list[Any]]]:
+        """
+        Yields (column names, rows) in fetchmany() batches instead of one big
+        list. The first batch is always yielded, empty if there are no rows.
+        """
+        assert self.conn is not None
+        t0 = time.perf_counter()
+        cur = self.conn.cursor()
+        cur.row_factory = None  # plain tuples: cheaper than sqlite3.Row for bulk reads
+        cur.execute(sql, params)
+        names = [d[0] for d in cur.description]
+        n = 0
+        try:
+            batch = cur.fetchmany(size)
+            while True:
+                n += len(batch)
+                yield names, batch
+                batch = cur.fetchmany(size)
+                if not batch:
+                    return
+        finally:
+            _timed(sql, t0, n)
+
+
+def _timed(sql: str, t0: float, rows: int) -> None:
+    RECORDER.record("sql", sql.strip(), (time.perf_counter() - t0) * 1000, rows)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, TypeVar
+
+from core.store import Store, open_connection
+
+T = TypeVar("T")
+
+BATCH_MAX = 64        # commands folded into one transaction
+LINGER_S = 0.002      # how long to wait for more commands once one arrived
+RESULT_TIMEOUT_S = 30.0
+
+log = logging.getLogger("ops.writer")
+
+
+class Writer:
+    """
+    Serializes all writes to one SQLite file through a single long-lived
+    connection owned by a background thread. Commands are callables taking a
+    Store; they run in arrival order, several per transaction (group commit),
+    each inside its own SAVEPOINT so one failing command does not undo the
+    others. Callers get the command's return value through a Future once the
+    batch has committed. If the batch itself fails (the connection cannot be
+    opened, SQLite rolled the transaction back under it), every command in it
+    gets the error and the thread carries on with a clean connection.
+    """
+
+    def __init__(self, path: str, batch_max: int = BATCH_MAX, linger_s: float = LINGER_S):
+        self.path = path
+        self.batch_max = batch_max
+        self.linger_s = linger_s
+        self._q: "queue.Queue[tuple[Callable[[Store], Any], Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"writer:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[[Store], T]) -> "Future[T]":
+        fut: Future = Future()
+        self._q.put((fn, fut))
+        return fut
+
+    def _loop(self) -> None:
+        conn, store = None, None
+        while True:
+            batch = [self._q.get()]
+            while len(batch) < self.batch_max:
+                try:
+                    batch.append(self._q.get(timeout=self.linger_s))
+                except queue.Empty:
+                    break
+            try:
+                if conn is None:
+                    conn, store = self._connect()
+                self._run_batch(conn, store, batch)
+            except Exception as e:
+                # The thread outlives any one batch: fail what is left of it,
+                # get the connection back to a clean state and keep serving.
+                log.warning("writer batch failed on %s: %s", self.path, e)
+                for _fn, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                conn = self._recover(conn)
+
+    def _connect(self) -> tuple[sqlite3.Connection, Store]:
+        conn = open_connection(self.path)
+        conn.isolation_level = None  # transactions are managed explicitly below
+        # Savepoint and statement journals go to temp storage. Kept in memory
+        # (the reader default), every trigger-firing statement inside a
+        # SAVEPOINT got slower as the database grew; on file they stay flat.
+        conn.execute("PRAGMA temp_store=FILE")
+        return conn, Store.bound(self.path, conn)
+
+    @staticmethod
+    def _recover(conn: Optional[sqlite3.Connection]) -> Optional[sqlite3.Connection]:
+        """Rolls back whatever is open; None (reopen next batch) if the connection is unusable."""
+        if conn is None:
+            return None
+        try:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.execute("SELECT 1").fetchone()
+            return conn
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return None
+
+    def _run_batch(self, conn, store: Store, batch) -> None:
+        results: list[tuple[Future, bool, Any]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            for _fn, fut in batch:
+                fut.set_exception(e)
+            return
+
+        for fn, fut in batch:
+            if not fut.set_running_or_notify_cancel():
+                continue
+            conn.execute("SAVEPOINT cmd")
+            try:
+                value = fn(store)
+                conn.execute("RELEASE cmd")
+                results.append((fut, True, value))
+            except BaseException as e:
+                conn.execute("ROLLBACK TO cmd")
+                conn.execute("RELEASE cmd")
+                results.append((fut, False, e))
+
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            for fut, _ok, _v in results:
+                fut.set_exception(e)
+            return
+
+        for fut, ok, value in results:
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
+
+
+_WRITERS: dict[str, Writer] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def writer_for(path: str) -> Writer:
+    key = os.path.abspath(path)
+    w = _WRITERS.get(key)
+    if w is None:
+        with _WRITERS_LOCK:
+            w = _WRITERS.get(key)
+            if w is None:
+                w = _WRITERS[key] = Writer(path)
+    return w
+
+
+def write(path: str, fn: Callable[[Store], T], timeout: Optional[float] = RESULT_TIMEOUT_S) -> T:
+    """Runs `fn` on the database's writer thread and waits for the commit."""
+    return writer_for(path).submit(fn).result(timeout=timeout)
@@ -1,15 +1,156 @@
+from __future__ import annotations
+import argparse
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
 from core.store import Store
-from core.security import check_hash
+from core.security import (
+    BCRYPT_ROUNDS, HASH_WORKERS, USERS_TXT, append_users_to_file, check_hash, hash_many,
+    make_hash, needs_rehash, read_handles,
+)
+from core.writer import write, writer_for
+
+# bcrypt releases the GIL, so a few threads check passwords in parallel while
+# the cap keeps a burst of sign-ins from taking every core from dashboard reruns.
+LOGIN_WORKERS = int(os.getenv("LOGIN_WORKERS", "2"))
+LOGIN_QUEUE = int(os.getenv("LOGIN_QUEUE", "16"))     # waiting attempts before new ones are turned away
+LOGIN_TIMEOUT_S = 30.0
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(LOGIN_WORKERS + LOGIN_QUEUE)
+
+
+class LoginBusy(RuntimeError):
+    pass
+
+
+def _login_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix="login")
+    return _pool
+
+
+@dataclass
+class ProvisionReport:
+    added: int = 0
+    existing: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"added {self.added} accounts, {self.existing} already existed, "
+            f"{self.invalid} invalid in {self.seconds:.2f}s"
+        )
+
 
 class Accounts:
     def __init__(self, db_path: str):
         self.db_path = db_path
 
     def authenticate(self, handle: str, password: str) -> dict | None:
+        """
+        Checks the password on the login pool. Raises LoginBusy when
+        LOGIN_WORKERS + LOGIN_QUEUE attempts are already under way.
+        """
+        if not _slots.acquire(blocking=False):
+            raise LoginBusy("Too many sign-in attempts right now. Try again in a moment.")
+        try:
+            fut = _login_pool().submit(self._verify, handle, password)
+        except BaseException:
+            _slots.release()
+            raise
+        fut.add_done_callback(lambda _f: _slots.release())
+        try:
+            return fut.result(timeout=LOGIN_TIMEOUT_S)
+        except FutureTimeout:
+            raise LoginBusy("Sign-in is taking too long. Try again in a moment.") from None
+
+    def _verify(self, handle: str, password: str) -> dict | None:
         with Store(self.db_path) as s:
             row = s.one("SELECT id, handle, pass_hash, access_level FROM accounts WHERE handle=?", (handle,))
             if not row:
                 return None
             if not check_hash(password, row["pass_hash"]):
                 return None
-            return {"id": row["id"], "handle": row["handle"], "access_level": row["access_level"]}
+        if needs_rehash(row["pass_hash"]):
+            # The password is known only now: move it to the configured cost.
+            new_hash = make_hash(password)
+            writer_for(self.db_path).submit(lambda s: s.exec(
+                "UPDATE accounts SET pass_hash=? WHERE id=? AND pass_hash=?",
+                (new_hash, row["id"], row["pass_hash"])))
+        return {"id": row["id"], "handle": row["handle"], "access_level": row["access_level"]}
+
+    def provision(self, users: Iterable[tuple[str, str, str]], users_txt: str = USERS_TXT,
+                  rounds: int = BCRYPT_ROUNDS, workers: int = HASH_WORKERS) -> ProvisionReport:
+        """
+        Adds (handle, password, access_level) users missing from both the
+        users file and the accounts table. Existing handles are indexed once,
+        passwords are hashed across a process pool, and the file and table
+        are each written in one batch.
+        """
+        report = ProvisionReport()
+        started = time.perf_counter()
+        with Store(self.db_path) as s:
+            known = read_handles(users_txt) | {r[0] for r in s.all("SELECT handle FROM accounts")}
+
+        new: list[tuple[str, str, str]] = []
+        for handle, password, access in users:
+            handle, access = (handle or "").strip(), (access or "").strip()
+            if not handle or not password or not access or "," in handle or "," in access:
+                report.invalid += 1
+            elif handle in known:
+                report.existing += 1
+            else:
+                known.add(handle)
+                new.append((handle, password, access))
+
+        if new:
+            hashes = hash_many([p for _h, p, _a in new], rounds, workers)
+            rows = [(h, pw_hash, a) for (h, _p, a), pw_hash in zip(new, hashes)]
+            write(self.db_path, lambda s: s.many(
+                "INSERT OR IGNORE INTO accounts(handle, pass_hash, access_level) VALUES(?,?,?)", rows))
+            append_users_to_file(rows, users_txt)
+            report.added = len(rows)
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+def read_users_csv(path: str) -> Iterable[tuple[str, str, str]]:
+    """handle,password,access_level rows (the users_seed.csv layout)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            yield r.get("handle") or "", r.get("password") or "", r.get("access_level") or ""
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.accounts",
+        description="Provision accounts in bulk from a handle,password,access_level CSV.",
+    )
+    parser.add_argument("csv", help="CSV with handle,password,access_level columns")
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--users-txt", default=USERS_TXT, help="users file to append to")
+    parser.add_argument("--rounds", type=int, default=BCRYPT_ROUNDS, help="bcrypt cost")
+    parser.add_argument("--workers", type=int, default=HASH_WORKERS, help="hashing processes")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    print(Accounts(db_path).provision(read_users_csv(args.csv), args.users_txt, args.rounds, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+import pandas as pd
+from core.cache import cached
+from core.store import Store
+from logic.frames import materialize
+
+HIGH_IMPACT = ("High", "Critical")
+
+
+class QueueStats:
+    """
+    Dashboard KPIs and chart inputs computed with GROUP BY in SQLite, so the
+    result size depends on the number of categories rather than on rows.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def group_counts(self, table: str, by: list[str]) -> pd.DataFrame:
+        cols = ", ".join(by)
+        sql = f"SELECT {cols}, COUNT(*) AS n FROM {table} GROUP BY {cols} ORDER BY n DESC"
+        return materialize(self.db_path, sql)
+
+    # Security queue
+    @cached("sec_events")
+    def security_kpis(self) -> dict:
+        with Store(self.db_path) as s:
+            row = s.one(
+                """SELECT COUNT(*) AS total,
+                          COALESCE(SUM(state = 'Open'), 0) AS open,
+                          COALESCE(SUM(state = 'In Progress'), 0) AS in_progress,
+                          COALESCE(SUM(impact IN (?, ?)), 0) AS high_critical
+                   FROM sec_events""",
+                HIGH_IMPACT,
+            )
+        return dict(row)
+
+    @cached("sec_events")
+    def security_by_impact_state(self) -> pd.DataFrame:
+        return self.group_counts("sec_events", ["impact", "state"])
+
+    @cached("sec_events")
+    def security_by_kind(self) -> pd.DataFrame:
+        return self.group_counts("sec_events", ["event_kind"])
+
+    # Data registry
+    @cached("data_assets")
+    def data_totals(self) -> dict:
+        with Store(self.db_path) as s:
+            row = s.one(
+                """SELECT COUNT(*) AS assets,
+                          COALESCE(SUM(size_mb), 0) AS size_mb,
+                          COALESCE(SUM(rows_est), 0) AS rows_est
+                   FROM data_assets"""
+            )
+        return dict(row)
+
+    @cached("data_assets")
+    def data_by_origin(self) -> pd.DataFrame:
+        return self.group_counts("data_assets", ["origin"])
+
+    @cached("data_assets")
+    def data_largest(self, n: int = 8) -> pd.DataFrame:
+        return materialize(
+            self.db_path, "SELECT asset_name, size_mb FROM data_assets ORDER BY size_mb DESC LIMIT ?", (int(n),)
+        )
+
+    # Service desk
+    @cached("it_requests")
+    def it_kpis(self) -> dict:
+        with Store(self.db_path) as s:
+            row = s.one(
+                """SELECT COUNT(*) AS total,
+                          COALESCE(SUM(phase = 'Open'), 0) AS open,
+                          COALESCE(SUM(phase = 'In Progress'), 0) AS in_progress,
+                          COALESCE(SUM(phase = 'Resolved'), 0) AS resolved
+                   FROM it_requests"""
+            )
+        return dict(row)
+
+    @cached("it_requests")
+    def it_by_urgency_phase(self) -> pd.DataFrame:
+        return self.group_counts("it_requests", ["urgency", "phase"])
+
+    @cached("it_requests")
+    def it_by_topic(self) -> pd.DataFrame:
+        return self.group_counts("it_requests", ["topic"])
@@ -1,27 +1,59 @@
-import requests
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
 from config import CFG
+from core.perf import RECORDER, span
+from logic.assistant_cache import Answer, Reply, ResponseCache
+
+HTTP_POOL_SIZE = int(os.getenv("ASSISTANT_HTTP_POOL", "8"))
+HTTP_RETRIES = int(os.getenv("ASSISTANT_HTTP_RETRIES", "3"))
+HTTP_BACKOFF_S = 0.5          # 0.5s, 1s, 2s ... between retries (Retry-After wins when sent)
+CONNECT_TIMEOUT_S = 10
+READ_TIMEOUT_S = 30           # longest silence tolerated between streamed bytes
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
 
 
 class AssistantError(RuntimeError):
     pass
 
 
-def explain_queue(question: str, context_block: str) -> str:
-    if not CFG.openrouter_key:
-        raise AssistantError(
-            "OPENROUTER_API_KEY is not set. Add it to .env and restart Streamlit."
-        )
+def _http():
+    """One pooled requests.Session per process, with retries and backoff on 429/5xx."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests  # deferred: only sessions that use the assistant pay for it
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
 
-    url = f"{CFG.openrouter_base_url}/chat/completions"
+                retry = Retry(
+                    total=HTTP_RETRIES, connect=HTTP_RETRIES, read=0,
+                    status=HTTP_RETRIES, status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({"POST"}), backoff_factor=HTTP_BACKOFF_S,
+                    respect_retry_after_header=True, raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+                s = requests.Session()
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "http://localhost",  # OpenRouter requirement
+                    "X-Title": "Ops Command Center",      # App name
+                })
+                _session = s
+    return _session
 
-    headers = {
-        "Authorization": f"Bearer {CFG.openrouter_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost",  # OpenRouter requirement
-        "X-Title": "Ops Command Center",      # App name
-    }
 
-    payload = {
+def _payload(question: str, context_block: str, stream: bool) -> dict:
+    return {
         "model": CFG.openrouter_model,  # deepseek/deepseek-chat
         "messages": [
             {
@@ -37,30 +69,120 @@ def explain_queue(question: str, context_block: str) -> str:
             },
         ],
         "temperature": 0.4,
+        "stream": stream,
     }
 
+
+def _post(question: str, context_block: str, stream: bool):
+    import requests
+
+    if not CFG.openrouter_key:
+        raise AssistantError(
+            "OPENROUTER_API_KEY is not set. Add it to .env and restart Streamlit."
+        )
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=30)
+        r = _http().post(
+            f"{CFG.openrouter_base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {CFG.openrouter_key}"},
+            json=_payload(question, context_block, stream),
+            timeout=(CONNECT_TIMEOUT_S, READ_TIMEOUT_S),
+            stream=stream,
+        )
+    except requests.exceptions.Timeout as e:
+        raise AssistantError("AI request timed out.") from e
+    except requests.exceptions.RequestException as e:
+        raise AssistantError(f"AI request failed: {e}") from e
 
-        if r.status_code == 402:
-            raise AssistantError(
-                "OpenRouter returned HTTP 402 (Payment Required). "
-                "Add credits to your OpenRouter account."
-            )
+    if r.status_code == 402:
+        r.close()
+        raise AssistantError(
+            "OpenRouter returned HTTP 402 (Payment Required). "
+            "Add credits to your OpenRouter account."
+        )
+    if r.status_code >= 400:
+        text = r.text
+        r.close()
+        raise AssistantError(f"OpenRouter error HTTP {r.status_code}: {text}")
+    return r
 
-        r.raise_for_status()
-        data = r.json()
 
-        msg = data["choices"][0]["message"]["content"]
-        if not msg or not msg.strip():
-            raise AssistantError("AI returned an empty response.")
-        return msg
+def stream_queue(question: str, context_block: str) -> Iterator[str]:
+    """
+    Yields the answer as it is generated, using the OpenAI-compatible
+    `stream: true` server-sent events mode.
+    """
+    import requests
 
+    started = time.perf_counter()
+    r = _post(question, context_block, stream=True)
+    got_any = False
+    try:
+        for line in r.iter_lines(chunk_size=None):
+            if not line or line.startswith(b":"):  # keep-alive comments
+                continue
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                break
+            event = json.loads(data)
+            if "error" in event:
+                err = event["error"]
+                raise AssistantError(f"AI stream failed: {err.get('message', err) if isinstance(err, dict) else err}")
+            choices = event.get("choices") or [{}]
+            piece = (choices[0].get("delta") or {}).get("content")
+            if piece:
+                if not got_any:
+                    got_any = True
+                    RECORDER.record("http", f"openrouter {CFG.openrouter_model} first token",
+                                    (time.perf_counter() - started) * 1000)
+                yield piece
     except requests.exceptions.Timeout as e:
         raise AssistantError("AI request timed out.") from e
-    except requests.exceptions.HTTPError as e:
-        raise AssistantError(
-            f"OpenRouter error HTTP {r.status_code}: {r.text}"
-        ) from e
-    except Exception as e:
+    except requests.exceptions.RequestException as e:
         raise AssistantError(f"AI request failed: {e}") from e
+    except ValueError as e:
+        raise AssistantError(f"AI stream was not valid JSON: {e}") from e
+    finally:
+        r.close()
+        RECORDER.record("http", f"openrouter {CFG.openrouter_model} stream", (time.perf_counter() - started) * 1000)
+    if not got_any:
+        raise AssistantError("AI returned an empty response.")
+
+
+def explain_queue(question: str, context_block: str) -> str:
+    with span("http", f"openrouter {CFG.openrouter_model}"):
+        r = _post(question, context_block, stream=False)
+    try:
+        msg = r.json()["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise AssistantError(f"AI request failed: unexpected response ({e})") from e
+    if not msg or not msg.strip():
+        raise AssistantError("AI returned an empty response.")
+    return msg
+
+
+def ask(question: str, context_block: str, db_path: Optional[str] = None, fresh: bool = False) -> Answer:
+    """
+    explain_queue through the response cache: the same question over the
+    same context comes back from SQLite, and concurrent duplicates wait for
+    one upstream call. `fresh` skips the lookup (the answer is re-cached).
+    """
+    cache = ResponseCache(db_path or CFG.db_path)
+    return cache.get_or_ask(
+        CFG.openrouter_model, question, context_block,
+        lambda: explain_queue(question, context_block), fresh=fresh,
+    )
+
+
+def ask_stream(question: str, context_block: str, db_path: Optional[str] = None, fresh: bool = False) -> Reply:
+    """
+    Like ask(), but a fresh answer is streamed chunk by chunk as it arrives.
+    Use the Reply as a context manager so a stream that is not read to the
+    end releases its in-flight slot.
+    """
+    cache = ResponseCache(db_path or CFG.db_path)
+    return cache.open(
+        CFG.openrouter_model, question, context_block,
+        lambda: stream_queue(question, context_block), fresh=fresh,
+    )
@@ -0,0 +1,229 @@
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+from core.store import Store
+from core.writer import write, writer_for
+
+CACHE_TTL_S = float(os.getenv("ASSISTANT_CACHE_TTL_S", str(6 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("ASSISTANT_CACHE_MAX", "500"))
+COALESCE_WAIT_S = 120.0   # longest a duplicate request waits for the one in flight
+INFLIGHT_STALE_S = COALESCE_WAIT_S  # an in-flight entry older than this is abandoned and replaced
+
+_SPACE = re.compile(r"\s+")
+
+log = logging.getLogger("ops.assistant")
+
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation do not make a different question."""
+    return _SPACE.sub(" ", question.casefold()).strip().rstrip("?!. ")
+
+
+def cache_key(model: str, question: str, context_block: str) -> tuple[str, str]:
+    """(key, context hash) for one question over one context snapshot."""
+    ctx = hashlib.sha256(context_block.encode("utf-8")).hexdigest()
+    key = hashlib.sha256(f"{model}\0{normalize_question(question)}\0{ctx}".encode("utf-8")).hexdigest()
+    return key, ctx
+
+
+@dataclass
+class Answer:
+    text: str
+    source: str          # hit | miss | coalesced
+    age_s: float = 0.0   # how old a cached answer is
+
+
+@dataclass
+class Reply:
+    """
+    Close a reply (or use it as a context manager) when it may not be read
+    to the end, so a request it leads is released at once instead of
+    holding its in-flight slot until INFLIGHT_STALE_S.
+    """
+    source: str               # hit | miss | coalesced
+    chunks: Iterator[str]     # the answer, in pieces as they become available
+    age_s: float = 0.0
+    release: Optional[Callable[[], None]] = field(default=None, repr=False)
+
+    def close(self) -> None:
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            close()
+        if self.release is not None:
+            self.release()
+
+    def __enter__(self) -> "Reply":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _wait(fut: Future) -> Iterator[str]:
+    yield fut.result(timeout=COALESCE_WAIT_S)
+
+
+def _settle(fut: Future, result: Optional[str] = None, error: Optional[BaseException] = None) -> None:
+    # An abandoned or evicted request may already have been failed for its waiters.
+    try:
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class ResponseCache:
+    """
+    Assistant answers kept in the assistant_cache table. Entries expire
+    after `ttl_s`; beyond `max_entries` the least recently used are evicted.
+    Identical questions asked concurrently in this process share one
+    upstream call: the first caller asks, the others wait on its Future.
+    A leader that never finishes (its Reply dropped unread) is failed and
+    replaced by the next caller once it is INFLIGHT_STALE_S old.
+    """
+
+    _inflight: dict[tuple[str, str], tuple[Future, float]] = {}
+    _inflight_lock = threading.Lock()
+    _counts: dict[str, int] = {"hit": 0, "miss": 0, "coalesced": 0, "error": 0}
+    _counts_lock = threading.Lock()
+
+    def __init__(self, db_path: str, ttl_s: float = CACHE_TTL_S, max_entries: int = CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Answer]:
+        now = time.time()
+        with Store(self.db_path) as s:
+            row = s.one("SELECT response, created_at FROM assistant_cache WHERE key=? AND created_at > ?",
+                        (key, now - self.ttl_s))
+        if row is None:
+            return None
+        # Recency/hit bookkeeping is not worth waiting for.
+        writer_for(self.db_path).submit(lambda s: s.exec(
+            "UPDATE assistant_cache SET last_used_at=?, hits=hits+1 WHERE key=?", (now, key)))
+        return Answer(row["response"], "hit", now - row["created_at"])
+
+    def put(self, key: str, model: str, question: str, context_hash: str, response: str) -> None:
+        now = time.time()
+
+        def run(s: Store) -> None:
+            s.exec(
+                """INSERT INTO assistant_cache(key, model, question, context_hash, response, created_at, last_used_at)
+                   VALUES(?,?,?,?,?,?,?)
+                   ON CONFLICT(key) DO UPDATE SET
+                     response=excluded.response, created_at=excluded.created_at, last_used_at=excluded.last_used_at""",
+                (key, model, normalize_question(question), context_hash, response, now, now),
+            )
+            s.exec("DELETE FROM assistant_cache WHERE created_at <= ?", (now - self.ttl_s,))
+            s.exec(
+                """DELETE FROM assistant_cache WHERE key IN (
+                     SELECT key FROM assistant_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)""",
+                (self.max_entries,),
+            )
+        write(self.db_path, run)
+
+    def open(self, model: str, question: str, context_block: str,
+             stream: Callable[[], Iterator[str]], fresh: bool = False) -> Reply:
+        """
+        Cached answer if there is one (unless `fresh`), else one shared call
+        to `stream`. The leader's chunks are passed through as they arrive
+        and the joined answer is cached once the stream completes; callers
+        coalesced onto it receive the whole answer when it is done.
+        """
+        key, ctx = cache_key(model, question, context_block)
+        if not fresh:
+            hit = self.get(key)
+            if hit is not None:
+                self._count("hit")
+                return Reply("hit", iter([hit.text]), hit.age_s)
+
+        slot = (os.path.abspath(self.db_path), key)
+        now = time.monotonic()
+        with self._inflight_lock:
+            fut, started = self._inflight.get(slot, (None, now))
+            if fut is not None and now - started > INFLIGHT_STALE_S:
+                log.warning("evicting assistant request in flight for %.0fs", now - started)
+                _settle(fut, error=RuntimeError("request abandoned"))
+                fut = None
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[slot] = (fut, now)
+        if not leader:
+            self._count("coalesced")
+            return Reply("coalesced", _wait(fut))
+        return Reply("miss", self._lead(slot, fut, key, model, question, ctx, stream),
+                     release=lambda: self._release(slot, fut))
+
+    def _release(self, slot, fut: Future) -> None:
+        """Frees the slot of a request whose reader is done with it, finished or not."""
+        _settle(fut, error=RuntimeError("request abandoned"))
+        with self._inflight_lock:
+            if self._inflight.get(slot, (None,))[0] is fut:
+                del self._inflight[slot]
+
+    def _lead(self, slot, fut: Future, key: str, model: str, question: str, ctx: str,
+              stream: Callable[[], Iterator[str]]) -> Iterator[str]:
+        parts: list[str] = []
+        try:
+            for piece in stream():
+                parts.append(piece)
+                yield piece
+        except BaseException as e:
+            # Includes GeneratorExit when the reader stops early, so waiters never hang.
+            self._count("error")
+            _settle(fut, error=e if isinstance(e, Exception) else RuntimeError("request abandoned"))
+            raise
+        else:
+            text = "".join(parts)
+            _settle(fut, text)
+            self._count("miss")
+            try:
+                self.put(key, model, question, ctx, text)
+            except sqlite3.Error as e:  # an answer is still an answer
+                log.warning("could not cache assistant answer: %s", e)
+        finally:
+            self._release(slot, fut)
+
+    def get_or_ask(self, model: str, question: str, context_block: str,
+                   ask: Callable[[], str], fresh: bool = False) -> Answer:
+        """open() for a non-streaming `ask`; returns the whole answer."""
+        with self.open(model, question, context_block, lambda: iter([ask()]), fresh=fresh) as reply:
+            return Answer("".join(reply.chunks), reply.source, reply.age_s)
+
+    @classmethod
+    def _count(cls, what: str) -> None:
+        with cls._counts_lock:
+            cls._counts[what] += 1
+
+    def stats(self) -> dict:
+        """This process's hit/miss counts plus what the table holds."""
+        with self._counts_lock:
+            counts = dict(self._counts)
+        asked = counts["hit"] + counts["miss"] + counts["coalesced"]
+        with Store(self.db_path) as s:
+            row = s.one(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS stored_hits FROM assistant_cache WHERE created_at > ?",
+                (time.time() - self.ttl_s,),
+            )
+        return {
+            **counts,
+            "hit_rate": (counts["hit"] + counts["coalesced"]) / asked if asked else 0.0,
+            "entries": row["entries"],
+            "entry_hits": row["stored_hits"],
+        }
+
+    def clear(self) -> int:
+        return write(self.db_path, lambda s: s.exec("DELETE FROM assistant_cache"))
@@ -0,0 +1,267 @@
+from __future__ import annotations
+import argparse
+import heapq
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from core.cache import cached
+from core.perf import timed
+from core.store import Store
+from logic.search import SOURCES, fts_query, index_pending
+
+CONTEXT_TOKENS = int(os.getenv("ASSISTANT_CONTEXT_TOKENS", "1500"))
+CHARS_PER_TOKEN = 4      # rough average for ids, dates and short English; no tokenizer needed
+TOP_K = 40               # rows considered per table before the budget trims them
+TOP_GROUPS = 5           # values listed per breakdown
+HALF_LIFE_DAYS = 30.0    # a match this much older than the newest row counts half as much
+CELL_CHARS = 60
+OPEN_STATES = ("Open", "In Progress")
+
+# Question words that would match everything, or nothing useful.
+_STOP = frozenset("""
+a about after all an and any are as at be by can do does for from have how i in is it its
+me most my of on or our should show so than that the their them there these this to was
+we what when where which who why will with you your
+""".split())
+_CELL = re.compile(r"[|\r\n]+")
+
+
+@dataclass(frozen=True)
+class _Scope:
+    label: str
+    columns: tuple[str, ...]     # row columns sent, key first
+    when: str                    # date the row arrived; orders by recency
+    state: Optional[str] = None  # workflow column, if the table is a queue
+    done: Optional[str] = None   # date the row left the queue
+    groups: tuple[str, ...] = ()  # breakdowns of the open backlog (of all rows without a state)
+
+
+SCOPES = {
+    "sec_events": _Scope(
+        "SECURITY", ("event_key", "event_kind", "impact", "state", "raised_at", "owner", "notes"),
+        "raised_at", "state", "cleared_at", ("impact", "event_kind", "owner"),
+    ),
+    "it_requests": _Scope(
+        "IT", ("req_key", "topic", "urgency", "phase", "opened_at", "assignee"),
+        "opened_at", "phase", "closed_at", ("urgency", "topic", "assignee"),
+    ),
+    "data_assets": _Scope(
+        "DATA", ("asset_name", "steward", "origin", "size_mb", "rows_est", "created_on"),
+        "created_on", groups=("origin", "steward"),
+    ),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def keywords(question: str) -> str:
+    """The question's content words as an FTS5 query matching any of them."""
+    words = [w for w in re.findall(r"\w+", question.lower()) if w not in _STOP and len(w) > 1]
+    return " OR ".join(fts_query(w) for w in dict.fromkeys(words))
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:g}"
+    text = _CELL.sub(" ", str(value))
+    return text if len(text) <= CELL_CHARS else text[:CELL_CHARS - 1] + "…"
+
+
+def _counts(rows: Iterable) -> str:
+    return " · ".join(f"{r[0]} {r[1]}" for r in rows) or "none"
+
+
+def _top_decayed(hits: Iterable[tuple[int, float, Optional[float]]], k: int, newest: float) -> list[int]:
+    """
+    Ids of the `k` best (id, bm25, julianday) hits by age-decayed score,
+    best first. `hits` must come best bm25 first: decay only lowers a
+    score, so no later hit can beat the k-th once its bm25 is lower.
+    """
+    best: list[tuple[float, int]] = []  # min-heap of (decayed score, id)
+    for rid, raw, when in hits:
+        if len(best) == k and raw <= best[0][0]:
+            break
+        item = (raw * 0.5 ** ((newest - (when or newest)) / HALF_LIFE_DAYS), rid)
+        if len(best) < k:
+            heapq.heappush(best, item)
+        else:
+            heapq.heappushpop(best, item)
+    return [rid for _score, rid in sorted(best, reverse=True)]
+
+
+class ContextBuilder:
+    """
+    Prompt context for the Ops Assistant within a token budget: per-table
+    aggregates from GROUP BY queries (size independent of row count), then
+    the rows most relevant to the question, as pipe-separated tables.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    @cached("sec_events", "it_requests", "data_assets")
+    def digest(self, table: str) -> str:
+        """Counts, breakdowns, ages and arrivals vs closures for one table."""
+        sc = SCOPES[table]
+        lines = []
+        with Store(self.db_path) as s:
+            newest = s.one(f"SELECT MAX({sc.when}) FROM {table}")[0]
+            if sc.state is None:
+                row = s.one(f"""SELECT COUNT(*), COALESCE(SUM(size_mb), 0), COALESCE(SUM(rows_est), 0)
+                                FROM {table}""")
+                lines.append(f"total {row[0]} · size_mb {row[1]:.0f} · rows_est {row[2]}")
+                where, params = "", ()
+            else:
+                by_state = s.all(f"SELECT {sc.state}, COUNT(*) n FROM {table} GROUP BY 1 ORDER BY n DESC")
+                lines.append(f"by {sc.state}: {_counts(by_state)}")
+                marks = ",".join("?" * len(OPEN_STATES))
+                where, params = f"WHERE {sc.state} IN ({marks})", OPEN_STATES
+            # One pass for every breakdown: group by all of them, then fold per column.
+            cols = ", ".join(sc.groups)
+            combos = s.all(
+                f"""SELECT {cols}, COUNT(*), SUM(julianday('now') - julianday({sc.when})), MIN({sc.when})
+                    FROM {table} {where} GROUP BY {cols}""", params)
+            g = len(sc.groups)
+            if sc.state is not None:
+                n = sum(r[g] for r in combos)
+                if n:
+                    age = sum(r[g + 1] or 0 for r in combos) / n
+                    oldest = min(str(r[g + 2]) for r in combos)[:10]
+                    lines.append(f"open backlog {n} · mean age {age:.1f}d · oldest {oldest}")
+                else:
+                    lines.append("open backlog 0")
+            for i, col in enumerate(sc.groups):
+                folded: dict = {}
+                for r in combos:
+                    folded[r[i]] = folded.get(r[i], 0) + r[g]
+                top = sorted(folded.items(), key=lambda kv: -kv[1])[:TOP_GROUPS]
+                lines.append(f"{'open ' if where else ''}by {col}: {_counts(top)}")
+            if sc.done is not None and newest:
+                week = s.one(
+                    f"""SELECT (SELECT COUNT(*) FROM {table} WHERE {sc.when} > date(?, '-7 days')),
+                               (SELECT COUNT(*) FROM {table} WHERE {sc.done} > date(?, '-7 days')),
+                               (SELECT AVG(julianday({sc.done}) - julianday({sc.when})) FROM {table}
+                                WHERE {sc.done} > date(?, '-30 days'))""",
+                    (newest, newest, newest))
+                resolve = f" · mean time to close (30d) {week[2]:.1f}d" if week[2] is not None else ""
+                lines.append(f"7d to {str(newest)[:10]}: arrived {week[0]} · closed {week[1]}{resolve}")
+        return "\n".join(lines)
+
+    @cached("sec_events", "it_requests", "data_assets")
+    def relevant(self, table: str, question: str, k: int = TOP_K) -> list[tuple]:
+        """
+        Up to `k` rows, best first: full-text matches on the question's words
+        (bm25, decayed by age relative to the newest row), then the newest
+        open rows to fill. Matches are read best bm25 first, so reading stops
+        once the k-th decayed score beats the next undecayed one.
+        """
+        sc = SCOPES[table]
+        match = keywords(question)
+        ids: list[int] = []
+        if match:
+            index_pending(self.db_path)
+        with Store(self.db_path) as s:
+            if match:
+                fts = f"{table}_fts"
+                weights = ", ".join(str(w) for w in SOURCES[table].weights)
+                newest = s.one(f"SELECT julianday(MAX({sc.when})) FROM {table}")[0] or 0.0
+                ranked = s.chunks(
+                    f"""SELECT rowid, -bm25({fts}, {weights}) AS score FROM {fts}
+                        WHERE {fts} MATCH ? ORDER BY score DESC, rowid DESC""",
+                    (match,), size=4 * k,
+                )
+                try:
+                    ids = _top_decayed(self._dated(s, table, ranked), k, newest)
+                finally:
+                    ranked.close()
+            if len(ids) < k:
+                where = f"WHERE {sc.state} IN ({','.join('?' * len(OPEN_STATES))})" if sc.state else ""
+                fill = s.all(f"SELECT id FROM {table} {where} ORDER BY {sc.when} DESC LIMIT ?",
+                             (*(OPEN_STATES if sc.state else ()), k))
+                seen = set(ids)
+                ids += [r[0] for r in fill if r[0] not in seen][:k - len(ids)]
+            if not ids:
+                return []
+            rows = {r[0]: tuple(r)[1:] for r in s.all(
+                f"SELECT id, {', '.join(sc.columns)} FROM {table} WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        return [rows[i] for i in ids if i in rows]
+
+    @staticmethod
+    def _dated(s: Store, table: str, ranked: Iterable[tuple[list[str], list]]) -> Iterator[tuple]:
+        """(id, score) batches to (id, score, julianday of arrival) rows, in order."""
+        for _names, batch in ranked:
+            when = dict(s.all(f"SELECT id, julianday({SCOPES[table].when}) FROM {table} "
+                              f"WHERE id IN ({','.join('?' * len(batch))})", [r[0] for r in batch]))
+            for rid, score in batch:
+                yield rid, score, when.get(rid)
+
+    @timed("view")
+    def build(self, question: str, tables: Iterable[str] = tuple(SCOPES),
+              budget_tokens: int = CONTEXT_TOKENS) -> str:
+        """
+        One section per table: its digest, then a header line and as many
+        relevant rows as the budget allows. Digests always go in; the rest
+        of the budget is shared out smallest need first, so what one table
+        does not use goes to the others.
+        """
+        tables = list(tables)
+        heads, bodies = {}, {}
+        for table in tables:
+            sc = SCOPES[table]
+            heads[table] = f"[{sc.label}]\n{self.digest(table)}\n" + "|".join(sc.columns)
+            bodies[table] = [
+                "|".join(_cell(v)[:10] if c == sc.when else _cell(v) for c, v in zip(sc.columns, row))
+                for row in self.relevant(table, question)
+            ]
+        left = budget_tokens * CHARS_PER_TOKEN - sum(len(h) + 2 for h in heads.values())
+        kept = {}
+        by_need = sorted(tables, key=lambda t: sum(len(line) + 1 for line in bodies[t]))
+        for n, table in enumerate(by_need):
+            share, used, kept[table] = left // (len(by_need) - n), 0, []
+            for line in bodies[table]:
+                if used + len(line) + 1 > share:
+                    break
+                kept[table].append(line)
+                used += len(line) + 1
+            left -= used
+        out = []
+        for table in tables:
+            rows = kept[table] or ["(no rows fit)" if bodies[table] else "(no rows)"]
+            out.append("\n".join([heads[table], *rows]))
+        return "\n\n".join(out)
+
+
+def build_context(db_path: str, question: str, tables: Iterable[str] = tuple(SCOPES),
+                  budget_tokens: int = CONTEXT_TOKENS) -> str:
+    return ContextBuilder(db_path).build(question, tables, budget_tokens)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.context",
+        description="Print the context the Ops Assistant would send for a question.",
+    )
+    parser.add_argument("question")
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--table", action="append", choices=sorted(SCOPES), help="limit to a table (repeatable)")
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKENS, help="token budget")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    text = build_context(db_path, args.question, args.table or tuple(SCOPES), args.budget)
+    print(text)
+    print(f"\n~{estimate_tokens(text)} tokens (budget {args.budget})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+from __future__ import annotations
+import argparse
+import bisect
+import datetime as dt
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from core.feed import next_seq
+from core.store import Store
+from core.writer import write
+
+WINDOW_DAYS = int(os.getenv("CORRELATE_WINDOW_DAYS", "2"))
+BY_NOTES = os.getenv("CORRELATE_BY_NOTES", "0") == "1"
+BATCH = 20000
+NOTES_TOKENS = 6
+
+_VARIABLE = re.compile(r"\b(?:[0-9a-f]{8,}|\d+(?:\.\d+)*|[\w.+-]+@[\w.-]+)\b", re.I)
+_WORD = re.compile(r"[a-z#]+")
+
+
+def notes_key(notes: Optional[str]) -> str:
+    """
+    Template of a notes string: ids, numbers, IPs and addresses masked, first
+    NOTES_TOKENS words kept. Events whose notes differ only in those share a key.
+    """
+    if not notes:
+        return ""
+    return " ".join(_WORD.findall(_VARIABLE.sub("#", notes.lower()))[:NOTES_TOKENS])
+
+
+class _Cluster:
+    __slots__ = ("id", "first", "last", "events", "changed", "into")
+
+    def __init__(self, id: Optional[int], first: int, last: int):
+        self.id = id
+        self.first = first
+        self.last = last
+        self.events: list[int] = []
+        self.changed = id is None
+        self.into: Optional[_Cluster] = None
+
+    def final(self) -> "_Cluster":
+        c = self
+        while c.into is not None:
+            c = c.into
+        return c
+
+
+@dataclass
+class CorrelationReport:
+    assigned: int = 0
+    created: int = 0
+    merged: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"assigned {self.assigned} events, {self.created} new incidents, {self.merged} merged, "
+            f"{self.skipped} skipped (bad date) in {self.seconds:.2f}s"
+        )
+
+
+def _sweep(clusters: list[_Cluster], events: list[tuple[int, int]], window: int,
+           report: CorrelationReport) -> None:
+    """
+    Assigns (day, event id) pairs, sorted by day, to one group's clusters.
+    Within a group clusters never come within `window` days of each other
+    (they would have been merged), so sorted by first day they are also
+    sorted by last day and one bisect finds the only candidate.
+    """
+    firsts = [c.first for c in clusters]
+    for day, event_id in events:
+        i = bisect.bisect_right(firsts, day + window) - 1
+        c = clusters[i] if i >= 0 else None
+        if c is None or c.last < day - window:
+            c = _Cluster(None, day, day)
+            clusters.insert(i + 1, c)
+            firsts.insert(i + 1, day)
+            report.created += 1
+        elif day < c.first or day > c.last:
+            c.first, c.last, c.changed = min(c.first, day), max(c.last, day), True
+            firsts[i] = c.first
+            left = clusters[i - 1] if i > 0 else None
+            if left is not None and c.first - left.last <= window:
+                # The event bridged the gap: fold this cluster into its neighbour.
+                left.last, left.changed = max(left.last, c.last), True
+                left.events.extend(c.events)
+                c.events, c.into = [], left
+                del clusters[i], firsts[i]
+                c = left
+                report.merged += 1
+        c.events.append(event_id)
+        report.assigned += 1
+
+
+def _correlate_batch(s: Store, after_id: int, window: int, by_notes: bool,
+                     report: CorrelationReport) -> Optional[int]:
+    rows = s.all(
+        """SELECT id, event_kind, owner, raised_at, notes FROM sec_events
+           WHERE incident_id IS NULL AND id > ? ORDER BY id LIMIT ?""",
+        (after_id, BATCH),
+    )
+    if not rows:
+        return None
+
+    groups: dict[tuple[str, str, str], list[tuple[int, int]]] = {}
+    for r in rows:
+        try:
+            day = dt.date.fromisoformat(r["raised_at"][:10]).toordinal()
+        except (TypeError, ValueError):
+            report.skipped += 1
+            continue
+        key = (r["event_kind"], r["owner"], notes_key(r["notes"]) if by_notes else "")
+        groups.setdefault(key, []).append((day, r["id"]))
+
+    touched: list[_Cluster] = []
+    for (kind, owner, nkey), events in groups.items():
+        events.sort()
+        lo = dt.date.fromordinal(events[0][0] - window).isoformat()
+        hi = dt.date.fromordinal(events[-1][0] + window).isoformat()
+        clusters = [
+            _Cluster(c["id"], dt.date.fromisoformat(c["first_at"]).toordinal(),
+                     dt.date.fromisoformat(c["last_at"]).toordinal())
+            for c in s.all(
+                """SELECT id, first_at, last_at FROM incidents
+                   WHERE event_kind=? AND owner=? AND notes_key=? AND last_at >= ? AND first_at <= ?
+                   ORDER BY first_at""",
+                (kind, owner, nkey, lo, hi),
+            )
+        ]
+        loaded = list(clusters)
+        _sweep(clusters, events, window, report)
+        touched.extend((kind, owner, nkey, c) for c in {*loaded, *clusters})
+
+    for kind, owner, nkey, c in touched:
+        if c.into is None and c.id is None:
+            c.id = s.conn.execute(
+                "INSERT INTO incidents(event_kind, owner, notes_key, first_at, last_at) VALUES(?,?,?,?,?)",
+                (kind, owner, nkey, dt.date.fromordinal(c.first).isoformat(),
+                 dt.date.fromordinal(c.last).isoformat()),
+            ).lastrowid
+    seq = next_seq(s, "sec_events")
+    for kind, owner, nkey, c in touched:
+        if c.into is not None:
+            if c.id is not None:
+                s.exec("UPDATE sec_events SET incident_id=?, updated_seq=? WHERE incident_id=?",
+                       (c.final().id, seq, c.id))
+                s.exec("DELETE FROM incidents WHERE id=?", (c.id,))
+        elif c.changed:
+            s.exec("UPDATE incidents SET first_at=?, last_at=? WHERE id=?",
+                   (dt.date.fromordinal(c.first).isoformat(), dt.date.fromordinal(c.last).isoformat(), c.id))
+        if c.events:
+            s.many("UPDATE sec_events SET incident_id=?, updated_seq=? WHERE id=?", [(c.id, seq, e) for e in c.events])
+    return rows[-1]["id"]
+
+
+def pending(db_path: str) -> bool:
+    """Whether any event still lacks an incident (cheap: uses ix_sec_events_incident)."""
+    with Store(db_path) as s:
+        return s.one("SELECT 1 FROM sec_events WHERE incident_id IS NULL LIMIT 1") is not None
+
+
+def correlate(db_path: str, window_days: int = WINDOW_DAYS, by_notes: bool = BY_NOTES,
+              rebuild: bool = False) -> CorrelationReport:
+    """
+    Groups security events into incidents by (kind, owner[, notes template])
+    and raised_at proximity: events at most `window_days` apart chain into
+    the same incident. Only events without an incident are processed,
+    BATCH at a time, each batch in one writer transaction; an event that
+    bridges two incidents merges them. `rebuild` starts over from scratch
+    (needed after changing the window or notes setting).
+    """
+    report = CorrelationReport()
+    started = time.perf_counter()
+    if rebuild:
+        write(db_path, lambda s: (
+            s.exec("UPDATE sec_events SET incident_id=NULL, updated_seq=? WHERE incident_id IS NOT NULL",
+                   (next_seq(s, "sec_events"),)),
+            s.exec("DELETE FROM incidents"),
+        ))
+    if not pending(db_path):
+        return report
+
+    after: Optional[int] = 0
+    while after is not None:
+        after = write(db_path, lambda s, a=after: _correlate_batch(s, a, window_days, by_notes, report))
+    # Incidents whose events were all archived or deleted.
+    write(db_path, lambda s: s.exec(
+        """DELETE FROM incidents WHERE NOT EXISTS
+           (SELECT 1 FROM sec_events WHERE sec_events.incident_id = incidents.id)"""
+    ))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.correlate",
+        description="Cluster related security events into incidents.",
+    )
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS)
+    parser.add_argument("--by-notes", action="store_true", default=BY_NOTES,
+                        help="also split incidents by notes template")
+    parser.add_argument("--rebuild", action="store_true", help="discard existing incidents first")
+    parser.add_argument("--every", type=float, default=0, help="keep running, correlating every N seconds")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    rebuild = args.rebuild
+    while True:
+        print(correlate(db_path, args.window_days, args.by_notes, rebuild=rebuild), flush=True)
+        rebuild = False
+        if args.every <= 0:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
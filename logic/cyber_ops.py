@@ -1,24 +1,164 @@
+import datetime as dt
+from concurrent.futures import Future
 import pandas as pd
+from core.cache import cached
+from core.feed import next_seq
+from core.importer import TABLES
+from core.perf import timed
 from core.store import Store
+from core.writer import write, writer_for
+from logic.frames import materialize
+from logic.queries import Changes, Page, TableQuery
+from logic.triage import work_next
+
+SEC_EVENTS = TableQuery(
+    "sec_events", "raised_at", "event_key",
+    columns=["id", "event_key", "event_kind", "impact", "state", "raised_at", "cleared_at", "owner", "notes"],
+    filter_cols=["state", "impact", "owner", "event_kind"],
+)
 
 class CyberOps:
     def __init__(self, db_path: str):
         self.db_path = db_path
 
+    @timed("frame")
+    @cached("sec_events")
     def frame(self) -> pd.DataFrame:
-        with Store(self.db_path) as s:
-            rows = s.all("SELECT * FROM sec_events ORDER BY raised_at DESC")
-        return pd.DataFrame([dict(r) for r in rows])
+        return materialize(self.db_path, "SELECT * FROM sec_events ORDER BY raised_at DESC")
+
+    @timed("frame")
+    @cached("sec_events")
+    def query(self, columns: list[str] | None = None,
+              state: list[str] | None = None,
+              impact: list[str] | None = None,
+              owner: list[str] | None = None,
+              since: str | None = None, until: str | None = None,
+              after: tuple | None = None, limit: int = 50, archived: bool = False) -> Page:
+        return SEC_EVENTS.page(
+            self.db_path, columns, {"state": state, "impact": impact, "owner": owner},
+            since=since, until=until, after=after, limit=limit, archived=archived,
+        )
+
+    @cached("sec_events")
+    def count(self,
+              state: list[str] | None = None,
+              impact: list[str] | None = None,
+              owner: list[str] | None = None,
+              since: str | None = None, until: str | None = None, archived: bool = False) -> int:
+        return SEC_EVENTS.count(
+            self.db_path, {"state": state, "impact": impact, "owner": owner},
+            since=since, until=until, archived=archived,
+        )
+
+    def change_seq(self) -> int:
+        return SEC_EVENTS.change_seq(self.db_path)
+
+    @timed("frame")
+    def changes_since(self, seq: int, columns: list[str] | None = None) -> Changes:
+        """Rows added or modified after change sequence `seq` (see TableQuery.changes_since)."""
+        return SEC_EVENTS.changes_since(self.db_path, seq, columns)
+
+    def work_next(self, owner: str | None = None, limit: int = 20) -> pd.DataFrame:
+        """Open rows by priority (severity weight plus age), highest first; see logic.triage."""
+        return work_next(self.db_path, "sec_events", owner, limit)
+
+    @cached("sec_events")
+    def options(self, column: str) -> list:
+        return SEC_EVENTS.options(self.db_path, column)
 
     def update_state(self, event_key: str, new_state: str) -> None:
-        with Store(self.db_path) as s:
-            s.exec("UPDATE sec_events SET state=? WHERE event_key=?", (new_state, event_key))
+        write(self.db_path, lambda s: s.exec(
+            "UPDATE sec_events SET state=?, updated_seq=? WHERE event_key=?",
+            (new_state, next_seq(s, "sec_events"), event_key),
+        ))
+
+    def update_state_many(self, event_keys: list[str], new_state: str) -> int:
+        return SEC_EVENTS.update_keys(self.db_path, event_keys, {"state": new_state})
+
+    def update_state_where(self, new_state: str, filters: dict[str, list[str] | None],
+                           since: str | None = None, until: str | None = None,
+                           all_rows: bool = False) -> int:
+        """Applies the change to every row matching the same filters as query()."""
+        return SEC_EVENTS.update_where(self.db_path, {"state": new_state}, filters, since=since, until=until,
+                                       all_rows=all_rows)
 
     def add_event(self, event_key: str, event_kind: str, impact: str, state: str,
                   raised_at: str, owner: str, notes: str = "", cleared_at: str | None = None) -> None:
-        with Store(self.db_path) as s:
-            s.exec(
-                """INSERT INTO sec_events(event_key,event_kind,impact,state,raised_at,cleared_at,owner,notes)
-                   VALUES(?,?,?,?,?,?,?,?)""",
-                (event_key, event_kind, impact, state, raised_at, cleared_at, owner, notes),
+        write(self.db_path, lambda s: s.exec(
+            """INSERT INTO sec_events(event_key,event_kind,impact,state,raised_at,cleared_at,owner,notes,updated_seq)
+               VALUES(?,?,?,?,?,?,?,?,?)""",
+            (event_key, event_kind, impact, state, raised_at, cleared_at, owner, notes, next_seq(s, "sec_events")),
+        ))
+
+    @timed("frame")
+    @cached("sec_events", "incidents")
+    def incidents(self, open_only: bool = True, limit: int = 100) -> pd.DataFrame:
+        """
+        Collapsed queue: one row per incident (see logic.correlate), newest
+        activity first, with event counts and the highest impact among its events.
+        """
+        live = ("AND EXISTS (SELECT 1 FROM sec_events o WHERE o.incident_id = i.id "
+                "AND o.state IN ('Open', 'In Progress'))") if open_only else ""
+        return materialize(self.db_path, f"""
+            WITH top AS (
+              SELECT i.* FROM incidents i WHERE 1=1 {live}
+              ORDER BY i.last_at DESC, i.id DESC LIMIT ?
+            )
+            SELECT top.id AS incident_id, top.event_kind, top.owner, top.first_at, top.last_at,
+                   COUNT(*) AS events,
+                   SUM(e.state IN ('Open', 'In Progress')) AS open_events,
+                   CASE MAX(CASE e.impact WHEN 'Critical' THEN 4 WHEN 'High' THEN 3 WHEN 'Medium' THEN 2 ELSE 1 END)
+                     WHEN 4 THEN 'Critical' WHEN 3 THEN 'High' WHEN 2 THEN 'Medium' ELSE 'Low' END AS impact,
+                   MIN(e.event_key) AS first_key
+            FROM top JOIN sec_events e ON e.incident_id = top.id
+            GROUP BY top.id
+            ORDER BY top.last_at DESC, top.id DESC""", (limit,))
+
+    @timed("frame")
+    @cached("sec_events")
+    def incident_events(self, incident_id: int) -> pd.DataFrame:
+        return materialize(
+            self.db_path,
+            """SELECT event_key, event_kind, impact, state, raised_at, owner, notes
+               FROM sec_events WHERE incident_id=? ORDER BY raised_at, id""",
+            (int(incident_id),),
+        )
+
+    def update_state_incidents(self, incident_ids: list[int], new_state: str) -> int:
+        """Sets the state of every event in the given incidents."""
+        if not incident_ids:
+            return 0
+        marks = ",".join("?" * len(incident_ids))
+        return write(self.db_path, lambda s: s.exec(
+            f"UPDATE sec_events SET state=?, updated_seq=? WHERE incident_id IN ({marks})",
+            (new_state, next_seq(s, "sec_events"), *map(int, incident_ids)),
+        ))
+
+    def ingest(self, rows: list[tuple], offsets: dict[str, tuple[int, int]]) -> "Future[int]":
+        """
+        Queues one batch of (event_key, event_kind, impact, state, raised_at,
+        cleared_at, owner, notes) rows for INSERT OR IGNORE, together with the
+        {source: (inode, pos)} tail offsets they were read up to, in the same
+        transaction. Resolves to the number of rows actually inserted.
+        """
+        sql = TABLES["sec_events"][0]
+        stamp = dt.datetime.now().isoformat(timespec="seconds")
+
+        def run(s) -> int:
+            inserted = 0
+            if rows:
+                seq = next_seq(s, "sec_events")
+                inserted = s.many(sql, [(*r, seq) for r in rows])
+            s.many(
+                """INSERT INTO ingest_offsets(source, inode, pos, updated_at) VALUES(?,?,?,?)
+                   ON CONFLICT(source) DO UPDATE SET
+                     inode=excluded.inode, pos=excluded.pos, updated_at=excluded.updated_at""",
+                [(src, inode, pos, stamp) for src, (inode, pos) in offsets.items()],
             )
+            return inserted
+
+        return writer_for(self.db_path).submit(run)
+
+    def ingest_offsets(self) -> dict[str, tuple[int, int]]:
+        with Store(self.db_path) as s:
+            return {r["source"]: (r["inode"], r["pos"]) for r in s.all("SELECT source, inode, pos FROM ingest_offsets")}
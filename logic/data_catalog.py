@@ -1,24 +1,111 @@
+import json
 import pandas as pd
+from core.cache import cached
+from core.feed import next_seq
+from core.perf import timed
 from core.store import Store
+from core.writer import write
+from logic.frames import materialize
+from logic.queries import Changes, Page, TableQuery
+
+DATA_ASSETS = TableQuery(
+    "data_assets", "created_on", "asset_name",
+    columns=["id", "asset_name", "steward", "origin", "size_mb", "rows_est", "created_on",
+             "source_path", "profiled_at"],
+    filter_cols=["steward", "origin"],
+)
 
 class DataCatalog:
     def __init__(self, db_path: str):
         self.db_path = db_path
 
+    @timed("frame")
+    @cached("data_assets")
     def frame(self) -> pd.DataFrame:
-        with Store(self.db_path) as s:
-            rows = s.all("SELECT * FROM data_assets ORDER BY created_on DESC")
-        return pd.DataFrame([dict(r) for r in rows])
+        return materialize(self.db_path, "SELECT * FROM data_assets ORDER BY created_on DESC")
+
+    @timed("frame")
+    @cached("data_assets")
+    def query(self, columns: list[str] | None = None,
+              steward: list[str] | None = None,
+              origin: list[str] | None = None,
+              since: str | None = None, until: str | None = None,
+              after: tuple | None = None, limit: int = 50) -> Page:
+        return DATA_ASSETS.page(
+            self.db_path, columns, {"steward": steward, "origin": origin},
+            since=since, until=until, after=after, limit=limit,
+        )
+
+    @cached("data_assets")
+    def count(self,
+              steward: list[str] | None = None,
+              origin: list[str] | None = None,
+              since: str | None = None, until: str | None = None) -> int:
+        return DATA_ASSETS.count(
+            self.db_path, {"steward": steward, "origin": origin}, since=since, until=until,
+        )
+
+    def change_seq(self) -> int:
+        return DATA_ASSETS.change_seq(self.db_path)
+
+    @timed("frame")
+    def changes_since(self, seq: int, columns: list[str] | None = None) -> Changes:
+        """Rows added or modified after change sequence `seq` (see TableQuery.changes_since)."""
+        return DATA_ASSETS.changes_since(self.db_path, seq, columns)
+
+    @cached("data_assets")
+    def options(self, column: str) -> list:
+        return DATA_ASSETS.options(self.db_path, column)
 
     def change_steward(self, asset_name: str, steward: str) -> None:
-        with Store(self.db_path) as s:
-            s.exec("UPDATE data_assets SET steward=? WHERE asset_name=?", (steward, asset_name))
+        write(self.db_path, lambda s: s.exec(
+            "UPDATE data_assets SET steward=?, updated_seq=? WHERE asset_name=?",
+            (steward, next_seq(s, "data_assets"), asset_name),
+        ))
+
+    def change_steward_many(self, asset_names: list[str], new_steward: str) -> int:
+        return DATA_ASSETS.update_keys(self.db_path, asset_names, {"steward": new_steward})
+
+    def change_steward_where(self, new_steward: str, filters: dict[str, list[str] | None],
+                             since: str | None = None, until: str | None = None,
+                             all_rows: bool = False) -> int:
+        """Applies the change to every row matching the same filters as query()."""
+        return DATA_ASSETS.update_where(self.db_path, {"steward": new_steward}, filters, since=since, until=until,
+                                        all_rows=all_rows)
 
     def add_asset(self, asset_name: str, steward: str, origin: str,
-                  size_mb: float, rows_est: int, created_on: str) -> None:
+                  size_mb: float, rows_est: int, created_on: str,
+                  source_path: str | None = None) -> None:
+        write(self.db_path, lambda s: s.exec(
+            """INSERT INTO data_assets(asset_name,steward,origin,size_mb,rows_est,created_on,source_path,updated_seq)
+               VALUES(?,?,?,?,?,?,?,?)""",
+            (asset_name, steward, origin, float(size_mb), int(rows_est), created_on, source_path or None,
+             next_seq(s, "data_assets")),
+        ))
+
+    def source_path(self, asset_name: str) -> str | None:
         with Store(self.db_path) as s:
-            s.exec(
-                """INSERT INTO data_assets(asset_name,steward,origin,size_mb,rows_est,created_on)
-                   VALUES(?,?,?,?,?,?)""",
-                (asset_name, steward, origin, float(size_mb), int(rows_est), created_on),
+            row = s.one("SELECT source_path FROM data_assets WHERE asset_name=?", (asset_name,))
+        return row["source_path"] if row else None
+
+    def profiled_sources(self) -> list[tuple[str, str, int | None, float | None]]:
+        """(asset, source path, bytes, mtime) as of the last profile, for every asset with a source."""
+        with Store(self.db_path) as s:
+            rows = s.all(
+                """SELECT asset_name, source_path, profile_bytes, profile_mtime FROM data_assets
+                   WHERE source_path IS NOT NULL AND source_path <> '' ORDER BY asset_name"""
             )
+        return [tuple(r) for r in rows]
+
+    def apply_profile(self, asset_name: str, source_path: str, profile: dict) -> None:
+        """Stores a logic.profiler result: exact size/rows plus the column stats as JSON."""
+        from logic.profiler import summary
+        stats = summary(profile)
+        write(self.db_path, lambda s: s.exec(
+            """UPDATE data_assets SET size_mb=?, rows_est=?, source_path=?, profiled_at=?,
+                      profile_bytes=?, profile_mtime=?, column_stats=?, updated_seq=?
+               WHERE asset_name=?""",
+            (round(profile["bytes"] / (1024 * 1024), 3), int(profile["rows"]), source_path,
+             stats["profiled_at"], int(profile["bytes"]), float(profile["mtime"]),
+             json.dumps(stats, default=str), next_seq(s, "data_assets"), asset_name),
+        ))
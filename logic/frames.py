@@ -0,0 +1,113 @@
+from __future__ import annotations
+from typing import Any, Iterable, Sequence
+import numpy as np
+import pandas as pd
+from core.store import Store
+
+CHUNK_ROWS = 20000
+
+DATE_COLS = frozenset({"raised_at", "cleared_at", "created_on", "opened_at", "closed_at", "profiled_at",
+                       "first_at", "last_at"})
+CATEGORY_COLS = frozenset({"state", "impact", "urgency", "phase", "event_kind", "origin"})
+INT_COLS = frozenset({"id", "rows_est", "n", "incident_id", "events", "open_events", "updated_seq"})
+FLOAT_COLS = frozenset({"size_mb", "priority"})
+
+
+class _Categories:
+    """Encodes a low-cardinality text column to int32 codes chunk by chunk."""
+
+    def __init__(self):
+        self.codes: dict[Any, int] = {}
+        self.parts: list[np.ndarray] = []
+
+    def add(self, values: Sequence) -> None:
+        codes = self.codes
+        out = np.empty(len(values), dtype=np.int32)
+        for i, v in enumerate(values):
+            if v is None:
+                out[i] = -1
+                continue
+            c = codes.get(v)
+            if c is None:
+                c = codes[v] = len(codes)
+            out[i] = c
+        self.parts.append(out)
+
+    def finish(self) -> pd.Categorical:
+        codes = np.concatenate(self.parts) if self.parts else np.empty(0, dtype=np.int32)
+        return pd.Categorical.from_codes(codes, categories=list(self.codes))
+
+
+def _convert(name: str, values: Sequence) -> np.ndarray:
+    if name in DATE_COLS:
+        try:
+            return np.array(values, dtype="datetime64[s]")
+        except ValueError:  # non-ISO text somewhere in the chunk: let pandas coerce it to NaT
+            return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce", format="ISO8601").to_numpy()
+    if name in INT_COLS and None not in values:
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    if name in FLOAT_COLS or name in INT_COLS:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(values, dtype=object)
+
+
+def frame_from_chunks(chunks: Iterable[tuple[list[str], Sequence[Sequence]]],
+                      names: list[str] | None = None) -> pd.DataFrame:
+    """
+    Builds a typed DataFrame column by column from (names, rows) batches.
+    Date columns become datetime64, low-cardinality columns categoricals and
+    counts/sizes numeric, so no per-row dicts or object columns are kept.
+    """
+    parts: dict[str, Any] = {}
+    for batch_names, rows in chunks:
+        names = names or batch_names
+        if not parts:
+            parts = {n: (_Categories() if n in CATEGORY_COLS else []) for n in names}
+        if not rows:
+            continue
+        for name, values in zip(names, zip(*rows)):
+            acc = parts[name]
+            if isinstance(acc, _Categories):
+                acc.add(values)
+            else:
+                acc.append(_convert(name, values))
+
+    data = {}
+    for name in names or []:
+        acc = parts.get(name, [])
+        if isinstance(acc, _Categories):
+            data[name] = acc.finish()
+        elif acc:
+            data[name] = np.concatenate(acc) if len(acc) > 1 else acc[0]
+        else:
+            data[name] = _convert(name, [])
+    return pd.DataFrame(data, columns=names or [])
+
+
+def materialize(db_path: str, sql: str, params: tuple = (), chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Runs `sql` and streams the result straight into a typed DataFrame."""
+    with Store(db_path) as s:
+        return frame_from_chunks(s.chunks(sql, params, chunk_rows))
+
+
+def upsert(base: pd.DataFrame, rows: pd.DataFrame, key: str = "id") -> pd.DataFrame:
+    """`base` with `rows` replacing the rows sharing their key and the rest appended."""
+    if rows.empty:
+        return base
+    kept = base[~base[key].isin(rows[key])]
+    out = pd.concat([kept, rows], ignore_index=True) if not kept.empty else rows.reset_index(drop=True)
+    for col in CATEGORY_COLS.intersection(out.columns):
+        if not isinstance(out[col].dtype, pd.CategoricalDtype):  # concat of differing categories
+            out[col] = out[col].astype("category")
+    return out
+
+
+def as_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Dates back to YYYY-MM-DD strings (and categoricals to plain values) for prompts/exports."""
+    out = df.copy()
+    for col in out.columns:
+        if col in DATE_COLS and pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime("%Y-%m-%d").where(out[col].notna(), None)
+        elif isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object)
+    return out
@@ -0,0 +1,462 @@
+from __future__ import annotations
+import argparse
+import collections
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from core.perf import RECORDER
+from core.store import Store
+from logic.correlate import correlate
+from logic.rollups import fold
+from logic.search import index_pending
+from logic.cyber_ops import CyberOps
+
+BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", "2000"))
+BATCH_MS = float(os.getenv("INGEST_BATCH_MS", "250"))
+MAX_INFLIGHT = 2          # batches queued on the writer before the tailers stall
+READ_BYTES = 1 << 18      # per file per poll
+POLL_S = 0.2
+LRU_KEYS = 100_000
+BLOOM_BITS = 1 << 24      # 2 MiB; ~1% false positives at 1.7M keys with 4 hashes
+BLOOM_HASHES = 4
+DEFAULT_OWNER = os.getenv("INGEST_OWNER", "SOC")
+NOTES_MAX = 500
+CORRELATE_EVERY_S = 5.0
+
+log = logging.getLogger("ops.ingest")
+
+
+class KeyFilter:
+    """
+    Dedup cache in front of INSERT OR IGNORE. The bloom filter acts as a
+    doorkeeper: a key's first sighting only sets its bits; a key the bloom
+    already knows goes to SQLite once more (it may be a false positive) and
+    is admitted to the LRU, so further repeats are dropped in memory. The
+    LRU therefore holds keys that actually recur instead of being flushed
+    by a stream of one-off keys.
+    """
+
+    def __init__(self, lru_keys: int = LRU_KEYS, bits: int = BLOOM_BITS, hashes: int = BLOOM_HASHES):
+        self.lru: collections.OrderedDict[str, None] = collections.OrderedDict()
+        self.lru_keys = lru_keys
+        self.bits = bits
+        self.hashes = hashes
+        self.bloom = bytearray(bits // 8)
+
+    def _slots(self, key: str) -> list[int]:
+        # Double hashing over the two halves of the (per-process salted) str
+        # hash; the filter only lives in memory, so that is fine.
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2, bits = h & 0xFFFFFFFF, (h >> 32) | 1, self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, key: str) -> bool:
+        """Sets the key's bits; returns whether they were all set already."""
+        bloom, known = self.bloom, True
+        for b in self._slots(key):
+            byte, mask = b >> 3, 1 << (b & 7)
+            if not bloom[byte] & mask:
+                known = False
+                bloom[byte] |= mask
+        return known
+
+    def seen(self, key: str) -> bool:
+        """True only for certain duplicates."""
+        lru = self.lru
+        if key in lru:
+            lru.move_to_end(key)
+            return True
+        if self.add(key):
+            lru[key] = None
+            if len(lru) > self.lru_keys:
+                lru.popitem(last=False)
+        return False
+
+    def warm(self, db_path: str) -> int:
+        """Loads the keys already stored, so replayed files are admitted to the LRU straight away."""
+        n = 0
+        with Store(db_path) as s:
+            for _names, batch in s.chunks("SELECT event_key FROM sec_events", size=20000):
+                for (key,) in batch:
+                    self.add(key)
+                n += len(batch)
+        return n
+
+
+# Mapping from log records to sec_events columns
+KEY_FIELDS = ("event_key", "event_id", "id", "uuid")
+KIND_FIELDS = ("event_kind", "kind", "event_type", "type", "category", "app")
+IMPACT_FIELDS = ("impact", "severity", "level", "priority")
+OWNER_FIELDS = ("owner", "assignee", "team")
+TIME_FIELDS = ("raised_at", "@timestamp", "timestamp", "time", "ts")
+TEXT_FIELDS = ("notes", "message", "msg")
+
+IMPACT_WORDS = {
+    "critical": "Critical", "crit": "Critical", "emerg": "Critical", "emergency": "Critical",
+    "alert": "Critical", "fatal": "Critical",
+    "high": "High", "error": "High", "err": "High",
+    "medium": "Medium", "warning": "Medium", "warn": "Medium",
+    "low": "Low", "notice": "Low", "info": "Low", "informational": "Low", "debug": "Low",
+}
+# syslog severity 0-7
+SEVERITY_IMPACT = ("Critical", "Critical", "Critical", "High", "Medium", "Low", "Low", "Low")
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_RFC5424 = re.compile(
+    r"<(?P<pri>\d{1,3})>\d{1,2} (?P<ts>\S+) (?P<host>\S+) (?P<app>\S+) \S+ \S+ (?:-|\[.*?\]) ?(?P<msg>.*)"
+)
+_RFC3164 = re.compile(
+    r"(?:<(?P<pri>\d{1,3})>)?(?P<ts>[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (?P<host>\S+) "
+    r"(?P<app>[^:\[\s]+)(?:\[\d+\])?: ?(?P<msg>.*)"
+)
+_MONTHS = {m: i for i, m in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+
+def _first(rec: dict, fields: tuple[str, ...]):
+    for f in fields:
+        v = rec.get(f)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def _impact(v) -> str:
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return SEVERITY_IMPACT[min(max(int(v), 0), 7)]
+    if isinstance(v, str):
+        word = v.strip().lower()
+        if word.isdigit():
+            return SEVERITY_IMPACT[min(int(word), 7)]
+        return IMPACT_WORDS.get(word, "Low")
+    return "Low"
+
+
+def _day(v, today: str) -> str:
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        secs = v / 1000 if v > 1e11 else v  # epoch millis or seconds
+        return dt.datetime.fromtimestamp(secs, dt.timezone.utc).date().isoformat()
+    if isinstance(v, str):
+        m = _ISO_DATE.match(v)
+        if m:
+            return m.group(0)
+    return today
+
+
+def _digest(line: bytes) -> str:
+    return "LOG-" + hashlib.blake2b(line, digest_size=8).hexdigest()
+
+
+def parse_json(line: bytes, today: str, owner: str) -> Optional[tuple]:
+    rec = json.loads(line)
+    if not isinstance(rec, dict):
+        raise ValueError("not a JSON object")
+    key = _first(rec, KEY_FIELDS)
+    notes = _first(rec, TEXT_FIELDS)
+    return (
+        str(key) if key is not None else _digest(line),
+        str(_first(rec, KIND_FIELDS) or "Log"),
+        _impact(_first(rec, IMPACT_FIELDS)),
+        "Open",
+        _day(_first(rec, TIME_FIELDS), today),
+        None,
+        str(_first(rec, OWNER_FIELDS) or owner),
+        str(notes)[:NOTES_MAX] if notes is not None else "",
+    )
+
+
+def parse_syslog(line: bytes, today: str, owner: str) -> Optional[tuple]:
+    text = line.decode("utf-8", errors="replace")
+    m = _RFC5424.match(text) or _RFC3164.match(text)
+    if m is None:
+        raise ValueError("unrecognised syslog line")
+    pri = m.group("pri")
+    ts = m.group("ts")
+    if ts[:3] in _MONTHS:  # RFC 3164 has no year
+        day = f"{today[:4]}-{_MONTHS[ts[:3]]:02d}-{int(ts[4:6]):02d}"
+    else:
+        day = _day(ts, today)
+    return (
+        _digest(line),
+        m.group("app") if m.group("app") != "-" else "Syslog",
+        SEVERITY_IMPACT[int(pri) & 7] if pri else "Low",
+        "Open",
+        day,
+        None,
+        owner,
+        m.group("msg")[:NOTES_MAX],
+    )
+
+
+def parse_line(line: bytes, today: str, owner: str) -> Optional[tuple]:
+    """JSON objects and RFC 5424/3164 syslog lines, told apart by the first byte."""
+    if line[:1] == b"{":
+        return parse_json(line, today, owner)
+    return parse_syslog(line, today, owner)
+
+
+class Tailer:
+    """
+    Follows one file from a byte offset, yielding only complete lines. A
+    shrunken file is read again from the start. A rotated file (new inode
+    at the path) is read from the start once the old one is drained.
+    """
+
+    def __init__(self, path: str, inode: int = 0, pos: int = 0):
+        self.path = path
+        self.source = os.path.abspath(path)
+        self.f = None
+        self.inode = inode
+        self.pos = pos
+
+    def _open(self) -> bool:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        st = os.fstat(f.fileno())
+        if st.st_ino != self.inode or st.st_size < self.pos:
+            self.inode, self.pos = st.st_ino, 0
+        f.seek(self.pos)
+        self.f = f
+        return True
+
+    def read(self, max_bytes: int = READ_BYTES) -> list[bytes]:
+        if self.f is None and not self._open():
+            return []
+        data = self.f.read(max_bytes)
+        if not data:
+            self._check_rotation()
+            return []
+        end = data.rfind(b"\n")
+        if end < 0:
+            if len(data) == max_bytes:  # a single line longer than the read window
+                end = len(data) - 1
+            else:  # partial last line: wait for the rest unless the file was rotated away
+                self.f.seek(self.pos)
+                self._check_rotation()
+                return []
+        self.pos += end + 1
+        self.f.seek(self.pos)
+        return data[:end].split(b"\n")
+
+    def _check_rotation(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self.inode or st.st_size < self.pos:
+            self.close()
+            self._open()
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+@dataclass
+class IngestStats:
+    lines: int = 0
+    rejected: int = 0
+    cache_dups: int = 0
+    db_dups: int = 0
+    inserted: int = 0
+    batches: int = 0
+    stalled_ms: float = 0.0
+    seconds: float = 0.0
+
+    @property
+    def lines_per_sec(self) -> float:
+        return self.lines / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"lines {self.lines:,} ({self.lines_per_sec:,.0f}/s), inserted {self.inserted:,}, "
+            f"duplicates {self.cache_dups:,} cached + {self.db_dups:,} in db, rejected {self.rejected:,}, "
+            f"{self.batches} batches, stalled {self.stalled_ms:,.0f} ms"
+        )
+
+
+class Ingestor:
+    """
+    Tails log files into sec_events through CyberOps.ingest. Rows are
+    flushed every `batch_rows` rows or `batch_ms` milliseconds, whichever
+    comes first, and each batch commits together with its file offsets.
+    Offsets that moved past only blank, rejected or duplicate lines are
+    flushed on the same schedule with an empty batch. At most MAX_INFLIGHT
+    batches wait on the writer at a time; beyond that the tailers stop
+    reading until the oldest commits.
+    """
+
+    def __init__(self, db_path: str, paths: list[str], batch_rows: int = BATCH_ROWS,
+                 batch_ms: float = BATCH_MS, owner: str = DEFAULT_OWNER, warm: bool = True,
+                 parse: Callable[[bytes, str, str], Optional[tuple]] = parse_line):
+        self.ops = CyberOps(db_path)
+        saved = self.ops.ingest_offsets()
+        self.tailers = [Tailer(p, *saved.get(os.path.abspath(p), (0, 0))) for p in paths]
+        self._flushed = self._offsets()
+        self.batch_rows = batch_rows
+        self.batch_ms = batch_ms
+        self.owner = owner
+        self.parse = parse
+        self.keys = KeyFilter()
+        if warm:
+            self.keys.warm(db_path)
+        self.stats = IngestStats()
+        self._rows: list[tuple] = []
+        self._inflight: collections.deque[tuple[Future, int]] = collections.deque()
+        self._since = time.perf_counter()
+
+    def poll(self) -> int:
+        """Reads one window from every file; returns the number of lines read."""
+        today = dt.date.today().isoformat()
+        n = 0
+        for t in self.tailers:
+            lines = t.read()
+            n += len(lines)
+            self._take(lines, today)
+            if len(self._rows) >= self.batch_rows:
+                self.flush()
+        if (time.perf_counter() - self._since) * 1000 >= self.batch_ms and (self._rows or self._moved()):
+            self.flush()
+        return n
+
+    def _offsets(self) -> dict[str, tuple[int, int]]:
+        return {t.source: (t.inode, t.pos) for t in self.tailers if t.inode}
+
+    def _moved(self) -> bool:
+        return self._offsets() != self._flushed
+
+    def _take(self, lines: list[bytes], today: str) -> None:
+        stats, rows, seen, parse, owner = self.stats, self._rows, self.keys.seen, self.parse, self.owner
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if not line:
+                continue
+            stats.lines += 1
+            try:
+                row = parse(line, today, owner)
+            except (ValueError, TypeError, OverflowError) as e:
+                stats.rejected += 1
+                log.debug("rejected line: %s (%r)", e, line[:200])
+                continue
+            if seen(row[0]):
+                stats.cache_dups += 1
+                continue
+            rows.append(row)
+
+    def flush(self) -> None:
+        rows, self._rows = self._rows, []
+        self._since = time.perf_counter()
+        offsets = self._flushed = self._offsets()
+        started = time.perf_counter()
+        fut = self.ops.ingest(rows, offsets)
+        fut.add_done_callback(lambda f: RECORDER.record(
+            "ingest", f"batch of {len(rows)}", (time.perf_counter() - started) * 1000, len(rows), "logic/ingest.py"))
+        self._inflight.append((fut, len(rows)))
+        self.stats.batches += 1
+        while len(self._inflight) > MAX_INFLIGHT:
+            t0 = time.perf_counter()
+            self._settle()
+            self.stats.stalled_ms += (time.perf_counter() - t0) * 1000
+
+    def _settle(self) -> None:
+        fut, n = self._inflight.popleft()
+        inserted = fut.result()
+        self.stats.inserted += inserted
+        self.stats.db_dups += n - inserted
+
+    def drain(self) -> None:
+        if self._rows or self._moved():
+            self.flush()
+        while self._inflight:
+            self._settle()
+
+    def run(self, follow: bool = True, stop: Optional[threading.Event] = None,
+            report_every: float = 0, report: Callable[[IngestStats], None] = print,
+            correlate_every: float = 0) -> IngestStats:
+        """
+        Ingests until the files are exhausted (follow=False) or `stop` is set.
+        With `correlate_every`, new events are clustered into incidents,
+        folded into the daily rollups and added to the search index whenever
+        the files go quiet, at most that often.
+        """
+        started = time.perf_counter()
+        last_report = last_correlate = started
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                n = self.poll()
+                self.stats.seconds = time.perf_counter() - started
+                if report_every and time.perf_counter() - last_report >= report_every:
+                    report(self.stats)
+                    last_report = time.perf_counter()
+                if n:
+                    continue
+                if not follow:
+                    break
+                if self._rows or self._moved():
+                    self.flush()
+                if correlate_every and time.perf_counter() - last_correlate >= correlate_every:
+                    self.drain()
+                    correlate(self.ops.db_path)
+                    fold(self.ops.db_path)
+                    index_pending(self.ops.db_path)
+                    last_correlate = time.perf_counter()
+                stop.wait(POLL_S)
+        finally:
+            self.drain()
+            for t in self.tailers:
+                t.close()
+            if correlate_every:
+                correlate(self.ops.db_path)
+                fold(self.ops.db_path)
+                index_pending(self.ops.db_path)
+            self.stats.seconds = time.perf_counter() - started
+        return self.stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.ingest",
+        description="Tail JSON-lines / syslog files into security events.",
+    )
+    parser.add_argument("paths", nargs="+", help="log files to follow")
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument("--batch-ms", type=float, default=BATCH_MS)
+    parser.add_argument("--owner", default=DEFAULT_OWNER, help="owner for records that name none")
+    parser.add_argument("--once", action="store_true", help="stop at end of files instead of following")
+    parser.add_argument("--no-warm", action="store_true", help="skip loading existing keys into the dedup filter")
+    parser.add_argument("--correlate-every", type=float, default=CORRELATE_EVERY_S,
+                        help="seconds between incident correlation passes (0 disables)")
+    parser.add_argument("--stats-every", type=float, default=10, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    ing = Ingestor(db_path, args.paths, args.batch_rows, args.batch_ms, args.owner, warm=not args.no_warm)
+    try:
+        stats = ing.run(follow=not args.once, report_every=args.stats_every,
+                        report=lambda s: print(f"  ... {s}", flush=True),
+                        correlate_every=args.correlate_every)
+    except KeyboardInterrupt:
+        stats = ing.stats
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
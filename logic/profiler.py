@@ -0,0 +1,313 @@
+from __future__ import annotations
+import argparse
+import csv
+import datetime as dt
+import itertools
+import json
+import mmap
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator, Optional
+
+CHUNK_BYTES = 8 * 1024 * 1024
+STATS_ROWS = 100_000      # column stats come from the first N records
+PARALLEL_MIN_FILES = 4    # directories with fewer files are profiled inline
+MAX_WORKERS = os.cpu_count() or 2
+DISTINCT_CAP = 1000
+
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl",
+              ".parquet": "parquet", ".sqlite": "sqlite", ".sqlite3": "sqlite", ".db": "sqlite"}
+
+
+class ProfileError(RuntimeError):
+    pass
+
+
+class _ColumnStats:
+    __slots__ = ("non_null", "nulls", "distinct", "capped", "min", "max", "total", "numeric")
+
+    def __init__(self):
+        self.non_null = 0
+        self.nulls = 0
+        self.distinct: set = set()
+        self.capped = False
+        self.min = self.max = None
+        self.total = 0.0
+        self.numeric = 0
+
+    def add(self, v: Any) -> None:
+        if v is None or v == "":
+            self.nulls += 1
+            return
+        self.non_null += 1
+        if not self.capped:
+            self.distinct.add(v if isinstance(v, (str, int, float, bool)) else json.dumps(v, sort_keys=True))
+            if len(self.distinct) > DISTINCT_CAP:
+                self.capped = True
+                self.distinct.clear()
+        num = _as_number(v)
+        if num is not None:
+            self.numeric += 1
+            self.total += num
+            self.min = num if self.min is None or num < self.min else self.min
+            self.max = num if self.max is None or num > self.max else self.max
+
+    def result(self) -> dict:
+        out = {"non_null": self.non_null, "nulls": self.nulls,
+               "distinct": f">{DISTINCT_CAP}" if self.capped else len(self.distinct)}
+        if self.numeric and self.numeric == self.non_null:
+            out.update(min=self.min, max=self.max, mean=self.total / self.numeric)
+        return out
+
+
+def _as_number(v: Any) -> Optional[float]:
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    if isinstance(v, str):
+        try:
+            return float(v)
+        except ValueError:
+            return None
+    return None
+
+
+def _mapped(path: str) -> Iterator[bytes]:
+    """Yields CHUNK_BYTES windows over a memory-mapped file."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for off in range(0, len(mm), CHUNK_BYTES):
+                yield mm[off:off + CHUNK_BYTES]
+
+
+def _count_lines(path: str) -> int:
+    lines, last = 0, b"\n"
+    for chunk in _mapped(path):
+        lines += chunk.count(b"\n")
+        last = chunk[-1:]
+    return lines + (0 if last == b"\n" else 1)
+
+
+def _has_quote(path: str) -> bool:
+    return any(b'"' in chunk for chunk in _mapped(path))
+
+
+def _profile_csv(path: str) -> dict:
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        stats = [_ColumnStats() for _ in header]
+        sampled = 0
+        for row in itertools.islice(reader, STATS_ROWS):
+            sampled += 1
+            for st, v in zip(stats, row):
+                st.add(v)
+        if sampled < STATS_ROWS:
+            rows = sampled
+        elif not _has_quote(path):
+            rows = _count_lines(path) - 1  # one record per line, minus the header
+        else:
+            rows = sampled + sum(1 for _ in reader)  # quoted fields may span lines
+    return {"rows": rows, "columns": {h: s.result() for h, s in zip(header, stats)},
+            "sampled_rows": sampled}
+
+
+def _profile_jsonl(path: str) -> dict:
+    """
+    rows counts non-blank lines, parsed or not, on both sides of STATS_ROWS;
+    column stats come from the first STATS_ROWS lines that parse.
+    """
+    stats: dict[str, _ColumnStats] = {}
+    rows = sampled = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rows += 1
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            sampled += 1
+            if isinstance(rec, dict):
+                for k, v in rec.items():
+                    stats.setdefault(k, _ColumnStats()).add(v)
+            if sampled >= STATS_ROWS:
+                break
+        rows += sum(1 for line in f if line.strip())
+    return {"rows": rows, "columns": {k: s.result() for k, s in stats.items()}, "sampled_rows": sampled}
+
+
+def _profile_parquet(path: str) -> dict:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ProfileError("Profiling Parquet needs pyarrow (pip install pyarrow).") from e
+    meta = pq.ParquetFile(path).metadata
+    cols: dict[str, dict] = {}
+    for rg in range(meta.num_row_groups):
+        group = meta.row_group(rg)
+        for c in range(group.num_columns):
+            col = group.column(c)
+            out = cols.setdefault(col.path_in_schema, {"nulls": 0})
+            st = col.statistics
+            if st is None:
+                continue
+            if st.has_null_count:
+                out["nulls"] += st.null_count
+            if st.has_min_max:
+                out["min"] = st.min if "min" not in out else min(out["min"], st.min)
+                out["max"] = st.max if "max" not in out else max(out["max"], st.max)
+    return {"rows": meta.num_rows, "columns": cols, "sampled_rows": 0}
+
+
+def _profile_sqlite(path: str) -> dict:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        counts = {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+    finally:
+        conn.close()
+    return {"rows": sum(counts.values()), "columns": {}, "tables": counts, "sampled_rows": 0}
+
+
+_PROFILERS = {"csv": _profile_csv, "jsonl": _profile_jsonl,
+              "parquet": _profile_parquet, "sqlite": _profile_sqlite}
+
+
+def profile_file(path: str) -> dict:
+    kind = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if kind is None:
+        raise ProfileError(f"Unsupported file type: {path}")
+    st = os.stat(path)
+    out = _PROFILERS[kind](path)
+    out.update(path=path, format=kind, bytes=st.st_size, mtime=st.st_mtime)
+    return out
+
+
+def _files(path: str) -> list[str]:
+    found = []
+    for root, _dirs, names in os.walk(path):
+        for n in sorted(names):
+            if os.path.splitext(n)[1].lower() in EXTENSIONS:
+                found.append(os.path.join(root, n))
+    return found
+
+
+def signature(path: str) -> tuple[int, float]:
+    """(total bytes, newest mtime) of a file or of the profilable files in a directory."""
+    if os.path.isdir(path):
+        stats = [os.stat(f) for f in _files(path)]
+        return sum(s.st_size for s in stats), max((s.st_mtime for s in stats), default=0.0)
+    st = os.stat(path)
+    return st.st_size, st.st_mtime
+
+
+def profile_path(path: str, workers: int = MAX_WORKERS) -> dict:
+    """
+    Exact size and row count plus column stats for a file or directory.
+    Directories with many files are profiled across a process pool.
+    """
+    if not os.path.exists(path):
+        raise ProfileError(f"Path not found: {path}")
+    if not os.path.isdir(path):
+        return profile_file(path)
+
+    files = _files(path)
+    if len(files) >= PARALLEL_MIN_FILES and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+            parts = list(pool.map(profile_file, files))
+    else:
+        parts = [profile_file(f) for f in files]
+    size, mtime = signature(path)
+    return {
+        "path": path, "format": "directory", "bytes": size, "mtime": mtime,
+        "rows": sum(p["rows"] for p in parts),
+        "files": {os.path.relpath(p["path"], path): {k: p[k] for k in ("format", "bytes", "rows", "columns")}
+                  for p in parts},
+    }
+
+
+def profile_asset(db_path: str, asset_name: str, path: Optional[str] = None) -> dict:
+    """Profiles the asset's source (or `path`, which becomes its source) and writes the results back."""
+    from logic.data_catalog import DataCatalog
+    cat = DataCatalog(db_path)
+    path = path or cat.source_path(asset_name)
+    if not path:
+        raise ProfileError(f"{asset_name} has no source path to profile.")
+    prof = profile_path(path)
+    cat.apply_profile(asset_name, path, prof)
+    return prof
+
+
+def reprofile(db_path: str, force: bool = False) -> dict[str, str]:
+    """
+    Re-profiles every asset with a source path whose size or mtime changed
+    since the last run. Returns asset -> "profiled" / "unchanged" / error.
+    """
+    from logic.data_catalog import DataCatalog
+    cat = DataCatalog(db_path)
+    results = {}
+    for asset, path, size, mtime in cat.profiled_sources():
+        try:
+            if not force and (size, mtime) == signature(path):
+                results[asset] = "unchanged"
+                continue
+            cat.apply_profile(asset, path, profile_path(path))
+            results[asset] = "profiled"
+        except (OSError, ProfileError) as e:
+            results[asset] = f"error: {e}"
+    return results
+
+
+def summary(prof: dict) -> dict:
+    """What gets stored in data_assets.column_stats: drops per-file paths and mtimes."""
+    keep = {k: prof[k] for k in ("format", "rows", "bytes") if k in prof}
+    for k in ("columns", "files", "tables", "sampled_rows"):
+        if k in prof:
+            keep[k] = prof[k]
+    keep["profiled_at"] = dt.datetime.now().isoformat(timespec="seconds")
+    return keep
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.profiler",
+        description="Profile data asset files and write size/row counts back to the registry.",
+    )
+    parser.add_argument("asset", nargs="?", help="asset name to (re)profile")
+    parser.add_argument("path", nargs="?", help="file or directory backing the asset")
+    parser.add_argument("--all", action="store_true", help="re-profile every asset whose files changed")
+    parser.add_argument("--force", action="store_true", help="with --all, ignore unchanged mtime/size")
+    parser.add_argument("--every", type=float, default=0, help="with --all, repeat every N seconds")
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    if args.asset:
+        prof = profile_asset(db_path, args.asset, args.path)
+        print(f"{args.asset}: {prof['bytes'] / 1024 / 1024:.1f} MB, {prof['rows']:,} rows")
+        return
+    if not args.all:
+        parser.error("give an asset (and path) or --all")
+    while True:
+        for asset, outcome in reprofile(db_path, force=args.force).items():
+            print(f"{asset}: {outcome}", flush=True)
+        if args.every <= 0:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+import pandas as pd
+from core.archive import ALIAS, attach_archive
+from core.feed import next_seq
+from core.store import Store
+from core.writer import write
+from logic.frames import frame_from_chunks, upsert
+
+CHANGES_MAX = 5000  # beyond this many changed rows a reload is cheaper than a patch
+
+
+@dataclass
+class Page:
+    frame: pd.DataFrame
+    cursor: Optional[tuple]  # (sort value, id) of the last row; None on the last page
+
+
+@dataclass
+class Changes:
+    frame: pd.DataFrame   # rows inserted or modified after the requested seq, one per row
+    seq: int              # pass to the next changes_since call
+    reset: bool           # rows were deleted (or too many changed): reload instead of patching
+    order: tuple[str, ...] = ("id",)  # newest-first sort of the frames it patches
+
+    def apply(self, frame: pd.DataFrame, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Patches a newest-first frame: changed rows replace their old
+        versions, new rows are added, and the result is re-sorted and cut
+        back to `limit` rows, as a fresh newest-first query would return.
+        """
+        out = upsert(frame, self.frame).sort_values(list(self.order), ascending=False, ignore_index=True)
+        return out.head(limit) if limit else out
+
+
+class TableQuery:
+    """
+    Filtered, keyset-paginated reads over one queue table.
+    Pages are ordered newest first on (date_col, id) so each page is an
+    index range scan that starts where the previous one stopped.
+    """
+
+    def __init__(self, table: str, date_col: str, key_col: str,
+                 columns: Iterable[str], filter_cols: Iterable[str]):
+        self.table = table
+        self.date_col = date_col
+        self.key_col = key_col
+        self.columns = tuple(columns)
+        self.filter_cols = frozenset(filter_cols)
+
+    def where(self, filters: dict[str, Any], since: str | None = None,
+              until: str | None = None) -> tuple[str, list]:
+        clauses, params = [], []
+        for col, value in filters.items():
+            if value is None or value == [] or value == ():
+                continue
+            if col not in self.filter_cols:
+                raise ValueError(f"cannot filter {self.table} on {col!r}")
+            if isinstance(value, (list, tuple, set)):
+                values = list(value)
+                clauses.append(f"{col} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        if since:
+            clauses.append(f"{self.date_col} >= ?")
+            params.append(str(since))
+        if until:
+            clauses.append(f"{self.date_col} <= ?")
+            params.append(str(until))
+        return (" AND ".join(clauses) or "1=1"), params
+
+    def page(self, db_path: str, columns: Iterable[str] | None = None,
+             filters: dict[str, Any] | None = None, since: str | None = None,
+             until: str | None = None, after: tuple | None = None, limit: int = 50,
+             archived: bool = False) -> Page:
+        cols = self._projection(columns)
+        where, params = self.where(filters or {}, since, until)
+        if after is not None:
+            # Row-value form: SQLite seeks the (date_col, id) index to the cursor;
+            # the equivalent OR expression makes it scan from the top instead.
+            where += f" AND ({self.date_col}, id) < (?, ?)"
+            params += [after[0], after[1]]
+        select = f"SELECT {', '.join(cols)} FROM {{src}} WHERE {where}"
+        if archived:
+            # Each branch filters on its own indexes; ids never collide because
+            # archived rows keep the AUTOINCREMENT id they had in the hot table.
+            sql = select.format(src=f"main.{self.table}") + " UNION ALL " + select.format(src=f"{ALIAS}.{self.table}")
+            params = params + params
+        else:
+            sql = select.format(src=self.table)
+        sql += f" ORDER BY {self.date_col} DESC, id DESC LIMIT ?"
+        with Store(db_path) as s:
+            if archived:
+                attach_archive(s, db_path)
+            rows = s.all(sql, tuple(params) + (int(limit) + 1,))
+        more = len(rows) > limit
+        rows = rows[:limit]
+        df = frame_from_chunks([(cols, rows)], cols)
+        cursor = (rows[-1][self.date_col], rows[-1]["id"]) if more else None
+        return Page(df, cursor)
+
+    def change_seq(self, db_path: str) -> int:
+        with Store(db_path) as s:
+            row = s.one("SELECT seq FROM table_versions WHERE tbl=?", (self.table,))
+        return int(row[0]) if row else 0
+
+    def changes_since(self, db_path: str, seq: int, columns: Iterable[str] | None = None,
+                      limit: int = CHANGES_MAX) -> Changes:
+        """
+        Rows stamped with an updated_seq after `seq`: one lookup in
+        table_versions and one range scan of ix_{table}_seq.
+        """
+        cols = self._projection(columns)
+        with Store(db_path) as s:
+            row = s.one("SELECT seq, deleted_seq FROM table_versions WHERE tbl=?", (self.table,))
+            high, deleted = (int(row[0]), int(row[1])) if row else (0, 0)
+            rows = [] if deleted > seq or high <= seq else s.all(
+                f"""SELECT {', '.join(cols)} FROM {self.table}
+                    WHERE updated_seq > ? AND updated_seq <= ? ORDER BY updated_seq LIMIT ?""",
+                (int(seq), high, int(limit) + 1),
+            )
+        reset = deleted > seq or len(rows) > limit
+        df = frame_from_chunks([(cols, [] if reset else rows)], cols)
+        return Changes(df, high, reset, (self.date_col, "id"))
+
+    def count(self, db_path: str, filters: dict[str, Any] | None = None,
+              since: str | None = None, until: str | None = None, archived: bool = False) -> int:
+        where, params = self.where(filters or {}, since, until)
+        with Store(db_path) as s:
+            n = int(s.one(f"SELECT COUNT(*) FROM main.{self.table} WHERE {where}", tuple(params))[0])
+            if archived:
+                attach_archive(s, db_path)
+                n += int(s.one(f"SELECT COUNT(*) FROM {ALIAS}.{self.table} WHERE {where}", tuple(params))[0])
+        return n
+
+    def update_keys(self, db_path: str, keys: Iterable[str], values: dict[str, Any]) -> int:
+        """Sets `values` on every row whose key is in `keys`; one transaction."""
+        assign = self._assignments(values)
+        params = [(*values.values(), k) for k in dict.fromkeys(keys)]
+        if not params:
+            return 0
+        sql = f"UPDATE {self.table} SET {assign}, updated_seq = ? WHERE {self.key_col} = ?"
+
+        def run(s: Store) -> int:
+            seq = next_seq(s, self.table)
+            return s.many(sql, [(*p[:-1], seq, p[-1]) for p in params])
+        return write(db_path, run)
+
+    def update_where(self, db_path: str, values: dict[str, Any], filters: dict[str, Any] | None = None,
+                     since: str | None = None, until: str | None = None, all_rows: bool = False) -> int:
+        """
+        Sets `values` on every row matching the filters with a single UPDATE.
+        An empty filter would touch the whole table, so it is refused unless
+        `all_rows` is passed explicitly.
+        """
+        assign = self._assignments(values)
+        where, params = self.where(filters or {}, since, until)
+        if not params and not all_rows:
+            raise ValueError(f"refusing to update every {self.table} row without all_rows=True")
+        sql = f"UPDATE {self.table} SET {assign}, updated_seq = ? WHERE {where}"
+        return write(db_path, lambda s: s.exec(sql, (*values.values(), next_seq(s, self.table), *params)))
+
+    def options(self, db_path: str, col: str) -> list:
+        if col not in self.filter_cols:
+            raise ValueError(f"unknown column {col!r}")
+        with Store(db_path) as s:
+            rows = s.all(f"SELECT DISTINCT {col} FROM {self.table} ORDER BY {col}")
+        return [r[0] for r in rows]
+
+    def _assignments(self, values: dict[str, Any]) -> str:
+        bad = [c for c in values if c not in self.columns or c in ("id", self.key_col)]
+        if not values or bad:
+            raise ValueError(f"cannot update {self.table} columns {bad or '(none)'}")
+        return ", ".join(f"{c} = ?" for c in values)
+
+    def _projection(self, columns: Iterable[str] | None) -> list[str]:
+        wanted = list(columns) if columns else list(self.columns)
+        bad = [c for c in wanted if c not in self.columns]
+        if bad:
+            raise ValueError(f"unknown columns for {self.table}: {bad}")
+        # id and the sort column are always carried so the cursor can be built.
+        return [c for c in ("id", self.date_col) if c not in wanted] + wanted
@@ -0,0 +1,317 @@
+from __future__ import annotations
+import argparse
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from core.archive import archive_path_for
+from core.cache import cached
+from core.migrations import ROLLUPS, TERMINAL_STATES
+from core.perf import timed
+from core.store import Store
+from core.writer import write
+
+BATCH = 100_000
+TREND_DAYS = int(os.getenv("ROLLUP_TREND_DAYS", "90"))
+# Upper bounds (days) of the time-to-resolve histogram buckets; the last bucket is open-ended.
+TTR_EDGES = np.array([1 / 24, 4 / 24, 12 / 24, 1, 2, 3, 5, 7, 10, 14, 21, 30, 45, 60, 90, 180, 365])
+
+_PENDING_COLS = ["sign", "opened", "done", "terminal", "dim1", "dim2"]
+
+
+@dataclass
+class FoldReport:
+    rows: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return f"folded {self.rows} changes in {self.seconds:.2f}s"
+
+
+def contributions(df: pd.DataFrame, dims: tuple[str, str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Rollup deltas for a batch of sign/opened/done/terminal/dim1/dim2 rows:
+    (daily rows keyed dim/value/day, histogram rows keyed dim/value/day/bucket).
+    A row arrives on its opened day and, if terminal, closes on its done
+    day (its opened day when done is missing, which also leaves it out of
+    the time-to-resolve figures). dim "" is the whole table.
+    """
+    opened = df["opened"].astype("string").str.slice(0, 10)
+    done = df["done"].astype("string").str.slice(0, 10)
+    ok = opened.notna() & (opened.str.len() == 10)
+    df, opened, done = df[ok], opened[ok], done[ok]
+    sign = df["sign"].to_numpy(np.int64)
+    terminal = df["terminal"].to_numpy(bool)
+
+    start = pd.to_datetime(df["opened"], errors="coerce", format="ISO8601")
+    end = pd.to_datetime(df["done"], errors="coerce", format="ISO8601")
+    ttr = ((end - start).dt.total_seconds() / 86400).clip(lower=0).to_numpy(np.float64)
+    timed_close = terminal & ~np.isnan(ttr)
+    ttr = np.where(timed_close, ttr, 0.0)
+
+    base = pd.DataFrame({
+        "in_day": opened.to_numpy(object),
+        "out_day": done.fillna(opened).to_numpy(object),
+        "sign": sign,
+        "closed": np.where(terminal, sign, 0),
+        "ttr_n": np.where(timed_close, sign, 0),
+        "ttr_sum": sign * ttr,
+        "bucket": np.searchsorted(TTR_EDGES, ttr),
+        "timed": timed_close,
+    })
+    daily, hist = [], []
+    for dim, col in (("", None), (dims[0], "dim1"), (dims[1], "dim2")):
+        base["value"] = "" if col is None else df[col].fillna("").to_numpy(object)
+        arrived = base.groupby(["value", "in_day"], sort=False)["sign"].sum().rename("arrived")
+        arrived.index.names = ["value", "day"]
+        closing = base[terminal]
+        closed = closing.groupby(["value", "out_day"], sort=False)[["closed", "ttr_n", "ttr_sum"]].sum()
+        closed.index.names = ["value", "day"]
+        part = pd.concat([arrived, closed], axis=1).fillna(0).reset_index()
+        part.insert(0, "dim", dim)
+        daily.append(part)
+        h = base[base["timed"]].groupby(["value", "out_day", "bucket"], sort=False)["sign"].sum().rename("n")
+        h.index.names = ["value", "day", "bucket"]
+        h = h.reset_index()
+        h.insert(0, "dim", dim)
+        hist.append(h)
+    daily_df = pd.concat(daily, ignore_index=True)
+    daily_df = daily_df[(daily_df[["arrived", "closed", "ttr_n"]] != 0).any(axis=1) | (daily_df["ttr_sum"] != 0)]
+    hist_df = pd.concat(hist, ignore_index=True)
+    return daily_df, hist_df[hist_df["n"] != 0]
+
+
+def _apply(s: Store, table: str, daily: pd.DataFrame, hist: pd.DataFrame) -> None:
+    s.many(
+        """INSERT INTO rollup_daily(tbl, dim, value, day, arrived, closed, ttr_n, ttr_sum) VALUES(?,?,?,?,?,?,?,?)
+           ON CONFLICT(tbl, dim, value, day) DO UPDATE SET
+             arrived = arrived + excluded.arrived, closed = closed + excluded.closed,
+             ttr_n = ttr_n + excluded.ttr_n, ttr_sum = ttr_sum + excluded.ttr_sum""",
+        [(table, d, v, day, int(a), int(c), int(n), float(t)) for d, v, day, a, c, n, t in daily[
+            ["dim", "value", "day", "arrived", "closed", "ttr_n", "ttr_sum"]].itertuples(index=False)],
+    )
+    s.many(
+        """INSERT INTO rollup_ttr_hist(tbl, dim, value, day, bucket, n) VALUES(?,?,?,?,?,?)
+           ON CONFLICT(tbl, dim, value, day, bucket) DO UPDATE SET n = n + excluded.n""",
+        [(table, d, v, day, int(b), int(n)) for d, v, day, b, n in hist[
+            ["dim", "value", "day", "bucket", "n"]].itertuples(index=False)],
+    )
+
+
+def _unrolled(s: Store) -> list[tuple[str, int]]:
+    """(table, rolled_id) for every table with rows not yet in the rollups."""
+    out = []
+    for table in ROLLUPS:
+        done = s.one("SELECT rolled_id FROM table_versions WHERE tbl=?", (table,))[0]
+        if s.one(f"SELECT COALESCE(MAX(id), 0) FROM {table}")[0] > done:
+            out.append((table, done))
+    return out
+
+
+def _fold_batch(s: Store) -> int:
+    rows = s.all(f"SELECT id, tbl, {', '.join(_PENDING_COLS)} FROM rollup_pending ORDER BY id LIMIT ?", (BATCH,))
+    if rows:
+        df = pd.DataFrame([tuple(r) for r in rows], columns=["id", "tbl", *_PENDING_COLS])
+        for table, part in df.groupby("tbl"):
+            _apply(s, table, *contributions(part, ROLLUPS[table][3]))
+        s.exec("DELETE FROM rollup_pending WHERE id <= ?", (int(df["id"].iloc[-1]),))
+        return len(rows)
+    n = 0
+    for table, done in _unrolled(s):
+        upto = s.one(f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+                     (done, BATCH))[0]
+        df = _history(s, table, "id > ? AND id <= ?", (done, upto))
+        _apply(s, table, *contributions(df, ROLLUPS[table][3]))
+        s.exec("UPDATE table_versions SET rolled_id=? WHERE tbl=?", (upto, table))
+        n += len(df)
+    return n
+
+
+def pending(db_path: str) -> bool:
+    with Store(db_path) as s:
+        return s.one("SELECT 1 FROM rollup_pending LIMIT 1") is not None or bool(_unrolled(s))
+
+
+def fold(db_path: str) -> FoldReport:
+    """
+    Applies queued updates, then rows inserted since the last fold, to the
+    rollups, BATCH at a time, each batch in one writer transaction. Inserts
+    are not queued by a trigger: a batch reads them from the table by id
+    range, so ingest pays nothing per row. Cheap when nothing is pending.
+    """
+    report = FoldReport()
+    started = time.perf_counter()
+    if not pending(db_path):
+        return report
+    while True:
+        n = write(db_path, _fold_batch, timeout=None)
+        report.rows += n
+        if n == 0:
+            break
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _history(s: Store, table: str, where: str = "1=1", params: tuple = ()) -> pd.DataFrame:
+    opened, done, state, (d1, d2) = ROLLUPS[table]
+    rows = s.all(f"SELECT {opened}, {done}, {state}, {d1}, {d2} FROM {table} WHERE {where}", params)
+    df = pd.DataFrame([tuple(r) for r in rows], columns=["opened", "done", "state", "dim1", "dim2"])
+    df["sign"] = 1
+    df["terminal"] = df["state"].isin(TERMINAL_STATES)
+    return df[_PENDING_COLS]
+
+
+def rebuild(db_path: str, include_archive: bool = True) -> FoldReport:
+    """
+    Recomputes every rollup from the rows themselves, archived history
+    included, in one vectorized pass per table. Needed after deleting rows,
+    which the incremental path does not retract.
+    """
+    started = time.perf_counter()
+    archived: dict[str, pd.DataFrame] = {}
+    archive_path = archive_path_for(db_path)
+    if include_archive and os.path.exists(archive_path):
+        with Store(archive_path) as s:
+            have = {r[0] for r in s.all("SELECT name FROM sqlite_master WHERE type='table'")}
+            archived = {t: _history(s, t) for t in ROLLUPS if t in have}
+
+    def run(s: Store) -> int:
+        s.exec("DELETE FROM rollup_pending")
+        s.exec("DELETE FROM rollup_daily")
+        s.exec("DELETE FROM rollup_ttr_hist")
+        n = 0
+        for table in ROLLUPS:
+            df = _history(s, table)
+            if table in archived:
+                df = pd.concat([archived[table], df], ignore_index=True)
+            _apply(s, table, *contributions(df, ROLLUPS[table][3]))
+            s.exec(f"UPDATE table_versions SET rolled_id = (SELECT COALESCE(MAX(id), 0) FROM {table}) WHERE tbl=?",
+                   (table,))
+            n += len(df)
+        return n
+
+    rows = write(db_path, run, timeout=None)
+    return FoldReport(rows, time.perf_counter() - started)
+
+
+def _p90(hist: pd.DataFrame) -> float:
+    """90th percentile of one bucket histogram, interpolated within its bucket."""
+    counts = hist.groupby("bucket")["n"].sum().reindex(range(len(TTR_EDGES) + 1), fill_value=0).to_numpy()
+    total = counts.sum()
+    if total <= 0:
+        return float("nan")
+    cum = np.cumsum(counts)
+    b = int(np.searchsorted(cum, 0.9 * total))
+    if b >= len(TTR_EDGES):
+        return float(TTR_EDGES[-1])
+    lower = TTR_EDGES[b - 1] if b else 0.0
+    before = cum[b - 1] if b else 0
+    return float(lower + (0.9 * total - before) / counts[b] * (TTR_EDGES[b] - lower))
+
+
+class Rollups:
+    """Trend reads over the daily rollups; never touches the queue tables."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def _since(self, s: Store, table: str, days: int) -> Optional[str]:
+        last = s.one("SELECT MAX(day) FROM rollup_daily WHERE tbl=? AND dim=''", (table,))[0]
+        if last is None:
+            return None
+        return (pd.Timestamp(last) - pd.Timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+    @timed("frame")
+    @cached("rollup_daily")
+    def daily(self, table: str, dim: str = "", value: str = "", days: int = TREND_DAYS) -> pd.DataFrame:
+        """
+        One row per day for the last `days` days of data: arrived, closed,
+        open backlog at the end of the day, and mean time to resolve of the
+        day's closures.
+        """
+        cols = ["day", "arrived", "closed", "backlog", "mttr_days"]
+        with Store(self.db_path) as s:
+            since = self._since(s, table, days)
+            if since is None:
+                return pd.DataFrame(columns=cols)
+            rows = s.all(
+                """SELECT day, arrived, closed, ttr_n, ttr_sum,
+                          SUM(arrived - closed) OVER (ORDER BY day) AS backlog
+                   FROM rollup_daily WHERE tbl=? AND dim=? AND value=? ORDER BY day""",
+                (table, dim, value),
+            )
+        df = pd.DataFrame([tuple(r) for r in rows], columns=["day", "arrived", "closed", "ttr_n", "ttr_sum", "backlog"])
+        df["day"] = pd.to_datetime(df["day"], errors="coerce")
+        df = df.dropna(subset=["day"]).set_index("day")
+        span = pd.date_range(pd.Timestamp(since), df.index.max() if not df.empty else pd.Timestamp(since))
+        df = df.reindex(df.index.union(span))
+        df["backlog"] = df["backlog"].ffill().fillna(0)
+        df = df.fillna({"arrived": 0, "closed": 0, "ttr_n": 0, "ttr_sum": 0}).loc[pd.Timestamp(since):]
+        df["mttr_days"] = (df["ttr_sum"] / df["ttr_n"].where(df["ttr_n"] > 0)).round(2)
+        out = df.rename_axis("day").reset_index()
+        return out[cols].astype({"arrived": "int64", "closed": "int64", "backlog": "int64"})
+
+    @timed("frame")
+    @cached("rollup_daily")
+    def resolve_times(self, table: str, dim: str, days: int = TREND_DAYS, limit: int = 25) -> pd.DataFrame:
+        """Closures, mean and p90 time to resolve (days) per `dim` value over the last `days` days."""
+        cols = [dim, "closed", "mean_days", "p90_days"]
+        with Store(self.db_path) as s:
+            since = self._since(s, table, days)
+            if since is None:
+                return pd.DataFrame(columns=cols)
+            totals = s.all(
+                """SELECT value, SUM(closed), SUM(ttr_n), SUM(ttr_sum) FROM rollup_daily
+                   WHERE tbl=? AND dim=? AND day >= ? GROUP BY value
+                   HAVING SUM(closed) > 0 ORDER BY SUM(closed) DESC LIMIT ?""",
+                (table, dim, since, int(limit)),
+            )
+            values = [r[0] for r in totals]
+            hist = pd.DataFrame(
+                [tuple(r) for r in s.all(
+                    f"""SELECT value, bucket, SUM(n) FROM rollup_ttr_hist
+                        WHERE tbl=? AND dim=? AND day >= ? AND value IN ({','.join('?' * len(values))})
+                        GROUP BY value, bucket""",
+                    (table, dim, since, *values),
+                )] if values else [],
+                columns=["value", "bucket", "n"],
+            )
+        by_value = dict(tuple(hist.groupby("value"))) if not hist.empty else {}
+        out = [
+            (v, int(closed), round(t_sum / t_n, 2) if t_n else float("nan"),
+             round(_p90(by_value[v]), 2) if v in by_value else float("nan"))
+            for v, closed, t_n, t_sum in totals
+        ]
+        return pd.DataFrame(out, columns=cols)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.rollups",
+        description="Fold queued changes into the daily backlog/time-to-resolve rollups.",
+    )
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute from all rows, archive included")
+    parser.add_argument("--every", type=float, default=0, help="keep running, folding every N seconds")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    if args.rebuild:
+        report = rebuild(db_path)
+        print(f"rebuilt from {report.rows} rows in {report.seconds:.2f}s", flush=True)
+    while True:
+        print(fold(db_path), flush=True)
+        if args.every <= 0:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+from __future__ import annotations
+import argparse
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+from core.cache import cached
+from core.migrations import FTS_COLUMNS
+from core.perf import timed
+from core.store import Store
+from core.writer import write
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+INDEX_BATCH = 50_000  # rows indexed per writer transaction
+
+
+@dataclass(frozen=True)
+class _Source:
+    label: str
+    key_col: str
+    detail: str                 # SQL over the base row `b`
+    weights: tuple[float, ...]  # bm25 weight per FTS column, in FTS_COLUMNS order
+
+
+SOURCES = {
+    "sec_events": _Source("Security event", "event_key",
+                          "b.event_kind || ' · ' || b.state || ' · ' || b.owner", (4.0, 2.0, 1.0, 1.0)),
+    "it_requests": _Source("IT request", "req_key",
+                           "b.topic || ' · ' || b.phase || ' · ' || b.assignee", (4.0, 2.0, 1.0)),
+    "data_assets": _Source("Data asset", "asset_name",
+                           "b.origin || ' · ' || b.steward", (4.0, 1.0, 1.0)),
+}
+
+
+def fts_query(text: str, prefix: bool = True) -> str:
+    """
+    Free text to an FTS5 query: every word must match, each quoted so
+    punctuation cannot be read as query syntax, and (with `prefix`) each
+    matching as a prefix, so "phish mal" finds "phishing malware".
+    """
+    star = "*" if prefix else ""
+    return " ".join(f'"{t}"{star}' for t in _TERM.findall(text))
+
+
+def _unindexed(s: Store) -> list[tuple[str, int, int]]:
+    """(table, indexed_id, max id) for every index that is behind its table."""
+    out = []
+    for table in FTS_COLUMNS:
+        done = s.one("SELECT indexed_id FROM table_versions WHERE tbl=?", (table,))[0]
+        high = s.one(f"SELECT COALESCE(MAX(id), 0) FROM {table}")[0]
+        if high > done:
+            out.append((table, done, high))
+    return out
+
+
+def _index_batch(s: Store) -> int:
+    n = 0
+    for table, done, _high in _unindexed(s):
+        names = ", ".join(FTS_COLUMNS[table])
+        upto = s.one(f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+                     (done, INDEX_BATCH))[0]
+        n += s.exec(f"INSERT INTO {table}_fts(rowid, {names}) SELECT id, {names} FROM {table} "
+                    f"WHERE id > ? AND id <= ?", (done, upto))
+        s.exec("UPDATE table_versions SET indexed_id=? WHERE tbl=?", (upto, table))
+    return n
+
+
+def index_pending(db_path: str) -> int:
+    """
+    Indexes rows added since the last call, INDEX_BATCH at a time, each
+    batch in one writer transaction; returns rows indexed. Inserts are not
+    indexed as they are written (one large FTS5 segment costs far less
+    than one per small transaction), so readers call this before matching.
+    Cheap when nothing is pending.
+    """
+    with Store(db_path) as s:
+        if not _unindexed(s):
+            return 0
+    total = 0
+    while True:
+        n = write(db_path, _index_batch, timeout=None)
+        total += n
+        if n == 0:
+            return total
+
+
+class Search:
+    """Ranked full-text search over security events, IT requests and data assets."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    @timed("search")
+    @cached("sec_events", "it_requests", "data_assets")
+    def query(self, text: str, tables: Optional[tuple[str, ...]] = None, limit: int = 20,
+              prefix: bool = True) -> pd.DataFrame:
+        """
+        Best `limit` matches across `tables` (default: all), best first, as
+        source/key/detail/snippet/score rows; matched words in the snippet
+        are wrapped in ** for markdown. Ranking is bm25 with key columns
+        weighted highest, over every match: each table returns its best
+        `limit` in SQL, and snippets are built for the overall winners only.
+        """
+        match = fts_query(text, prefix)
+        cols = ["source", "key", "detail", "snippet", "score"]
+        if not match:
+            return pd.DataFrame(columns=cols)
+        index_pending(self.db_path)
+        scored: list[tuple[float, str, int]] = []
+        with Store(self.db_path) as s:
+            for table in tables or tuple(SOURCES):
+                fts = f"{table}_fts"
+                weights = ", ".join(str(w) for w in SOURCES[table].weights)
+                scored.extend(
+                    (r[1], table, r[0]) for r in s.all(
+                        f"""SELECT rowid, bm25({fts}, {weights}) AS score FROM {fts}
+                            WHERE {fts} MATCH ? ORDER BY score, rowid DESC LIMIT ?""",
+                        (match, limit),
+                    )
+                )
+            scored.sort()
+            best = scored[:limit]
+
+            hits = []
+            for table in {t for _score, t, _rid in best}:
+                src = SOURCES[table]
+                fts = f"{table}_fts"
+                ids = {rid: score for score, t, rid in best if t == table}
+                marks = ",".join("?" * len(ids))
+                # The rowid range is what FTS5 can seek on; "+rowid IN" only filters within it.
+                for r in s.all(
+                    f"""SELECT b.id, b.{src.key_col}, {src.detail},
+                               snippet({fts}, -1, '**', '**', '…', 12)
+                        FROM {fts} JOIN {table} b ON b.id = {fts}.rowid
+                        WHERE {fts} MATCH ? AND {fts}.rowid BETWEEN ? AND ? AND +{fts}.rowid IN ({marks})""",
+                    (match, min(ids), max(ids), *ids),
+                ):
+                    hits.append((src.label, r[1], r[2], r[3], ids[r[0]]))
+        hits.sort(key=lambda h: h[4])
+        return pd.DataFrame(hits, columns=cols)
+
+
+def rebuild(db_path: str, optimize: bool = True) -> dict[str, int]:
+    """
+    Rebuilds every FTS index from its base table (after bulk edits with
+    triggers off, or to recover a damaged index), then merges index
+    segments. Returns rows indexed per table.
+    """
+    def run(s: Store) -> dict[str, int]:
+        out = {}
+        for table in FTS_COLUMNS:
+            s.exec(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+            s.exec(f"UPDATE table_versions SET indexed_id = (SELECT COALESCE(MAX(id), 0) FROM {table}) WHERE tbl=?",
+                   (table,))
+            if optimize:
+                s.exec(f"INSERT INTO {table}_fts({table}_fts) VALUES ('optimize')")
+            out[table] = s.one(f"SELECT COUNT(*) FROM {table}")[0]
+        return out
+    return write(db_path, run, timeout=None)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.search",
+        description="Search events, requests and assets, or rebuild the full-text indexes.",
+    )
+    parser.add_argument("text", nargs="?", help="words to search for")
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--table", action="append", choices=sorted(SOURCES), help="limit to a table (repeatable)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--exact", action="store_true", help="match whole words only")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the indexes from the base tables")
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    if args.rebuild:
+        for table, n in rebuild(db_path).items():
+            print(f"{table}: indexed {n:,} rows")
+    if args.text:
+        try:
+            hits = Search(db_path).query(args.text, tuple(args.table or ()) or None, args.limit, not args.exact)
+        except sqlite3.OperationalError as e:
+            parser.exit(1, f"search failed: {e}\n")
+        print(hits.to_string(index=False) if not hits.empty else "no matches")
+    elif not args.rebuild:
+        parser.error("give search text or --rebuild")
+
+
+if __name__ == "__main__":
+    main()
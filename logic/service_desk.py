@@ -1,24 +1,87 @@
 import pandas as pd
-from core.store import Store
+from core.cache import cached
+from core.feed import next_seq
+from core.perf import timed
+from core.writer import write
+from logic.frames import materialize
+from logic.queries import Changes, Page, TableQuery
+from logic.triage import work_next
+
+IT_REQUESTS = TableQuery(
+    "it_requests", "opened_at", "req_key",
+    columns=["id", "req_key", "topic", "urgency", "phase", "opened_at", "closed_at", "assignee"],
+    filter_cols=["phase", "urgency", "assignee", "topic"],
+)
 
 class ServiceDesk:
     def __init__(self, db_path: str):
         self.db_path = db_path
 
+    @timed("frame")
+    @cached("it_requests")
     def frame(self) -> pd.DataFrame:
-        with Store(self.db_path) as s:
-            rows = s.all("SELECT * FROM it_requests ORDER BY opened_at DESC")
-        return pd.DataFrame([dict(r) for r in rows])
+        return materialize(self.db_path, "SELECT * FROM it_requests ORDER BY opened_at DESC")
+
+    @timed("frame")
+    @cached("it_requests")
+    def query(self, columns: list[str] | None = None,
+              phase: list[str] | None = None,
+              urgency: list[str] | None = None,
+              assignee: list[str] | None = None,
+              since: str | None = None, until: str | None = None,
+              after: tuple | None = None, limit: int = 50, archived: bool = False) -> Page:
+        return IT_REQUESTS.page(
+            self.db_path, columns, {"phase": phase, "urgency": urgency, "assignee": assignee},
+            since=since, until=until, after=after, limit=limit, archived=archived,
+        )
+
+    @cached("it_requests")
+    def count(self,
+              phase: list[str] | None = None,
+              urgency: list[str] | None = None,
+              assignee: list[str] | None = None,
+              since: str | None = None, until: str | None = None, archived: bool = False) -> int:
+        return IT_REQUESTS.count(
+            self.db_path, {"phase": phase, "urgency": urgency, "assignee": assignee},
+            since=since, until=until, archived=archived,
+        )
+
+    def change_seq(self) -> int:
+        return IT_REQUESTS.change_seq(self.db_path)
+
+    @timed("frame")
+    def changes_since(self, seq: int, columns: list[str] | None = None) -> Changes:
+        """Rows added or modified after change sequence `seq` (see TableQuery.changes_since)."""
+        return IT_REQUESTS.changes_since(self.db_path, seq, columns)
+
+    def work_next(self, assignee: str | None = None, limit: int = 20) -> pd.DataFrame:
+        """Open rows by priority (severity weight plus age), highest first; see logic.triage."""
+        return work_next(self.db_path, "it_requests", assignee, limit)
+
+    @cached("it_requests")
+    def options(self, column: str) -> list:
+        return IT_REQUESTS.options(self.db_path, column)
 
     def set_phase(self, req_key: str, phase: str) -> None:
-        with Store(self.db_path) as s:
-            s.exec("UPDATE it_requests SET phase=? WHERE req_key=?", (phase, req_key))
+        write(self.db_path, lambda s: s.exec(
+            "UPDATE it_requests SET phase=?, updated_seq=? WHERE req_key=?",
+            (phase, next_seq(s, "it_requests"), req_key),
+        ))
+
+    def set_phase_many(self, req_keys: list[str], new_phase: str) -> int:
+        return IT_REQUESTS.update_keys(self.db_path, req_keys, {"phase": new_phase})
+
+    def set_phase_where(self, new_phase: str, filters: dict[str, list[str] | None],
+                        since: str | None = None, until: str | None = None,
+                        all_rows: bool = False) -> int:
+        """Applies the change to every row matching the same filters as query()."""
+        return IT_REQUESTS.update_where(self.db_path, {"phase": new_phase}, filters, since=since, until=until,
+                                        all_rows=all_rows)
 
     def add_request(self, req_key: str, topic: str, urgency: str, phase: str,
                     opened_at: str, assignee: str, closed_at: str | None = None) -> None:
-        with Store(self.db_path) as s:
-            s.exec(
-                """INSERT INTO it_requests(req_key,topic,urgency,phase,opened_at,closed_at,assignee)
-                   VALUES(?,?,?,?,?,?,?)""",
-                (req_key, topic, urgency, phase, opened_at, closed_at, assignee),
-            )
+        write(self.db_path, lambda s: s.exec(
+            """INSERT INTO it_requests(req_key,topic,urgency,phase,opened_at,closed_at,assignee,updated_seq)
+               VALUES(?,?,?,?,?,?,?,?)""",
+            (req_key, topic, urgency, phase, opened_at, closed_at, assignee, next_seq(s, "it_requests")),
+        ))
@@ -0,0 +1,65 @@
+from __future__ import annotations
+import argparse
+from typing import Optional
+
+import pandas as pd
+from core.migrations import TRIAGE, TRIAGE_WEIGHT_DAYS
+from core.perf import timed
+from logic.frames import materialize
+
+# table -> columns shown next to the priority
+SHOWN = {
+    "sec_events": ("event_key", "event_kind", "impact", "state", "raised_at", "owner"),
+    "it_requests": ("req_key", "topic", "urgency", "phase", "opened_at", "assignee"),
+}
+
+
+def weights_caption(table: str) -> str:
+    severity = TRIAGE[table][2]
+    levels = ", ".join(f"{k} {v}" for k, v in TRIAGE_WEIGHT_DAYS.items() if v)
+    return f"Priority = days waiting + {severity} weight in days ({levels})."
+
+
+@timed("frame")
+def work_next(db_path: str, table: str, who: Optional[str] = None, limit: int = 20) -> pd.DataFrame:
+    """
+    Highest-priority live rows, optionally for one owner/assignee: a range
+    read of ix_{table}_triage (or its per-owner twin), never a sort over
+    the queue. Not cached: priority grows with the clock, order does not.
+    """
+    owner = TRIAGE[table][3]
+    where, params = "triage_key IS NOT NULL", []
+    if who:
+        where += f" AND {owner} = ?"
+        params.append(who)
+    return materialize(
+        db_path,
+        f"""SELECT {', '.join(SHOWN[table])}, ROUND(julianday('now', 'localtime') - triage_key, 1) AS priority
+            FROM {table} WHERE {where} ORDER BY triage_key, id LIMIT ?""",
+        (*params, int(limit)),
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m logic.triage",
+        description="List the open events or requests to work on next.",
+    )
+    parser.add_argument("table", choices=sorted(TRIAGE))
+    parser.add_argument("--db", help="database path (default: config db_path)")
+    parser.add_argument("--who", help="only this owner (events) or assignee (requests)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    from config import CFG
+    from core.bootstrap import ensure_schema
+    db_path = args.db or CFG.db_path
+    ensure_schema(db_path)
+
+    df = work_next(db_path, args.table, args.who, args.limit)
+    print(df.to_string(index=False) if not df.empty else "nothing open")
+    print(weights_caption(args.table))
+
+
+if __name__ == "__main__":
+    main()
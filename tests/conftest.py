@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A migrated, empty database in a fresh directory."""
+    from core.bootstrap import ensure_schema
+    path = os.path.join(tmp_path, "ops.sqlite3")
+    ensure_schema(path)
+    return path
+
+
+class Upstream:
+    """
+    A local stand-in for the chat completions endpoint. Each POST takes the
+    next (status, headers, chunks) from `replies` (the last one repeats);
+    chunks are sent one by one with chunked transfer encoding. Requests
+    wait on `gate` before answering.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.replies: list[tuple[int, dict, list[bytes]]] = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.lock = threading.Lock()
+        self.url = ""
+
+    def reply(self, status: int = 200, chunks: list[bytes] | None = None, **headers: str) -> None:
+        self.replies.append((status, headers, chunks or []))
+
+    def answer(self, text: str) -> None:
+        body = json.dumps({"choices": [{"message": {"role": "assistant", "content": text}}]}).encode()
+        self.reply(200, [body], **{"Content-Type": "application/json"})
+
+    def events(self, *events: object, done: bool = True) -> None:
+        chunks = [b"data: " + (e if isinstance(e, bytes) else json.dumps(e).encode()) + b"\n\n" for e in events]
+        self.reply(200, chunks + ([b"data: [DONE]\n\n"] if done else []), **{"Content-Type": "text/event-stream"})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """An Upstream on a free local port, with logic.assistant pointed at it."""
+    import logic.assistant
+    from config import AppConfig
+
+    stub = Upstream()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with stub.lock:
+                n = stub.calls
+                stub.calls += 1
+            status, headers, chunks = stub.replies[min(n, len(stub.replies) - 1)]
+            stub.gate.wait(10)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name.replace("_", "-"), value)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for chunk in chunks:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub.url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(logic.assistant, "CFG", AppConfig(openrouter_key="test-key", openrouter_base_url=stub.url))
+    yield stub
+    stub.gate.set()
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,54 @@
+import os
+
+import core.security
+from core.security import check_hash, hash_cost, hash_many, make_hash, needs_rehash, read_handles
+from core.store import Store
+from core.writer import write
+from logic.accounts import Accounts
+
+FAST = 4  # bcrypt's minimum cost, to keep the tests quick
+
+
+def test_hash_many_keeps_order_inline_and_across_processes():
+    for passwords, workers in ((["a", "b"], 4), ([f"pw{i}" for i in range(6)], 2)):
+        hashes = hash_many(passwords, FAST, workers)
+        assert len(hashes) == len(passwords) and len(set(hashes)) == len(hashes)
+        assert all(check_hash(p, h) and hash_cost(h) == FAST for p, h in zip(passwords, hashes))
+
+
+def test_needs_rehash_compares_the_cost_with_the_configured_one(monkeypatch):
+    monkeypatch.setattr(core.security, "BCRYPT_ROUNDS", 5)
+    assert needs_rehash(make_hash("pw", FAST))
+    assert not needs_rehash(make_hash("pw"))
+    assert not needs_rehash(make_hash("pw", FAST), FAST)
+    assert needs_rehash("not a bcrypt hash")
+
+
+def test_sign_in_moves_an_old_hash_to_the_configured_cost(db_path, monkeypatch):
+    monkeypatch.setattr(core.security, "BCRYPT_ROUNDS", 5)
+    old = make_hash("secret", FAST)
+    write(db_path, lambda s: s.exec(
+        "INSERT INTO accounts(handle, pass_hash, access_level) VALUES ('ana', ?, 'analyst')", (old,)))
+
+    accounts = Accounts(db_path)
+    assert accounts.authenticate("ana", "wrong") is None
+    assert accounts.authenticate("ana", "secret")["handle"] == "ana"
+    write(db_path, lambda s: None)  # the rehash is queued on the same writer
+    with Store(db_path) as s:
+        new = s.one("SELECT pass_hash FROM accounts WHERE handle='ana'")[0]
+    assert new != old and hash_cost(new) == 5 and check_hash("secret", new)
+
+
+def test_provision_adds_only_new_valid_users(db_path, tmp_path):
+    users_txt = os.path.join(tmp_path, "users.txt")
+    accounts = Accounts(db_path)
+    first = accounts.provision([("ana", "pw1", "analyst"), ("bo", "pw2", "admin")], users_txt, FAST, 1)
+    again = accounts.provision(
+        [("ana", "pw1", "analyst"), ("cy", "pw3", "analyst"), ("", "pw", "analyst"), ("d,e", "pw", "x")],
+        users_txt, FAST, 1,
+    )
+    assert (first.added, again.added, again.existing, again.invalid) == (2, 1, 1, 2)
+    assert read_handles(users_txt) == {"ana", "bo", "cy"}
+    with Store(db_path) as s:
+        rows = {r[0]: r[1] for r in s.all("SELECT handle, pass_hash FROM accounts")}
+    assert set(rows) == {"ana", "bo", "cy"} and check_hash("pw3", rows["cy"])
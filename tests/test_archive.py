@@ -0,0 +1,41 @@
+import datetime as dt
+
+from core.archive import archive
+from logic.cyber_ops import CyberOps
+
+TODAY = dt.date(2026, 6, 1)
+
+
+def _add(ops: CyberOps, n: int, state: str, day: str) -> None:
+    for i in range(n):
+        ops.add_event(f"{state}-{day}-{i}", "Phishing", "Low", state, day, "Analyst001", cleared_at=day)
+
+
+def test_archive_moves_closed_rows_and_purge_expires_cached_reads(db_path):
+    ops = CyberOps(db_path)
+    _add(ops, 3, "Closed", "2025-01-10")
+    _add(ops, 2, "Open", "2025-01-10")
+    assert ops.count(archived=True) == 5
+
+    report = archive(db_path, after_days=90, today=TODAY)
+    assert report.moved["sec_events"] == 3
+    assert ops.count() == 2
+    assert ops.count(archived=True) == 5
+
+    # Purging touches only the archive database; the cached count must still notice.
+    report = archive(db_path, after_days=90, retain_days=30, today=TODAY)
+    assert report.purged["sec_events"] == 3
+    assert ops.count(archived=True) == 2
+
+
+def test_rerun_repairs_a_copy_that_was_not_followed_by_its_delete(db_path):
+    ops = CyberOps(db_path)
+    _add(ops, 4, "Resolved", "2025-02-01")
+    archive(db_path, after_days=90, today=TODAY)
+    # As if the process died after the archive commit: the rows are back in main.
+    _add(ops, 4, "Resolved", "2025-02-01")
+
+    report = archive(db_path, after_days=90, today=TODAY)
+    assert report.moved["sec_events"] == 4
+    assert ops.count() == 0
+    assert ops.count(archived=True) == 4
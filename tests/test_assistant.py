@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+
+import pytest
+
+from logic.assistant import AssistantError, ask, ask_stream
+from logic.assistant_cache import ResponseCache
+
+CONTEXT = "open events: 3"
+
+
+def test_repeat_question_is_served_from_the_cache(db_path, upstream):
+    upstream.answer("- patch the VPN")
+    first = ask("What now?", CONTEXT, db_path)
+    again = ask("  what NOW ", CONTEXT, db_path)
+    assert (first.source, again.source) == ("miss", "hit")
+    assert again.text == first.text == "- patch the VPN"
+    assert upstream.calls == 1
+    assert ask("What now?", CONTEXT + " (changed)", db_path).source == "miss"
+    assert upstream.calls == 2
+
+
+def test_concurrent_identical_questions_share_one_upstream_call(db_path, upstream):
+    upstream.answer("- one answer")
+    upstream.gate.clear()
+    n = 6
+    before = ResponseCache._counts["coalesced"]
+    answers = []
+    threads = [threading.Thread(target=lambda: answers.append(ask("Why?", CONTEXT, db_path))) for _ in range(n)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 10
+    while ResponseCache._counts["coalesced"] - before < n - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    upstream.gate.set()
+    for t in threads:
+        t.join(10)
+    assert upstream.calls == 1
+    assert sorted(a.source for a in answers) == ["coalesced"] * (n - 1) + ["miss"]
+    assert {a.text for a in answers} == {"- one answer"}
+
+
+def test_503_is_retried(db_path, upstream):
+    upstream.reply(503, Retry_After="0")
+    upstream.answer("- after a retry")
+    assert ask("Retry?", CONTEXT, db_path).text == "- after a retry"
+    assert upstream.calls == 2
+
+
+def _delta(text: str) -> dict:
+    return {"choices": [{"delta": {"content": text}}]}
+
+
+def test_stream_joins_events_split_across_chunks(db_path, upstream):
+    event = b'data: {"choices": [{"delta": {"content": "- isolate"}}]}\n\n'
+    upstream.reply(200, [b": keep-alive\n\n", event[:17], event[17:], b"data: " + json.dumps(_delta(" host")).encode(),
+                         b"\n\ndata: [DONE]\n\n", b"data: " + json.dumps(_delta("ignored")).encode() + b"\n\n"],
+                   Content_Type="text/event-stream")
+    with ask_stream("Next?", CONTEXT, db_path) as reply:
+        assert list(reply.chunks) == ["- isolate", " host"]
+    assert ask_stream("Next?", CONTEXT, db_path).source == "hit"
+    assert upstream.calls == 1
+
+
+def test_error_mid_stream_is_raised_and_not_cached(db_path, upstream):
+    upstream.events(_delta("- partial"), {"error": {"message": "upstream overloaded"}}, done=False)
+    upstream.events(_delta("- whole answer"))
+    with ask_stream("Next?", CONTEXT, db_path) as reply:
+        chunks = iter(reply.chunks)
+        assert next(chunks) == "- partial"
+        with pytest.raises(AssistantError, match="upstream overloaded"):
+            next(chunks)
+    with ask_stream("Next?", CONTEXT, db_path) as reply:
+        assert (reply.source, "".join(reply.chunks)) == ("miss", "- whole answer")
+    assert upstream.calls == 2
+
+
+def test_abandoned_stream_frees_the_question(db_path, upstream):
+    upstream.events(_delta("- first"), _delta(" second"))
+    with ask_stream("Next?", CONTEXT, db_path) as reply:
+        assert next(iter(reply.chunks)) == "- first"
+    with ask_stream("Next?", CONTEXT, db_path) as reply:
+        assert (reply.source, "".join(reply.chunks)) == ("miss", "- first second")
+    assert upstream.calls == 2
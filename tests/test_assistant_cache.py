@@ -0,0 +1,39 @@
+import pytest
+
+import logic.assistant_cache
+from logic.assistant_cache import ResponseCache
+
+
+def _stream(calls: list):
+    def stream():
+        calls.append(1)
+        yield "- a"
+        yield "nswer"
+    return stream
+
+
+def test_unread_reply_releases_its_slot_when_closed(db_path):
+    cache, calls = ResponseCache(db_path), []
+    with cache.open("m", "q", "ctx", _stream(calls)) as reply:
+        waiter = cache.open("m", "q", "ctx", _stream(calls))
+        assert (reply.source, waiter.source) == ("miss", "coalesced")
+    with pytest.raises(RuntimeError, match="abandoned"):
+        "".join(waiter.chunks)
+    # Nothing is held for the question, so the next caller leads.
+    again = cache.open("m", "q", "ctx", _stream(calls))
+    assert again.source == "miss"
+    assert "".join(again.chunks) == "- answer"
+    assert cache.open("m", "q", "ctx", _stream(calls)).source == "hit"
+
+
+def test_stale_leader_is_evicted(db_path, monkeypatch):
+    cache, calls = ResponseCache(db_path), []
+    dropped = cache.open("m", "q", "ctx", _stream(calls))
+    waiter = cache.open("m", "q", "ctx", _stream(calls))
+    monkeypatch.setattr(logic.assistant_cache, "INFLIGHT_STALE_S", -1)
+    fresh = cache.open("m", "q", "ctx", _stream(calls))
+    assert (dropped.source, fresh.source) == ("miss", "miss")
+    with pytest.raises(RuntimeError, match="abandoned"):
+        "".join(waiter.chunks)
+    assert "".join(fresh.chunks) == "- answer"
+    assert calls == [1]
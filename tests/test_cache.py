@@ -0,0 +1,73 @@
+import sqlite3
+
+from core.cache import FrameCache, cached
+from logic.cyber_ops import CyberOps
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_entry_is_served_until_its_table_version_moves(db_path):
+    cache, load = FrameCache(1 << 20), _Counter()
+    get = lambda: cache.get_or_load(db_path, ("sec_events",), ("k",), load)
+    assert (get(), get()) == (1, 1)
+
+    CyberOps(db_path).add_event("SEC-1", "Phishing", "Low", "Open", "2026-02-01", "Analyst001")
+    assert get() == 2
+
+    # A write from a connection outside the pool, as another process would make.
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE sec_events SET state='Closed'")
+    conn.close()
+    assert (get(), get()) == (3, 3)
+    assert cache.stats()["hits"] == 2
+
+
+def test_writes_to_other_tables_keep_the_entry(db_path):
+    cache, load = FrameCache(1 << 20), _Counter()
+    get = lambda: cache.get_or_load(db_path, ("sec_events",), ("k",), load)
+    get()
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO ingest_offsets(source, inode, pos, updated_at) VALUES ('x', 1, 2, 'now')")
+        conn.execute("UPDATE data_assets SET steward='someone'")
+    conn.close()
+    assert get() == 1
+
+
+def test_least_recently_used_entries_go_first_over_budget(db_path):
+    cache = FrameCache(3 * len(bytes(1000)) + 200)
+    for key in "abc":
+        cache.get_or_load(db_path, ("sec_events",), (key,), lambda: bytes(1000))
+    cache.get_or_load(db_path, ("sec_events",), ("a",), lambda: bytes(1000))
+    cache.get_or_load(db_path, ("sec_events",), ("d",), lambda: bytes(1000))
+    assert cache.stats()["evictions"] == 1
+    misses = cache.stats()["misses"]
+    cache.get_or_load(db_path, ("sec_events",), ("a",), lambda: bytes(1000))
+    assert cache.stats()["misses"] == misses
+    cache.get_or_load(db_path, ("sec_events",), ("b",), lambda: bytes(1000))
+    assert cache.stats()["misses"] == misses + 1
+
+
+def test_cached_methods_are_keyed_by_their_arguments(db_path):
+    class Source:
+        def __init__(self):
+            self.db_path = db_path
+            self.calls = 0
+
+        @cached("sec_events")
+        def count(self, state: str) -> int:
+            self.calls += 1
+            return self.calls
+
+    src = Source()
+    assert (src.count("Open"), src.count("Open"), src.count("Closed")) == (1, 1, 2)
+    CyberOps(db_path).add_event("SEC-1", "Phishing", "Low", "Open", "2026-02-01", "Analyst001")
+    assert src.count("Open") == 3
@@ -0,0 +1,43 @@
+from core.store import Store
+from logic.cyber_ops import CyberOps, SEC_EVENTS
+
+
+def _add(ops: CyberOps, n: int, prefix: str) -> None:
+    for i in range(n):
+        ops.add_event(f"{prefix}-{i}", "Phishing", "Low", "Open", f"2026-03-{i + 1:02d}", "Analyst001")
+
+
+def test_patching_with_changes_matches_a_reload(db_path):
+    ops = CyberOps(db_path)
+    _add(ops, 5, "a")
+    cols = ["event_key", "state", "owner"]
+    seen = SEC_EVENTS.page(db_path, cols, limit=100).frame
+    seq = ops.change_seq()
+
+    _add(ops, 2, "b")
+    ops.update_state("a-1", "In Progress")
+    ops.update_state_many(["a-2", "b-0"], "Closed")
+    ops.update_state_where("Resolved", {"state": ["Open"], "owner": ["Analyst001"]}, since="2026-03-05")
+    # A writer that does not set updated_seq is still picked up by the trigger.
+    with Store(db_path) as s:
+        s.exec("UPDATE sec_events SET owner='Analyst002' WHERE event_key='a-0'")
+        s.commit()
+
+    changes = ops.changes_since(seq, cols)
+    assert not changes.reset
+    assert set(changes.frame["event_key"]) == {"a-0", "a-1", "a-2", "a-4", "b-0", "b-1"}
+    patched = changes.apply(seen)[["id", *cols]]
+    fresh = SEC_EVENTS.page(db_path, cols, limit=100).frame[["id", *cols]]
+    assert patched.reset_index(drop=True).equals(fresh.reset_index(drop=True))
+    assert ops.changes_since(changes.seq, cols).frame.empty
+
+
+def test_one_sequence_number_per_statement(db_path):
+    ops = CyberOps(db_path)
+    _add(ops, 3, "a")
+    seq = ops.change_seq()
+    ops.update_state_many(["a-0", "a-1", "a-2"], "In Progress")
+    assert ops.change_seq() == seq + 1
+    with Store(db_path) as s:
+        stamps = {r[0] for r in s.all("SELECT updated_seq FROM sec_events")}
+    assert stamps == {seq + 1}
@@ -0,0 +1,25 @@
+from core.writer import write
+from logic.context import ContextBuilder
+from logic.cyber_ops import CyberOps
+
+
+def _add_newer(db_path: str, n: int) -> None:
+    write(db_path, lambda s: s.many(
+        "INSERT INTO sec_events(event_key, event_kind, impact, state, raised_at, owner, notes) "
+        "VALUES (?, 'Malware', 'Low', 'Open', '2026-01-02', 'Analyst002', ?)",
+        [(f"SEC-{i}", f"host {i} seen beaconing to an unknown address overnight") for i in range(n)],
+    ))
+
+
+def test_strong_match_a_day_older_beats_any_number_of_weak_newer_ones(db_path):
+    CyberOps(db_path).add_event("SEC-OLD", "Beaconing", "High", "Open", "2026-01-01", "Analyst001", "beaconing")
+    _add_newer(db_path, 3000)
+    rows = ContextBuilder(db_path).relevant("sec_events", "any beaconing?", k=5)
+    assert [r[0] for r in rows][:1] == ["SEC-OLD"]
+
+
+def test_much_older_match_decays_below_newer_ones(db_path):
+    CyberOps(db_path).add_event("SEC-OLD", "Beaconing", "High", "Open", "2024-01-01", "Analyst001", "beaconing")
+    _add_newer(db_path, 50)
+    rows = ContextBuilder(db_path).relevant("sec_events", "any beaconing?", k=5)
+    assert len(rows) == 5 and "SEC-OLD" not in [r[0] for r in rows]
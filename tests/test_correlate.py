@@ -0,0 +1,72 @@
+from core.store import Store
+from logic.correlate import correlate, notes_key
+from logic.cyber_ops import CyberOps
+
+
+def _add(db_path: str, key: str, day: int, owner: str = "Analyst001", kind: str = "Phishing",
+         notes: str = "") -> None:
+    CyberOps(db_path).add_event(key, kind, "Low", "Open", f"2026-03-{day:02d}", owner, notes)
+
+
+def _incidents(db_path: str) -> set[tuple[str, str, frozenset]]:
+    """Every incident as (first_at, last_at, its event keys)."""
+    with Store(db_path) as s:
+        rows = s.all("""SELECT i.id, i.first_at, i.last_at, e.event_key FROM incidents i
+                        JOIN sec_events e ON e.incident_id = i.id""")
+    out: dict[tuple[int, str, str], set[str]] = {}
+    for incident, first, last, key in rows:
+        out.setdefault((incident, first, last), set()).add(key)
+    return {(first, last, frozenset(keys)) for (_id, first, last), keys in out.items()}
+
+
+def test_events_chain_within_the_window_and_split_beyond_it(db_path):
+    for key, day in [("a", 1), ("b", 3), ("c", 5), ("d", 8)]:
+        _add(db_path, key, day)
+    _add(db_path, "other-owner", 2, owner="Analyst002")
+    _add(db_path, "other-kind", 2, kind="Malware")
+    correlate(db_path, window_days=2)
+    assert _incidents(db_path) == {
+        ("2026-03-01", "2026-03-05", frozenset("abc")),
+        ("2026-03-08", "2026-03-08", frozenset("d")),
+        ("2026-03-02", "2026-03-02", frozenset({"other-owner"})),
+        ("2026-03-02", "2026-03-02", frozenset({"other-kind"})),
+    }
+
+
+def test_a_late_event_extends_or_bridges_existing_incidents(db_path):
+    for key, day in [("a", 1), ("b", 5), ("c", 20)]:
+        _add(db_path, key, day)
+    correlate(db_path, window_days=2)
+    assert len(_incidents(db_path)) == 3
+
+    _add(db_path, "bridge", 3)
+    _add(db_path, "extend", 22)
+    report = correlate(db_path, window_days=2)
+    assert (report.assigned, report.created, report.merged) == (2, 0, 1)
+    assert _incidents(db_path) == {
+        ("2026-03-01", "2026-03-05", frozenset({"a", "bridge", "b"})),
+        ("2026-03-20", "2026-03-22", frozenset({"c", "extend"})),
+    }
+
+
+def test_incremental_runs_match_a_rebuild(db_path):
+    days = [14, 2, 9, 5, 11, 3, 17, 7, 12, 1, 16, 6]
+    for i, day in enumerate(days):
+        _add(db_path, f"e{i}", day, owner=f"Analyst00{i % 2}")
+        if i % 3 == 2:
+            correlate(db_path, window_days=2)
+    correlate(db_path, window_days=2)
+    incremental = _incidents(db_path)
+    correlate(db_path, window_days=2, rebuild=True)
+    assert _incidents(db_path) == incremental
+
+
+def test_notes_templates_split_incidents_only_when_asked(db_path):
+    _add(db_path, "a", 1, notes="Failed login from 10.0.0.1 for user 4411")
+    _add(db_path, "b", 1, notes="Failed login from 10.9.9.9 for user 1234")
+    _add(db_path, "c", 1, notes="Mailbox rule created")
+    assert notes_key("Failed login from 10.0.0.1") == notes_key("failed LOGIN from 192.168.1.20")
+    correlate(db_path, window_days=2)
+    assert len(_incidents(db_path)) == 1
+    correlate(db_path, window_days=2, by_notes=True, rebuild=True)
+    assert {keys for _f, _l, keys in _incidents(db_path)} == {frozenset("ab"), frozenset("c")}
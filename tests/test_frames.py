@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from logic.cyber_ops import CyberOps
+from logic.frames import as_text, frame_from_chunks, materialize, upsert
+
+
+def test_columns_get_typed_dtypes_across_chunks(db_path):
+    ops = CyberOps(db_path)
+    for i, (state, cleared) in enumerate([("Open", None), ("Closed", "2026-02-03"), ("Open", None)]):
+        ops.add_event(f"SEC-{i}", "Phishing", "High", state, f"2026-02-0{i + 1}", "Analyst001", cleared_at=cleared)
+
+    df = materialize(db_path, "SELECT id, event_key, state, raised_at, cleared_at FROM sec_events ORDER BY id",
+                     chunk_rows=2)
+    assert df["id"].dtype == np.int64
+    assert pd.api.types.is_string_dtype(df["event_key"])
+    assert isinstance(df["state"].dtype, pd.CategoricalDtype)
+    assert list(df["state"]) == ["Open", "Closed", "Open"]
+    assert set(df["state"].cat.categories) == {"Open", "Closed"}
+    assert df["raised_at"].dtype == "datetime64[s]"
+    assert df["cleared_at"].isna().tolist() == [True, False, True]
+    assert df["cleared_at"][1] == pd.Timestamp("2026-02-03")
+
+
+def test_nullable_and_unparseable_values(db_path):
+    rows = [(1, None, "2026-01-05", None), (None, 2.5, "not a date", "High")]
+    df = frame_from_chunks([(["n", "size_mb", "opened_at", "urgency"], rows)])
+    assert df["n"].dtype == np.float64 and np.isnan(df["n"][1])
+    assert df["size_mb"].dtype == np.float64 and np.isnan(df["size_mb"][0])
+    assert pd.isna(df["opened_at"][1]) and df["opened_at"][0] == pd.Timestamp("2026-01-05")
+    assert pd.isna(df["urgency"][0]) and df["urgency"][1] == "High"
+
+
+def test_empty_result_keeps_typed_columns(db_path):
+    df = materialize(db_path, "SELECT id, state, raised_at FROM sec_events")
+    assert list(df.columns) == ["id", "state", "raised_at"] and df.empty
+    assert isinstance(df["state"].dtype, pd.CategoricalDtype)
+    assert df["raised_at"].dtype == "datetime64[s]"
+
+
+def test_upsert_keeps_categoricals_and_as_text_restores_strings():
+    base = frame_from_chunks([(["id", "state", "raised_at"], [(1, "Open", "2026-01-01"), (2, "Open", "2026-01-02")])])
+    rows = frame_from_chunks([(["id", "state", "raised_at"], [(2, "Closed", "2026-01-02")])])
+    out = upsert(base, rows)
+    assert sorted(zip(out["id"], out["state"])) == [(1, "Open"), (2, "Closed")]
+    assert isinstance(out["state"].dtype, pd.CategoricalDtype)
+    text = as_text(out.sort_values("id"))
+    assert list(text["raised_at"]) == ["2026-01-01", "2026-01-02"]
+    assert text["state"].dtype == object
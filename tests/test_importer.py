@@ -0,0 +1,76 @@
+import csv
+import os
+
+import pytest
+
+from core.importer import import_csv
+from core.store import Store
+
+COLUMNS = ["event_key", "event_kind", "impact", "state", "raised_at", "cleared_at", "owner", "notes"]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _write_csv(path: str, n: int, bad: tuple[int, ...] = ()) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        for i in range(n):
+            kind = "" if i in bad else "Phishing"
+            w.writerow([f"SEC-{i:03d}", kind, "Low", "Open", "2026-02-01", "", "Analyst001", ""])
+
+
+def _stop_after(rows: int):
+    def progress(report):
+        if report.read >= rows:
+            raise Interrupted
+    return progress
+
+
+def _count(db_path: str) -> tuple[int, int]:
+    with Store(db_path) as s:
+        return (s.one("SELECT COUNT(*) FROM sec_events")[0], s.one("SELECT COUNT(*) FROM import_checkpoints")[0])
+
+
+def test_interrupted_import_resumes_after_the_last_committed_chunk(db_path, tmp_path):
+    path = os.path.join(tmp_path, "events.csv")
+    _write_csv(path, 45)
+    with pytest.raises(Interrupted):
+        import_csv(db_path, "sec_events", path, chunk_rows=10, progress=_stop_after(20))
+    assert _count(db_path) == (20, 1)
+
+    report = import_csv(db_path, "sec_events", path, chunk_rows=10)
+    assert (report.resumed_from, report.read, report.inserted) == (20, 25, 25)
+    assert _count(db_path) == (45, 0)
+
+
+def test_a_changed_file_starts_over(db_path, tmp_path):
+    path = os.path.join(tmp_path, "events.csv")
+    _write_csv(path, 30)
+    with pytest.raises(Interrupted):
+        import_csv(db_path, "sec_events", path, chunk_rows=10, progress=_stop_after(10))
+    _write_csv(path, 35)
+    report = import_csv(db_path, "sec_events", path, chunk_rows=10)
+    assert (report.resumed_from, report.read, report.inserted) == (0, 35, 25)
+
+
+def test_restart_ignores_the_checkpoint(db_path, tmp_path):
+    path = os.path.join(tmp_path, "events.csv")
+    _write_csv(path, 30)
+    with pytest.raises(Interrupted):
+        import_csv(db_path, "sec_events", path, chunk_rows=10, progress=_stop_after(20))
+    report = import_csv(db_path, "sec_events", path, chunk_rows=10, resume=False)
+    assert (report.resumed_from, report.read, report.inserted) == (0, 30, 10)
+
+
+def test_bad_rows_are_set_aside_with_the_reason(db_path, tmp_path):
+    path = os.path.join(tmp_path, "events.csv")
+    _write_csv(path, 12, bad=(3, 11))
+    report = import_csv(db_path, "sec_events", path, chunk_rows=5)
+    assert (report.read, report.inserted, report.rejected) == (12, 10, 2)
+    with open(path + ".rejects.csv", encoding="utf-8", newline="") as f:
+        rejected = list(csv.reader(f))
+    assert [r[0] for r in rejected] == ["SEC-003", "SEC-011"]
+    assert all(r[-1] == "missing event_kind" for r in rejected)
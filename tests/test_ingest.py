@@ -0,0 +1,25 @@
+import json
+
+from logic.cyber_ops import CyberOps
+from logic.ingest import Ingestor
+
+
+def _line(key: str) -> str:
+    return json.dumps({"event_key": key, "event_kind": "Phishing", "impact": "Low", "state": "Open",
+                       "raised_at": "2026-02-01", "owner": "Analyst001"}) + "\n"
+
+
+def test_offsets_advance_past_lines_that_insert_nothing(db_path, tmp_path):
+    log = tmp_path / "events.jsonl"
+    log.write_text(_line("SEC-1"))
+    Ingestor(db_path, [str(log)], warm=False).run(follow=False)
+
+    with log.open("a") as f:
+        f.write("not json\n\n{\"event_key\": \n")
+    stats = Ingestor(db_path, [str(log)], warm=False).run(follow=False)
+    assert (stats.inserted, stats.rejected) == (0, 2)
+    assert CyberOps(db_path).ingest_offsets()[str(log)][1] == log.stat().st_size
+
+    # Nothing left to read, so nothing is rejected or written again.
+    stats = Ingestor(db_path, [str(log)], warm=False).run(follow=False)
+    assert (stats.lines, stats.batches) == (0, 0)
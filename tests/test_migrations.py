@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import core.migrations
+from core.migrations import LATEST, MIGRATIONS, _split, current_version, migrate
+
+
+def _schema(path: str) -> list[tuple]:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+    finally:
+        conn.close()
+
+
+def test_rerunning_migrate_applies_nothing_and_changes_nothing(db_path):
+    before = _schema(db_path)
+    assert current_version(db_path) == LATEST
+    assert migrate(db_path) == []
+    assert _schema(db_path) == before
+
+
+def test_concurrent_migrations_apply_each_version_once(tmp_path):
+    path = os.path.join(tmp_path, "fresh.sqlite3")
+    applied: list[list[int]] = []
+    start = threading.Barrier(4)
+
+    def run():
+        start.wait()
+        applied.append(migrate(path))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(v for done in applied for v in done) == [v for v, _name, _sql in MIGRATIONS]
+    assert current_version(path) == LATEST
+
+
+def test_an_older_database_gets_only_the_newer_migrations(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "old.sqlite3")
+    monkeypatch.setattr(core.migrations, "MIGRATIONS", MIGRATIONS[:3])
+    assert migrate(path) == [1, 2, 3]
+    monkeypatch.setattr(core.migrations, "MIGRATIONS", MIGRATIONS)
+    assert migrate(path) == [v for v, _name, _sql in MIGRATIONS[3:]]
+
+
+def test_a_failing_migration_rolls_back_and_keeps_the_version(db_path, monkeypatch):
+    before = _schema(db_path)
+    broken = (LATEST + 1, "broken", "CREATE TABLE half_done (id INTEGER);\nSELECT * FROM no_such_table;")
+    monkeypatch.setattr(core.migrations, "MIGRATIONS", [*MIGRATIONS, broken])
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(db_path)
+    assert current_version(db_path) == LATEST
+    assert _schema(db_path) == before
+
+
+def test_split_keeps_trigger_bodies_whole():
+    sql = (
+        "CREATE TABLE t (id INTEGER);\n"
+        "CREATE TRIGGER tr AFTER INSERT ON t\nBEGIN\n  UPDATE t SET id = id;\n  DELETE FROM t;\nEND;\n"
+    )
+    parts = _split(sql)
+    assert len(parts) == 2 and parts[1].startswith("CREATE TRIGGER") and parts[1].endswith("END;")
@@ -0,0 +1,18 @@
+import json
+
+import logic.profiler
+from logic.profiler import profile_file
+
+
+def test_jsonl_rows_count_the_same_whether_or_not_sampling_stops_early(tmp_path, monkeypatch):
+    path = tmp_path / "events.jsonl"
+    lines = [json.dumps({"event_key": f"SEC-{i}", "size": i}) for i in range(6)]
+    lines[2:2] = ["", "not json", "   "]
+    path.write_text("\n".join(lines) + "\n")
+
+    whole = profile_file(str(path))
+    monkeypatch.setattr(logic.profiler, "STATS_ROWS", 2)
+    early = profile_file(str(path))
+    assert whole["rows"] == early["rows"] == 7
+    assert (whole["sampled_rows"], early["sampled_rows"]) == (6, 2)
+    assert early["columns"]["size"]["max"] == 1
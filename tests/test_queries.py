@@ -0,0 +1,45 @@
+import pytest
+
+from logic.cyber_ops import CyberOps
+
+
+def test_pages_cover_rows_that_share_a_sort_value(db_path):
+    ops = CyberOps(db_path)
+    # Runs of equal raised_at values that page boundaries fall inside.
+    days = ["2026-02-03"] * 5 + ["2026-02-02"] * 4 + ["2026-02-01"] * 6
+    for i, day in enumerate(days):
+        ops.add_event(f"e-{i:02d}", "Phishing", "Low", "Open", day, "Analyst001")
+
+    seen, cursor = [], None
+    while True:
+        page = ops.query(["event_key", "raised_at"], after=cursor, limit=4)
+        seen.extend(page.frame[["raised_at", "id"]].itertuples(index=False, name=None))
+        cursor = page.cursor
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == len(days)
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_cursor_resumes_inside_a_run_of_equal_sort_values(db_path):
+    ops = CyberOps(db_path)
+    for i in range(5):
+        ops.add_event(f"e-{i}", "Phishing", "Low", "Open", "2026-02-01", "Analyst001")
+    first = ops.query(["event_key"], limit=2)
+    rest = ops.query(["event_key"], after=first.cursor, limit=10)
+    assert list(first.frame["event_key"]) == ["e-4", "e-3"]
+    assert list(rest.frame["event_key"]) == ["e-2", "e-1", "e-0"]
+
+
+def test_update_where_refuses_an_empty_filter_unless_all_rows(db_path):
+    ops = CyberOps(db_path)
+    for i, impact in enumerate(["Low", "High", "Low"]):
+        ops.add_event(f"e-{i}", "Phishing", impact, "Open", "2026-02-01", "Analyst001")
+
+    with pytest.raises(ValueError):
+        ops.update_state_where("Closed", {"state": None, "impact": []})
+    assert ops.count(state=["Open"]) == 3
+
+    assert ops.update_state_where("In Progress", {"impact": ["Low"]}) == 2
+    assert ops.update_state_where("Closed", {}, all_rows=True) == 3
+    assert ops.count(state=["Closed"]) == 3
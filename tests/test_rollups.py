@@ -0,0 +1,40 @@
+import datetime as dt
+
+from core.archive import archive
+from core.store import Store
+from logic.cyber_ops import CyberOps
+from logic.rollups import fold, rebuild
+
+
+def _rollup(db_path: str) -> set[tuple]:
+    with Store(db_path) as s:
+        daily = {tuple(r) for r in s.all("SELECT * FROM rollup_daily WHERE arrived OR closed OR ttr_n")}
+        hist = {tuple(r) for r in s.all("SELECT * FROM rollup_ttr_hist WHERE n")}
+    return daily | hist
+
+
+def test_incremental_fold_matches_a_rebuild(db_path):
+    ops = CyberOps(db_path)
+    for i in range(6):
+        ops.add_event(f"e-{i}", "Phishing", "High", "Open", f"2026-01-{i + 1:02d}", f"Analyst00{i % 2}")
+    fold(db_path)
+
+    # Folded rows go through the update queue, new ones are read by id range.
+    ops.update_state("e-0", "Closed")
+    ops.update_state_many(["e-1", "e-2"], "In Progress")
+    with Store(db_path) as s:
+        s.exec("UPDATE sec_events SET owner='Analyst009' WHERE event_key='e-3'")
+        s.commit()
+    ops.add_event("n-0", "Malware", "Low", "Resolved", "2026-01-03", "Analyst001", cleared_at="2026-01-05")
+    ops.add_event("n-1", "Malware", "Low", "Open", "2026-01-04", "Analyst001")
+    ops.update_state("n-1", "Closed")
+    # An unfolded row archived before the next fold still counts.
+    ops.add_event("old", "Malware", "Low", "Closed", "2025-01-01", "Analyst001", cleared_at="2025-01-02")
+    archive(db_path, after_days=90, today=dt.date(2026, 1, 10))
+    with Store(db_path) as s:
+        assert s.one("SELECT COUNT(*) FROM rollup_pending WHERE opened = '2025-01-01'")[0] == 1
+
+    fold(db_path)
+    incremental = _rollup(db_path)
+    rebuild(db_path)
+    assert incremental == _rollup(db_path)
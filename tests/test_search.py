@@ -0,0 +1,60 @@
+from core.store import Store
+from core.writer import write
+from logic.cyber_ops import CyberOps
+from logic.search import Search, index_pending, rebuild
+
+
+def _keys(db_path: str, text: str) -> set[str]:
+    return set(Search(db_path).query(text)["key"])
+
+
+def _vocab(db_path: str) -> list[tuple]:
+    """Every (term, column, row count) in the sec_events index."""
+    def run(s):
+        s.exec("CREATE VIRTUAL TABLE IF NOT EXISTS temp.v USING fts5vocab(main, sec_events_fts, 'col')")
+        return [tuple(r) for r in s.all("SELECT term, col, doc FROM temp.v ORDER BY term, col")]
+    return write(db_path, run)
+
+
+def _assert_matches_rebuild(db_path: str) -> None:
+    index_pending(db_path)
+    kept = _vocab(db_path)
+    rebuild(db_path, optimize=False)
+    assert kept == _vocab(db_path)
+
+
+def test_new_rows_are_indexed_before_searching(db_path):
+    ops = CyberOps(db_path)
+    ops.add_event("SEC-1", "Phishing", "High", "Open", "2026-01-02", "Analyst001", "mailbox attachment")
+    with Store(db_path) as s:
+        assert s.one("SELECT COUNT(*) FROM sec_events_fts WHERE sec_events_fts MATCH 'mailbox'")[0] == 0
+    assert _keys(db_path, "mailbox") == {"SEC-1"}
+    assert index_pending(db_path) == 0
+
+
+def test_edits_and_deletes_keep_the_index_consistent(db_path):
+    ops = CyberOps(db_path)
+    for i in range(4):
+        ops.add_event(f"SEC-{i}", "Malware", "Low", "Open", "2026-01-02", "Analyst001", f"original note {i}")
+    assert index_pending(db_path) == 4
+    # One indexed row and one not yet indexed, each edited, and one of each deleted.
+    ops.add_event("SEC-9", "Malware", "Low", "Open", "2026-01-02", "Analyst001", "original note 9")
+    ops.add_event("SEC-8", "Malware", "Low", "Open", "2026-01-02", "Analyst001", "original note 8")
+    write(db_path, lambda s: s.exec(
+        "UPDATE sec_events SET notes='rewritten' WHERE event_key IN ('SEC-0', 'SEC-9')"))
+    write(db_path, lambda s: s.exec("DELETE FROM sec_events WHERE event_key IN ('SEC-1', 'SEC-8')"))
+
+    assert _keys(db_path, "rewritten") == {"SEC-0", "SEC-9"}
+    assert _keys(db_path, "original") == {"SEC-2", "SEC-3"}
+    _assert_matches_rebuild(db_path)
+
+
+def test_best_match_wins_over_any_number_of_newer_ones(db_path):
+    ops = CyberOps(db_path)
+    ops.add_event("SEC-OLD", "Beaconing", "High", "Open", "2025-01-02", "Analyst001", "beaconing")
+    write(db_path, lambda s: s.many(
+        "INSERT INTO sec_events(event_key, event_kind, impact, state, raised_at, owner, notes) "
+        "VALUES (?, 'Malware', 'Low', 'Open', '2026-01-02', 'Analyst002', ?)",
+        [(f"SEC-{i}", f"host {i} seen beaconing to an unknown address overnight") for i in range(3000)],
+    ))
+    assert list(Search(db_path).query("beaconing", limit=3)["key"])[:1] == ["SEC-OLD"]
@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+import core.store
+from core.store import IDLE_PING_S, MAX_AGE_S, ConnectionPool
+
+
+def test_connections_are_reused_with_the_pool_pragmas(db_path):
+    pool = ConnectionPool(db_path, size=2)
+    lease = pool.acquire()
+    assert lease.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert lease.conn.execute("PRAGMA busy_timeout").fetchone()[0] == core.store.BUSY_TIMEOUT_MS
+    pool.release(lease)
+    assert pool.acquire() is lease
+    pool.close()
+
+
+def test_old_connections_are_recycled(db_path):
+    pool = ConnectionPool(db_path, size=1)
+    lease = pool.acquire()
+    pool.release(lease)
+    lease.born -= MAX_AGE_S + 1
+    fresh = pool.acquire()
+    assert fresh is not lease and pool._open == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        lease.conn.execute("SELECT 1")
+    pool.close()
+
+
+def test_idle_connection_that_fails_its_ping_is_replaced(db_path):
+    pool = ConnectionPool(db_path, size=1)
+    lease = pool.acquire()
+    pool.release(lease)
+    lease.conn.close()  # stands in for a handle that went bad while idle
+    lease.last_used -= IDLE_PING_S + 1
+    fresh = pool.acquire()
+    assert fresh is not lease
+    assert fresh.conn.execute("SELECT 1").fetchone()[0] == 1
+    assert pool._open == 1
+    pool.close()
+
+
+def test_released_connection_is_rolled_back(db_path):
+    pool = ConnectionPool(db_path, size=1)
+    lease = pool.acquire()
+    lease.conn.execute("INSERT INTO ingest_offsets(source, inode, pos, updated_at) VALUES ('x', 1, 2, 'now')")
+    assert lease.conn.in_transaction
+    pool.release(lease)
+    again = pool.acquire()
+    assert not again.conn.in_transaction
+    assert again.conn.execute("SELECT COUNT(*) FROM ingest_offsets").fetchone()[0] == 0
+    pool.close()
+
+
+def test_exhausted_pool_times_out(db_path, monkeypatch):
+    monkeypatch.setattr(core.store, "BUSY_TIMEOUT_MS", 50)
+    pool = ConnectionPool(db_path, size=1)
+    lease = pool.acquire()
+    with pytest.raises(sqlite3.OperationalError, match="exhausted"):
+        pool.acquire()
+    pool.release(lease)
+    pool.close()
@@ -0,0 +1,45 @@
+import datetime as dt
+
+from core.store import Store
+from logic.cyber_ops import CyberOps
+from logic.service_desk import ServiceDesk
+
+
+def _ago(days: int) -> str:
+    return (dt.date.today() - dt.timedelta(days=days)).isoformat()
+
+
+def test_severity_weight_plus_age_orders_the_queue(db_path):
+    ops = CyberOps(db_path)
+    ops.add_event("low-old", "Phishing", "Low", "Open", _ago(20), "Analyst001")        # 20
+    ops.add_event("crit", "Malware", "Critical", "In Progress", _ago(10), "Analyst002")  # 24
+    ops.add_event("high", "Malware", "High", "Open", _ago(5), "Analyst001")             # 12
+    ops.add_event("med", "Phishing", "Medium", "Open", _ago(10), "Analyst001")          # 12, newer id
+    ops.add_event("done", "Malware", "Critical", "Resolved", _ago(30), "Analyst001")
+
+    top = ops.work_next()
+    assert list(top["event_key"]) == ["crit", "low-old", "high", "med"]
+    # Every row shares the same fraction of today, so the gaps are exact.
+    assert list((top["priority"] - top["priority"].iloc[-1]).round(1)) == [12.0, 8.0, 0.0, 0.0]
+    assert list(ops.work_next("Analyst001", limit=2)["event_key"]) == ["low-old", "high"]
+
+    ops.update_state("crit", "Closed")
+    assert list(ops.work_next(limit=1)["event_key"]) == ["low-old"]
+
+
+def test_requests_use_urgency_and_assignee(db_path):
+    desk = ServiceDesk(db_path)
+    desk.add_request("r1", "VPN", "Low", "Open", _ago(3), "Tech01")
+    desk.add_request("r2", "Laptop", "High", "Open", _ago(1), "Tech02")
+    desk.add_request("r3", "WiFi", "Medium", "Closed", _ago(9), "Tech01", closed_at=_ago(1))
+    assert list(desk.work_next()["req_key"]) == ["r2", "r1"]
+    assert list(desk.work_next("Tech01")["req_key"]) == ["r1"]
+
+
+def test_work_next_reads_an_index_range_without_sorting(db_path):
+    with Store(db_path) as s:
+        for where, index in (("", "ix_sec_events_triage"), ("AND owner = 'a' ", "ix_sec_events_triage_owner")):
+            plan = " ".join(r[3] for r in s.all(
+                f"EXPLAIN QUERY PLAN SELECT id FROM sec_events WHERE triage_key IS NOT NULL {where}"
+                f"ORDER BY triage_key, id LIMIT 5"))
+            assert index in plan and "TEMP B-TREE" not in plan
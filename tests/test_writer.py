@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+
+import pytest
+
+import core.writer
+from core.writer import Writer
+
+
+@pytest.fixture
+def writer(tmp_path):
+    path = str(tmp_path / "w.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (v INTEGER)")
+    conn.commit()
+    conn.close()
+    return Writer(path)
+
+
+def _count(w: Writer) -> int:
+    return w.submit(lambda s: s.one("SELECT COUNT(*) FROM t")[0]).result(timeout=5)
+
+
+def test_failing_command_rolls_back_alone(writer):
+    gate = threading.Event()
+    writer.submit(lambda s: gate.wait(5))  # hold the thread so the next three share a batch
+    ok = writer.submit(lambda s: s.exec("INSERT INTO t VALUES (1)"))
+    bad = writer.submit(lambda s: (s.exec("INSERT INTO t VALUES (2)"), 1 / 0))
+    ok2 = writer.submit(lambda s: s.exec("INSERT INTO t VALUES (3)"))
+    gate.set()
+    assert ok.result(timeout=5) == 1
+    with pytest.raises(ZeroDivisionError):
+        bad.result(timeout=5)
+    assert ok2.result(timeout=5) == 1
+    assert _count(writer) == 2
+
+
+def test_lost_savepoint_fails_the_batch_and_keeps_serving(writer):
+    # What SQLite does on SQLITE_FULL/IOERR: the transaction is rolled back
+    # under the command, so ROLLBACK TO its savepoint fails as well.
+    def broken(s):
+        s.exec("INSERT INTO t VALUES (1)")
+        s.conn.execute("ROLLBACK")
+        raise sqlite3.OperationalError("disk I/O error")
+
+    gate = threading.Event()
+    writer.submit(lambda s: gate.wait(5))
+    before = writer.submit(lambda s: s.exec("INSERT INTO t VALUES (0)"))
+    bad = writer.submit(broken)
+    after = writer.submit(lambda s: s.exec("INSERT INTO t VALUES (2)"))
+    gate.set()
+    for fut in (before, bad, after):
+        with pytest.raises(sqlite3.OperationalError):
+            fut.result(timeout=5)
+
+    assert writer._thread.is_alive()
+    assert writer.submit(lambda s: s.exec("INSERT INTO t VALUES (3)")).result(timeout=5) == 1
+    assert _count(writer) == 1
+
+
+def test_connection_failure_is_retried_on_the_next_batch(tmp_path, monkeypatch):
+    real = core.writer.open_connection
+    calls = []
+
+    def flaky(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return real(path)
+
+    monkeypatch.setattr(core.writer, "open_connection", flaky)
+    w = Writer(str(tmp_path / "w.sqlite3"))
+    with pytest.raises(sqlite3.OperationalError):
+        w.submit(lambda s: s.exec("CREATE TABLE t (v INTEGER)")).result(timeout=5)
+    w.submit(lambda s: s.exec("CREATE TABLE t (v INTEGER)")).result(timeout=5)
+    assert _count(w) == 0
+    assert len(calls) == 2
@@ -1,88 +1,210 @@
+import os
+import sqlite3
+import time
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+from streamlit.errors import StreamlitAPIException
 
+from core import perf
+from core.cache import CACHE
+from logic.correlate import correlate
 from logic.cyber_ops import CyberOps
 from logic.data_catalog import DataCatalog
 from logic.service_desk import ServiceDesk
-from logic.assistant import explain_queue
+from logic.assistant import ask_stream
+from logic.assistant_cache import ResponseCache
+from logic.context import build_context, estimate_tokens
+from logic.frames import DATE_COLS, as_text
+from logic.queries import Page
+from logic.rollups import Rollups, fold
+from logic.triage import weights_caption
+from logic.search import Search
+from logic.aggregates import QueueStats
+
+
+VIEWS = ["Security Queue", "Data Registry", "Service Desk", "Ops Assistant"]
+ADMIN_VIEWS = ["Performance"]
+LIVE_ROWS = 100
+LIVE_REFRESH_S = float(os.getenv("LIVE_REFRESH_S", "5"))
+ASSISTANT_SCOPES = {
+    "Security Queue": ("sec_events",),
+    "Data Registry": ("data_assets",),
+    "Service Desk": ("it_requests",),
+    "All": ("sec_events", "data_assets", "it_requests"),
+}
 
 
 def command_center(db_path: str):
-    ops = CyberOps(db_path)
-    cat = DataCatalog(db_path)
-    desk = ServiceDesk(db_path)
-
-    tabs = st.tabs(["Security Queue", "Data Registry", "Service Desk", "Ops Assistant"])
-
-    with tabs[0]:
-        df = ops.frame()
-        _security_view(df, ops)
-
-    with tabs[1]:
-        df = cat.frame()
-        _data_view(df, cat)
-
-    with tabs[2]:
-        df = desk.frame()
-        _it_view(df, desk)
-
-    with tabs[3]:
-        st.subheader("Ops Assistant")
-        st.caption("Ask questions across queues.")
-
-        q = st.text_area("Question", height=90)
-        scope = st.selectbox("Context scope", ["Security Queue", "Data Registry", "Service Desk", "All"])
-
-        ctx = ""
-        if scope in ("Security Queue", "All"):
-            ctx += _df_to_context("SECURITY", ops.frame())
-        if scope in ("Data Registry", "All"):
-            ctx += _df_to_context("DATA", cat.frame())
-        if scope in ("Service Desk", "All"):
-            ctx += _df_to_context("IT", desk.frame())
-
-        if st.button("Generate guidance", type="primary"):
-            if not q.strip():
-                st.warning("Write a question first.")
+    # Only the selected section runs. Each section is a fragment, so its own
+    # widgets rerun just that section instead of the whole script.
+    actor = st.session_state.get("actor") or {}
+    views = VIEWS + (ADMIN_VIEWS if actor.get("access_level") == "Owner" else [])
+    _search_box(db_path)
+    view = st.segmented_control(
+        "Section", views, default=VIEWS[0], key="cc_view", label_visibility="collapsed"
+    ) or VIEWS[0]
+
+    with perf.run(f"rerun: {view}"):
+        _render_view(view, db_path)
+
+
+@st.fragment
+@perf.as_run("Search")
+def _search_box(db_path: str):
+    text = st.text_input("Search", key="cc_search", placeholder="Search events, requests and assets",
+                         label_visibility="collapsed").strip()
+    if not text:
+        return
+    try:
+        hits = Search(db_path).query(text, limit=15)
+    except sqlite3.OperationalError as e:
+        st.warning(f"Search failed: {e}")
+        return
+    if hits.empty:
+        st.caption(f"No matches for “{text}”.")
+        return
+    with st.container(border=True):
+        for h in hits.itertuples():
+            st.markdown(f"**{h.key}** · {h.source} · {h.detail}  \n{h.snippet}")
+
+
+def _render_view(view: str, db_path: str):
+
+    if view == "Security Queue":
+        _security_view(CyberOps(db_path), QueueStats(db_path))
+    elif view == "Data Registry":
+        _data_view(DataCatalog(db_path), QueueStats(db_path))
+    elif view == "Service Desk":
+        _it_view(ServiceDesk(db_path), QueueStats(db_path))
+    elif view == "Ops Assistant":
+        _assistant_view(db_path)
+    elif view == "Performance":
+        _perf_view(db_path)
+
+
+@st.fragment
+def _perf_view(db_path: str):
+    st.subheader("Performance")
+    st.caption(f"Statements slower than {perf.SLOW_QUERY_MS:.0f} ms are logged (SLOW_QUERY_MS).")
+
+    runs = [r for r in perf.RECORDER.recent_runs(30) if r.label != "rerun: Performance"]
+    if not runs:
+        st.info("No reruns recorded yet. Open another section first.")
+    else:
+        pick = st.selectbox(
+            "Rerun", runs, key="perf_run",
+            format_func=lambda r: f"#{r.id} {r.label} ({r.ms:.0f} ms)",
+        )
+        spans = pd.DataFrame([vars(s) for s in perf.RECORDER.run_spans(pick.id)])
+        if spans.empty:
+            st.info("No spans in this rerun.")
+        else:
+            by_kind = spans.groupby("kind")["ms"].agg(["count", "sum"]).reset_index()
+            by_kind.columns = ["kind", "calls", "total_ms"]
+            st.dataframe(by_kind, width="stretch", hide_index=True)
+            st.dataframe(
+                spans[["kind", "name", "ms", "rows", "site"]].sort_values("ms", ascending=False),
+                width="stretch", hide_index=True,
+            )
+
+    st.write("### Slowest statements")
+    n = st.slider("Top N", 5, 50, 10, key="perf_top")
+    st.dataframe(pd.DataFrame(perf.RECORDER.top_queries(n)), width="stretch", hide_index=True)
+
+    st.write("### Frame cache")
+    st.json(CACHE.stats())
+
+    st.write("### Assistant response cache")
+    st.json(ResponseCache(db_path).stats())
+
+    st.download_button(
+        "Export spans (JSON lines)", perf.RECORDER.to_jsonl(),
+        file_name="ops_perf.jsonl", mime="application/x-ndjson",
+    )
+
+
+@st.fragment
+@perf.as_run("Ops Assistant")
+def _assistant_view(db_path: str):
+    st.subheader("Ops Assistant")
+    st.caption("Ask questions across queues.")
+
+    q = st.text_area("Question", height=90)
+    scope = st.selectbox("Context scope", list(ASSISTANT_SCOPES))
+    fresh = st.checkbox("Ignore cached answers", key="ai_fresh",
+                        help="Ask the model again even if this question was answered for the same data.")
+
+    if st.button("Generate guidance", type="primary"):
+        if not q.strip():
+            st.warning("Write a question first.")
+        else:
+            ctx = build_context(db_path, q, ASSISTANT_SCOPES[scope])
+            with st.expander(f"Context sent (~{estimate_tokens(ctx)} tokens)"):
+                st.code(ctx, language=None)
+            try:
+                with ask_stream(q, ctx, db_path, fresh=fresh) as reply:
+                    st.write_stream(reply.chunks)
+            except Exception as e:
+                st.error(str(e))
             else:
-                try:
-                    st.write(explain_queue(q, ctx))
-                except Exception as e:
-                    st.error(str(e))
-
+                if reply.source == "hit":
+                    st.caption(f"Cached answer from {reply.age_s / 60:.0f} min ago for the same question and data.")
+                elif reply.source == "coalesced":
+                    st.caption("Shared the answer to an identical request already in flight.")
 
 
-def _security_view(df: pd.DataFrame, ops: CyberOps):
+@st.fragment
+@perf.as_run("Security Queue")
+def _security_view(ops: CyberOps, stats: QueueStats):
     st.subheader("Security Queue")
 
-    if df.empty:
+    kpi = stats.security_kpis()
+    if not kpi["total"]:
         st.info("No security events found.")
     else:
         k1, k2, k3, k4 = st.columns(4)
-        k1.metric("Open", int((df["state"] == "Open").sum()))
-        k2.metric("In Progress", int((df["state"] == "In Progress").sum()))
-        k3.metric("High/Critical", int(df["impact"].isin(["High", "Critical"]).sum()))
-        k4.metric("Total", int(len(df)))
+        k1.metric("Open", int(kpi["open"]))
+        k2.metric("In Progress", int(kpi["in_progress"]))
+        k3.metric("High/Critical", int(kpi["high_critical"]))
+        k4.metric("Total", int(kpi["total"]))
 
         c1, c2 = st.columns([1.2, 0.8])
         with c1:
-            fig = px.histogram(df, x="impact", color="state", barmode="group")
+            with perf.span("chart", "security impact/state"):
+                fig = _px().bar(stats.security_by_impact_state(), x="impact", y="n", color="state", barmode="group")
             st.plotly_chart(fig, width="stretch")
         with c2:
-            fig2 = px.pie(df, names="event_kind")
+            with perf.span("chart", "security kinds"):
+                fig2 = _px().pie(stats.security_by_kind(), names="event_kind", values="n")
             st.plotly_chart(fig2, width="stretch")
 
-        st.write("### Update status")
-        key = st.selectbox("Event", df["event_key"].tolist(), key="sec_pick")
-        new_state = st.selectbox("New state", ["Open", "In Progress", "Resolved", "Closed"], key="sec_state")
-        if st.button("Apply update", key="sec_apply"):
-            ops.update_state(key, new_state)
-            st.success("Updated.")
-            st.rerun()
+        _work_next("sec", ops, "sec_events", "owner")
+
+        if st.toggle("Trends", key="sec_trends", help="Daily backlog, arrivals vs closures and time to resolve."):
+            _trends("sec", ops.db_path, "sec_events", ("impact", "owner"))
+
+        if st.toggle("Live feed", key="sec_live",
+                     help=f"Newest {LIVE_ROWS} events, updated every {LIVE_REFRESH_S:g}s as they change."):
+            _live_feed("sec", ops)
 
         st.write("### Current queue")
-        st.dataframe(df, use_container_width=True)
+        if st.toggle("Group into incidents", key="sec_grouped",
+                     help="Collapse events of the same kind and owner raised close together."):
+            _incident_queue(ops)
+        else:
+            page, scope = _paged_queue("sec", ops, ["state", "impact", "owner"], archive=True)
+
+            st.write("### Update status")
+            keys, use_filter, confirmed = _bulk_targets("sec", "Events", page, "event_key", ops, scope)
+            new_state = st.selectbox("New state", ["Open", "In Progress", "Resolved", "Closed"], key="sec_state")
+            if st.button("Apply update", key="sec_apply", disabled=not (confirmed if use_filter else keys)):
+                if use_filter:
+                    n = ops.update_state_where(new_state, scope["filters"], scope["since"], scope["until"],
+                                               all_rows=True)
+                else:
+                    n = ops.update_state_many(keys, new_state)
+                st.success(f"Updated {n} events.")
+                _rerun_section()
 
     st.write("### Create new security event")
     with st.form("sec_create", clear_on_submit=True):
@@ -113,41 +235,64 @@ def _security_view(df: pd.DataFrame, ops: CyberOps):
                     notes=notes.strip(),
                 )
                 st.success("Event added.")
-                st.rerun()
+                _rerun_section()
 
 
-def _data_view(df: pd.DataFrame, cat: DataCatalog):
+@st.fragment
+@perf.as_run("Data Registry")
+def _data_view(cat: DataCatalog, stats: QueueStats):
     st.subheader("Data Registry")
 
-    if df.empty:
+    totals = stats.data_totals()
+    if not totals["assets"]:
         st.info("No data assets found.")
     else:
         k1, k2, k3 = st.columns(3)
-        k1.metric("Assets", int(len(df)))
-        k2.metric("Total size (MB)", float(df["size_mb"].sum()))
-        k3.metric("Total rows", int(df["rows_est"].sum()))
+        k1.metric("Assets", int(totals["assets"]))
+        k2.metric("Total size (MB)", float(totals["size_mb"]))
+        k3.metric("Total rows", int(totals["rows_est"]))
 
         c1, c2 = st.columns([1.2, 0.8])
         with c1:
-            fig = px.bar(df.sort_values("size_mb", ascending=False).head(8), x="asset_name", y="size_mb")
+            with perf.span("chart", "largest assets"):
+                fig = _px().bar(stats.data_largest(8), x="asset_name", y="size_mb")
             st.plotly_chart(fig, width="stretch")
         with c2:
-            fig2 = px.histogram(df, x="origin")
+            with perf.span("chart", "assets by origin"):
+                fig2 = _px().bar(stats.data_by_origin(), x="origin", y="n")
             st.plotly_chart(fig2, width="stretch")
 
+        st.write("### Registry")
+        page, scope = _paged_queue("asset", cat, ["steward", "origin"])
+
         st.write("### Update steward")
-        asset = st.selectbox("Asset", df["asset_name"].tolist(), key="asset_pick")
+        assets, use_filter, confirmed = _bulk_targets("asset", "Assets", page, "asset_name", cat, scope)
         steward = st.text_input("New steward", key="asset_steward")
-        if st.button("Change steward", key="asset_apply"):
+        if st.button("Change steward", key="asset_apply", disabled=not (confirmed if use_filter else assets)):
             if steward.strip():
-                cat.change_steward(asset, steward.strip())
-                st.success("Updated.")
-                st.rerun()
+                if use_filter:
+                    n = cat.change_steward_where(steward.strip(), scope["filters"], scope["since"], scope["until"],
+                                                 all_rows=True)
+                else:
+                    n = cat.change_steward_many(assets, steward.strip())
+                st.success(f"Updated {n} assets.")
+                _rerun_section()
             else:
                 st.warning("Enter a steward name.")
 
-        st.write("### Registry")
-        st.dataframe(df, use_container_width=True)
+        st.write("### Profiling")
+        st.caption("Assets with a source path get exact size, row counts and column stats from their files.")
+        if st.button("Re-profile changed assets", key="asset_reprofile"):
+            from logic.profiler import reprofile
+            with st.spinner("Profiling..."), perf.span("profile", "reprofile"):
+                outcome = reprofile(cat.db_path)
+            done = [a for a, o in outcome.items() if o == "profiled"]
+            failed = {a: o for a, o in outcome.items() if o.startswith("error")}
+            st.success(f"Profiled {len(done)} of {len(outcome)} assets; the rest were unchanged.")
+            for a, o in failed.items():
+                st.error(f"{a}: {o}")
+            if done:
+                _rerun_section()
 
     st.write("### Register new data asset")
     with st.form("asset_create", clear_on_submit=True):
@@ -161,6 +306,9 @@ def _data_view(df: pd.DataFrame, cat: DataCatalog):
         with c3:
             rows_est = st.number_input("Rows estimate", min_value=0, value=1000)
             created_on = st.text_input("Created on (YYYY-MM-DD)", placeholder="2025-12-12")
+        source_path = st.text_input("Source path (optional)", placeholder="/data/exports/enrolments.csv",
+                                    help="A CSV, JSON-lines, Parquet or SQLite file, or a directory of them. "
+                                         "Size and rows are then measured instead of typed.")
 
         if st.form_submit_button("Add asset", type="primary"):
             if not (asset_name.strip() and steward.strip() and origin.strip() and created_on.strip()):
@@ -173,41 +321,66 @@ def _data_view(df: pd.DataFrame, cat: DataCatalog):
                     size_mb=float(size_mb),
                     rows_est=int(rows_est),
                     created_on=created_on.strip(),
+                    source_path=source_path.strip(),
                 )
+                if source_path.strip():
+                    from logic.profiler import ProfileError, profile_asset
+                    try:
+                        with perf.span("profile", asset_name.strip()):
+                            profile_asset(cat.db_path, asset_name.strip())
+                    except (OSError, ProfileError) as e:
+                        st.warning(f"Asset added, but profiling failed: {e}")
                 st.success("Asset added.")
-                st.rerun()
+                _rerun_section()
 
 
-def _it_view(df: pd.DataFrame, desk: ServiceDesk):
+@st.fragment
+@perf.as_run("Service Desk")
+def _it_view(desk: ServiceDesk, stats: QueueStats):
     st.subheader("Service Desk")
 
-    if df.empty:
+    kpi = stats.it_kpis()
+    if not kpi["total"]:
         st.info("No IT requests found.")
     else:
         k1, k2, k3, k4 = st.columns(4)
-        k1.metric("Open", int((df["phase"] == "Open").sum()))
-        k2.metric("In Progress", int((df["phase"] == "In Progress").sum()))
-        k3.metric("Resolved", int((df["phase"] == "Resolved").sum()))
-        k4.metric("Total", int(len(df)))
+        k1.metric("Open", int(kpi["open"]))
+        k2.metric("In Progress", int(kpi["in_progress"]))
+        k3.metric("Resolved", int(kpi["resolved"]))
+        k4.metric("Total", int(kpi["total"]))
 
         c1, c2 = st.columns([1.2, 0.8])
         with c1:
-            fig = px.histogram(df, x="urgency", color="phase", barmode="group")
+            with perf.span("chart", "it urgency/phase"):
+                fig = _px().bar(stats.it_by_urgency_phase(), x="urgency", y="n", color="phase", barmode="group")
             st.plotly_chart(fig, width="stretch")
         with c2:
-            fig2 = px.pie(df, names="topic")
+            with perf.span("chart", "it topics"):
+                fig2 = _px().pie(stats.it_by_topic(), names="topic", values="n")
             st.plotly_chart(fig2, width="stretch")
 
-        st.write("### Update phase")
-        req = st.selectbox("Request", df["req_key"].tolist(), key="req_pick")
-        phase = st.selectbox("New phase", ["Open", "In Progress", "Resolved", "Closed"], key="req_phase")
-        if st.button("Apply phase change", key="req_apply"):
-            desk.set_phase(req, phase)
-            st.success("Updated.")
-            st.rerun()
+        _work_next("req", desk, "it_requests", "assignee")
+
+        if st.toggle("Trends", key="req_trends", help="Daily backlog, arrivals vs closures and time to resolve."):
+            _trends("req", desk.db_path, "it_requests", ("urgency", "assignee"))
+
+        if st.toggle("Live feed", key="req_live",
+                     help=f"Newest {LIVE_ROWS} requests, updated every {LIVE_REFRESH_S:g}s as they change."):
+            _live_feed("req", desk)
 
         st.write("### Requests")
-        st.dataframe(df, use_container_width=True)
+        page, scope = _paged_queue("req", desk, ["phase", "urgency", "assignee"], archive=True)
+
+        st.write("### Update phase")
+        reqs, use_filter, confirmed = _bulk_targets("req", "Requests", page, "req_key", desk, scope)
+        phase = st.selectbox("New phase", ["Open", "In Progress", "Resolved", "Closed"], key="req_phase")
+        if st.button("Apply phase change", key="req_apply", disabled=not (confirmed if use_filter else reqs)):
+            if use_filter:
+                n = desk.set_phase_where(phase, scope["filters"], scope["since"], scope["until"], all_rows=True)
+            else:
+                n = desk.set_phase_many(reqs, phase)
+            st.success(f"Updated {n} requests.")
+            _rerun_section()
 
     st.write("### Log new IT request")
     with st.form("req_create", clear_on_submit=True):
@@ -235,13 +408,190 @@ def _it_view(df: pd.DataFrame, desk: ServiceDesk):
                     assignee=assignee.strip(),
                 )
                 st.success("Request added.")
-                st.rerun()
+                _rerun_section()
 
 
-def _df_to_context(title: str, df: pd.DataFrame) -> str:
-    
+def _work_next(prefix: str, source, table: str, who_col: str):
+    st.write("### Work next")
+    c1, c2 = st.columns([0.7, 0.3])
+    who = c1.selectbox(who_col.title(), ["Everyone", *source.options(who_col)], key=f"{prefix}_next_who")
+    n = c2.selectbox("Show", [10, 20, 50], index=1, key=f"{prefix}_next_n")
+    df = source.work_next(None if who == "Everyone" else who, n)
     if df.empty:
-        return f"\n[{title}] no rows\n"
-    slim = df.head(30).to_dict(orient="records")
-    return f"\n[{title}] {slim}\n"
-    
\ No newline at end of file
+        st.info("Nothing open.")
+        return
+    st.dataframe(
+        df, width="stretch", hide_index=True,
+        column_config={
+            **{c: st.column_config.DateColumn(c) for c in df.columns if c in DATE_COLS},
+            "priority": st.column_config.NumberColumn("priority", format="%.1f"),
+        },
+    )
+    st.caption(weights_caption(table))
+
+
+def _trends(prefix: str, db_path: str, table: str, dims: tuple[str, str]):
+    # Changes queued since the last fold are applied first; charts read only the rollups.
+    with perf.span("rollup", "fold"):
+        fold(db_path)
+    roll = Rollups(db_path)
+    c1, c2 = st.columns(2)
+    days = c1.selectbox("Window (days)", [30, 90, 180, 365], index=1, key=f"{prefix}_tr_days")
+    by = c2.selectbox("Time to resolve by", list(dims), key=f"{prefix}_tr_by")
+
+    daily = roll.daily(table, days=days)
+    if daily.empty:
+        st.info("No history yet.")
+        return
+    c1, c2 = st.columns(2)
+    with c1:
+        with perf.span("chart", f"{table} backlog trend"):
+            fig = _px().line(daily, x="day", y="backlog", title="Open backlog")
+        st.plotly_chart(fig, width="stretch")
+    with c2:
+        with perf.span("chart", f"{table} arrivals/closures"):
+            flows = daily.melt(id_vars="day", value_vars=["arrived", "closed"], var_name="flow", value_name="n")
+            fig2 = _px().bar(flows, x="day", y="n", color="flow", barmode="group", title="Arrivals vs closures")
+        st.plotly_chart(fig2, width="stretch")
+    st.caption(f"Time to resolve by {by} over the last {days} days (days; p90 estimated from a histogram)")
+    st.dataframe(roll.resolve_times(table, by, days), width="stretch", hide_index=True)
+
+
+@st.fragment(run_every=LIVE_REFRESH_S)
+def _live_feed(prefix: str, source):
+    """
+    Newest LIVE_ROWS rows, loaded once and then patched on every tick from
+    the source's change feed, so an idle tick is one indexed lookup.
+    """
+    live = st.session_state.get(f"{prefix}_live_rows")
+    changed = 0
+    if live is not None:
+        changes = source.changes_since(live["seq"])
+        if changes.reset:
+            live = None
+        else:
+            changed = len(changes.frame)
+            if changed:
+                live["frame"] = changes.apply(live["frame"], LIVE_ROWS)
+            live["seq"] = changes.seq
+    if live is None:
+        seq = source.change_seq()  # read first: changes made during the load arrive next tick
+        live = st.session_state[f"{prefix}_live_rows"] = {"seq": seq, "frame": source.query(limit=LIVE_ROWS).frame}
+    st.dataframe(
+        live["frame"], width="stretch", hide_index=True, height=280,
+        column_config={c: st.column_config.DateColumn(c) for c in live["frame"].columns if c in DATE_COLS},
+    )
+    st.caption(f"Updated {time.strftime('%H:%M:%S')} · {changed} changed rows since last refresh")
+
+
+def _incident_queue(ops: CyberOps):
+    # Newly arrived events are folded into incidents first; a no-op when none are pending.
+    with perf.span("correlate", "incremental"):
+        correlate(ops.db_path)
+
+    c1, c2 = st.columns([0.3, 0.7])
+    open_only = c1.toggle("Only incidents with open events", value=True, key="inc_open")
+    limit = c2.selectbox("Incidents shown", [25, 100, 250], index=1, key="inc_limit")
+    inc = ops.incidents(open_only=open_only, limit=limit)
+    if inc.empty:
+        st.info("No incidents.")
+        return
+    st.dataframe(
+        inc, width="stretch", hide_index=True,
+        column_config={c: st.column_config.DateColumn(c) for c in inc.columns if c in DATE_COLS},
+    )
+
+    labels = {int(r.incident_id): f"#{r.incident_id} {r.event_kind} / {r.owner} ({r.events} events)"
+              for r in inc.itertuples()}
+    with st.expander("Events in an incident"):
+        shown = st.selectbox("Incident", list(labels), format_func=labels.get, key="inc_show")
+        if shown is not None:
+            st.dataframe(as_text(ops.incident_events(shown)), width="stretch", hide_index=True)
+
+    st.write("### Update incidents")
+    picked = st.multiselect("Incidents", list(labels), format_func=labels.get, key="inc_pick")
+    new_state = st.selectbox("New state for all their events", ["Open", "In Progress", "Resolved", "Closed"],
+                             key="inc_state")
+    if st.button("Apply to incidents", key="inc_apply", disabled=not picked):
+        n = ops.update_state_incidents(picked, new_state)
+        st.success(f"Updated {n} events in {len(picked)} incidents.")
+        _rerun_section()
+
+
+def _px():
+    # plotly.express is the slowest import in the app; pay for it on the first chart.
+    import plotly.express as px
+    return px
+
+
+def _rerun_section():
+    # Fragment-scoped rerun when triggered from a section's own widget; a full
+    # run (e.g. the first render after navigation) falls back to an app rerun.
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+def _paged_queue(prefix: str, source, filter_cols: list[str],
+                 archive: bool = False) -> tuple[Page, dict]:
+    """
+    Filter bar plus a keyset-paged table. Only one page of rows is fetched;
+    the cursors of earlier pages are kept in session state for "Previous".
+    Returns the page and the active filter scope (filters, since, until).
+    With `archive`, a toggle lets the user page through archived history too.
+    """
+    cols = st.columns(len(filter_cols) + 3)
+    filters = {}
+    for col, name in zip(cols, filter_cols):
+        filters[name] = col.multiselect(name.title(), source.options(name), key=f"{prefix}_f_{name}") or None
+    since = cols[-3].text_input("From (YYYY-MM-DD)", key=f"{prefix}_f_since").strip() or None
+    until = cols[-2].text_input("To (YYYY-MM-DD)", key=f"{prefix}_f_until").strip() or None
+    size = cols[-1].selectbox("Rows per page", [25, 50, 100, 250], index=1, key=f"{prefix}_f_size")
+
+    archived = archive and st.toggle(
+        "Include archived history", key=f"{prefix}_f_archived",
+        help="Also search rows moved to the archive database (slower).",
+    )
+
+    sig = repr((filters, since, until, size, archived))
+    if st.session_state.get(f"{prefix}_sig") != sig:
+        st.session_state[f"{prefix}_sig"] = sig
+        st.session_state[f"{prefix}_cursors"] = [None]
+    cursors = st.session_state[f"{prefix}_cursors"]
+
+    extra = {"archived": True} if archived else {}
+    page = source.query(**filters, since=since, until=until, after=cursors[-1], limit=size, **extra)
+    st.dataframe(
+        page.frame, width="stretch", hide_index=True,
+        column_config={c: st.column_config.DateColumn(c) for c in page.frame.columns if c in DATE_COLS},
+    )
+
+    p1, p2, p3 = st.columns([0.15, 0.15, 0.7])
+    p3.caption(f"Page {len(cursors)}")
+    if p1.button("Previous", key=f"{prefix}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        _rerun_section()
+    if p2.button("Next", key=f"{prefix}_next", disabled=page.cursor is None):
+        cursors.append(page.cursor)
+        _rerun_section()
+    return page, {"filters": filters, "since": since, "until": until}
+
+
+def _bulk_targets(prefix: str, label: str, page: Page, key_col: str, source, scope: dict):
+    """
+    Multi-select over the current page, or every row matching the filter.
+    A filter update must be confirmed against the matching row count; the
+    confirmation resets whenever the filter or that count changes.
+    Returns (keys, use_filter, confirmed).
+    """
+    keys = st.multiselect(label, page.frame[key_col].tolist(), key=f"{prefix}_pick")
+    use_filter = st.checkbox("Apply to current filter instead", key=f"{prefix}_all")
+    if not use_filter:
+        return keys, False, False
+    matching = source.count(**scope["filters"], since=scope["since"], until=scope["until"])
+    unfiltered = not any(scope["filters"].values()) and not scope["since"] and not scope["until"]
+    what = "every row (no filter is set)" if unfiltered else "every row matching the current filter"
+    confirmed = st.checkbox(f"Confirm: update {matching} rows, {what}",
+                            key=f"{prefix}_confirm_{matching}_{scope!r}")
+    return keys, True, confirmed